@@ -1,39 +1,115 @@
 from typing import Optional
 
-from app.models.job import JobListResponse, JobResponse
+from app.database.redis import redis_client
+from app.models.job import JobListResponse, JobResponse, JobStatus, JobTraceResponse
+from app.services.job_store import job_store
+from app.services.process_registry import process_registry
+from app.services.tracing import tracer
 from fastapi import APIRouter, HTTPException, Query
+from rq.command import send_stop_job_command
+from rq.exceptions import InvalidJobOperation, NoSuchJobError
+from rq.job import Job as RQJob
+from rq.job import JobStatus as RQJobStatus
+from rq.registry import ScheduledJobRegistry
 
 router = APIRouter()
 
 
 @router.get("/", response_model=JobListResponse)
 async def list_jobs(
-    status: Optional[str] = Query(None),
+    status: Optional[JobStatus] = Query(None),
     website_id: Optional[str] = Query(None),
     page: int = Query(1, ge=1),
     size: int = Query(10, ge=1, le=100),
 ):
     """List jobs with optional filtering."""
-    # TODO: Implement database query with filters
-    return JobListResponse(jobs=[], total=0, page=page, size=size)
+    jobs, total = job_store.list(
+        status=status.value if status else None,
+        website_id=website_id,
+        page=page,
+        size=size,
+    )
+    return JobListResponse(jobs=jobs, total=total, page=page, size=size)
 
 
 @router.get("/{job_id}", response_model=JobResponse)
 async def get_job(job_id: str):
     """Get job details."""
-    # TODO: Implement database query
-    raise HTTPException(status_code=404, detail="Job not found")
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 
 @router.delete("/{job_id}")
-async def cancel_job(job_id: str):
-    """Cancel a running job."""
-    # TODO: Implement job cancellation
-    return {"message": "Job cancelled"}
+def cancel_job(job_id: str):
+    """Cancel a queued or running job.
+
+    Queued RQ jobs are removed from their queue; running ones have their
+    work horse stopped. git subprocesses started for the job (in a worker or
+    an API background task) are killed through the process registry.
+    A plain ``def``, so the blocking Redis, database and process-group
+    calls run in the threadpool rather than on the event loop.
+    """
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    # Claim the job first: one that finishes meanwhile keeps its status
+    if not job_store.cancel(job_id):
+        job = job_store.get(job_id) or job
+        raise HTTPException(
+            status_code=409, detail=f"Job already {job.status.value}"
+        )
+
+    # Kill child process groups first, before their parent is stopped
+    process_registry.request_cancel(job_id)
+
+    try:
+        rq_job = RQJob.fetch(job_id, connection=redis_client)
+    except NoSuchJobError:
+        rq_job = None
+    if rq_job is not None:
+        rq_status = rq_job.get_status()
+        try:
+            if rq_status == RQJobStatus.STARTED:
+                send_stop_job_command(redis_client, job_id)
+            elif rq_status in (
+                RQJobStatus.QUEUED,
+                RQJobStatus.SCHEDULED,
+                RQJobStatus.DEFERRED,
+            ):
+                if rq_status == RQJobStatus.SCHEDULED:
+                    # Deferred by a cluster cap: take it away from the
+                    # scheduler before it is re-enqueued
+                    ScheduledJobRegistry(
+                        rq_job.origin, connection=redis_client
+                    ).remove(rq_job)
+                rq_job.cancel()
+        except InvalidJobOperation:
+            # Finished between the lookup and the command
+            pass
+
+    job_store.update(job_id, log="Job cancelled")
+    return {"message": "Job cancelled", "job_id": job_id}
 
 
 @router.get("/{job_id}/logs")
 async def get_job_logs(job_id: str):
-    """Get real-time job logs."""
-    # TODO: Implement log streaming
-    return {"logs": []}
+    """Get job logs."""
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"logs": job.logs}
+
+
+@router.get("/{job_id}/trace", response_model=JobTraceResponse)
+async def get_job_trace(job_id: str):
+    """Get the job's spans and its latency breakdown per stage.
+
+    ``breakdown_ms`` sums span durations by name (nested spans are also
+    counted in their parents); ``total_ms`` covers queue wait plus run time.
+    """
+    trace = tracer.job_trace(job_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="No trace recorded for job")
+    return trace
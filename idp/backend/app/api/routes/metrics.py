@@ -0,0 +1,16 @@
+# Importing the worker module registers the queue depth/age collector
+import app.worker  # noqa: F401
+from app.services.metrics import metrics
+from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+
+router = APIRouter()
+
+
+@router.get("/", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus metrics endpoint."""
+    # Collectors and the shared (Redis) totals do blocking I/O
+    body = await run_in_threadpool(metrics.render)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
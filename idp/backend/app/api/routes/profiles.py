@@ -0,0 +1,29 @@
+from typing import Optional
+
+from app.services.profiler import admin_token_valid, profile_store
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import FileResponse
+
+router = APIRouter()
+
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """Allow access only with the configured admin token."""
+    if not admin_token_valid(x_admin_token):
+        # Do not reveal whether profiling is configured
+        raise HTTPException(status_code=404, detail="Not found")
+
+
+@router.get("/", dependencies=[Depends(require_admin_token)])
+async def list_profiles():
+    """List saved request profiles, newest first."""
+    return {"profiles": profile_store.list()}
+
+
+@router.get("/{name}", dependencies=[Depends(require_admin_token)])
+async def download_profile(name: str):
+    """Download a profile in pstats format."""
+    path = profile_store.path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=name)
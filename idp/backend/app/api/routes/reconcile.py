@@ -0,0 +1,40 @@
+import uuid
+from datetime import datetime
+
+from app.models.job import JobResponse, JobStatus, JobType
+from app.services.job_store import job_store
+from app.services.reconciler import reconciler
+from app.tasks.reconcile_tasks import reconcile_values_task
+from app.worker import enqueue_website_job
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+
+router = APIRouter()
+
+
+@router.get("/")
+async def plan_reconciliation():
+    """Dry run: show what a reconciliation would change, without writing."""
+    try:
+        plan = await run_in_threadpool(reconciler.plan)
+    except RuntimeError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    return plan.to_dict()
+
+
+@router.post("/", response_model=JobResponse)
+async def start_reconciliation(force: bool = Query(False)):
+    """Run a reconciliation as a worker job on the bulk lane."""
+    job_id = str(uuid.uuid4())
+    job = JobResponse(
+        id=job_id,
+        job_type=JobType.VALUES_RECONCILE,
+        status=JobStatus.PENDING,
+        created_at=datetime.utcnow(),
+        logs=["Reconciliation queued"],
+    )
+    job_store.create(job)
+    enqueue_website_job(
+        "bulk", reconcile_values_task, job_id, force=force, job_id=job_id
+    )
+    return job
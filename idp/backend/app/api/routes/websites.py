@@ -1,9 +1,13 @@
 import hashlib
-import os
+import json
+import logging
+import re
 import uuid
 from datetime import datetime
+from typing import List, Optional
 
 import yaml
+from app.config import settings
 from app.database import get_db
 from app.database.models import (
     DatabaseTypeEnum,
@@ -16,13 +20,50 @@ from app.models.job import JobResponse, JobStatus, JobType
 from app.models.website import (
     ResourcePlanInfo,
     ResourcePlansResponse,
+    WebsiteBulkDeleteRequest,
+    WebsiteBulkResponse,
+    WebsiteBulkRestartRequest,
     WebsiteCreateRequest,
+    WebsiteFilter,
     WebsiteListResponse,
     WebsiteResponse,
+    WebsiteUpdateRequest,
+    WebsiteUpdateResponse,
 )
+from app.services.admission import admission_controller, retry_after_header
 from app.services.github_service import github_service
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from app.services.idempotency import idempotency_store, request_fingerprint
+from app.services.job_store import job_store
+from app.services.kubernetes_service import kubernetes_service
+from app.services.pod_logs import pod_log_hub
+from app.services.status_buffer import status_buffer
+from app.services.tracing import tracer
+from app.services.values_pipeline import values_pipeline
+from app.services.values_preview import diff_values, values_preview
+from app.services.website_cache import website_cache, website_response
+from app.tasks.website_tasks import (
+    bulk_delete_websites_task,
+    delete_website_task,
+    provision_website_task,
+    restart_websites_task,
+    sync_website_task,
+)
+from app.worker import enqueue_website_job
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from kubernetes.client.rest import ApiException
 from sqlalchemy.orm import Session
+from starlette.background import BackgroundTask
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -63,48 +104,6 @@ def hash_password(password: str) -> str:
     return hashlib.sha256(password.encode()).hexdigest()
 
 
-def create_helm_values_file(website: Website) -> str:
-    """Create Helm values.yaml file for website deployment."""
-    values = website.to_helm_values()
-
-    # Create values directory structure inside the backend
-    base_dir = "/home/sirwan/apps-repo/idp/backend"
-    values_dir = f"{base_dir}/website-template/values"
-    os.makedirs(values_dir, exist_ok=True)
-
-    # Write values file with format: values-{website_id}.yaml
-    values_filename = f"values-{website.website_id}.yaml"
-    values_path = f"{values_dir}/{values_filename}"
-
-    with open(values_path, "w") as f:
-        # Add header comment with website information
-        f.write(f"# Helm values for website: {website.website_id}\n")
-        f.write(f"# Domain: {website.domain}\n")
-        f.write(f"# Type: {website.website_type.value}\n")
-        f.write(f"# Plan: {website.resource_plan.value}\n")
-        f.write(f"# Generated: {website.created_at}\n")
-        f.write("# Auto-generated by Website IDP - DO NOT EDIT MANUALLY\n\n")
-        yaml.dump(values, f, default_flow_style=False, indent=2)
-
-    print(f"Generated Helm values file: {values_path}")
-
-    # Automatically push to GitHub
-    try:
-        github_result = github_service.auto_push_values(
-            str(website.website_id), "created"
-        )
-        if github_result["success"]:
-            msg = github_result["message"]
-            print("✅ Successfully pushed to GitHub: " + msg)
-        else:
-            print(f"⚠️ GitHub push failed: {github_result['message']}")
-            # Log the error but don't fail the website creation
-    except Exception as e:
-        print(f"⚠️ GitHub push error: {str(e)}")
-
-    return values_path
-
-
 @router.get("/resource-plans", response_model=ResourcePlansResponse)
 async def get_resource_plans():
     """Get available resource plans."""
@@ -114,11 +113,33 @@ async def get_resource_plans():
 @router.post("/", response_model=JobResponse)
 async def create_website(
     request: WebsiteCreateRequest,
-    background_tasks: BackgroundTasks,
+    http_request: Request,
     db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
 ):
-    """Create a new website deployment."""
+    """Create a new website deployment.
+
+    Retries carrying the same ``Idempotency-Key`` get the original job back
+    without re-running the existence check, insert or provisioning.
+    """
+    tenant = admission_controller.tenant_for(http_request)
 
+    async def handler() -> JobResponse:
+        with tracer.span("api.create_website", subdomain=request.subdomain):
+            return _create_website(request, db, tenant)
+
+    if not idempotency_key:
+        return await handler()
+    return await idempotency_store.run(
+        idempotency_key, request_fingerprint(request.model_dump_json()), handler
+    )
+
+
+def _create_website(
+    request: WebsiteCreateRequest,
+    db: Session,
+    tenant: str,
+) -> JobResponse:
     # Auto-generate missing fields from simplified frontend data
     website_id = request.subdomain  # Use subdomain as website ID
     domain = f"{request.subdomain}.naserraoofi.com"  # Generate full domain
@@ -140,6 +161,18 @@ async def create_website(
             detail=f"Website with ID '{website_id}' already exists",
         )
 
+    # Per-tenant rate limit and concurrency cap on provisioning
+    admission = admission_controller.admit(tenant, cluster)
+    if not admission.admitted:
+        raise HTTPException(
+            status_code=429,
+            detail=(
+                "Too many provisioning requests "
+                f"({admission.reason} limit for cluster '{cluster}')"
+            ),
+            headers=retry_after_header(admission),
+        )
+
     # Create new website record
     website = Website(
         website_id=website_id,
@@ -158,9 +191,13 @@ async def create_website(
     )
 
     # Save to database
-    db.add(website)
-    db.commit()
-    db.refresh(website)
+    try:
+        db.add(website)
+        db.commit()
+        db.refresh(website)
+    except Exception:
+        admission_controller.release(tenant, cluster, admission.slot_id)
+        raise
 
     # Create job for background processing
     job_id = str(uuid.uuid4())
@@ -173,34 +210,31 @@ async def create_website(
         logs=[f"Website '{website_id}' created in database"],
         created_at=datetime.utcnow(),
     )
+    job_store.create(job)
 
-    # Add background task to create Helm values and deploy
-    background_tasks.add_task(process_website_creation, job_id, website.id, db)
+    # Render, push and deploy on the default lane (behind interactive jobs,
+    # subject to the cluster's concurrency cap); the job returns the
+    # admission slot when it finishes
+    try:
+        enqueue_website_job(
+            "default",
+            provision_website_task,
+            job_id,
+            website.id,
+            tenant,
+            cluster,
+            admission.slot_id,
+            cluster=cluster,
+            website_id=website_id,
+            job_id=job_id,
+        )
+    except Exception:
+        admission_controller.release(tenant, cluster, admission.slot_id)
+        raise
 
     return job
 
 
-async def process_website_creation(job_id: str, website_id: int, db: Session):
-    """Background task to process website creation."""
-    website = db.query(Website).filter(Website.id == website_id).first()
-    if not website:
-        return
-    try:
-        website.status = WebsiteStatusEnum.CREATING
-        db.commit()
-        create_helm_values_file(website)
-        website.status = WebsiteStatusEnum.RUNNING
-        website.deployed_at = datetime.utcnow()
-        website.ingress_url = f"https://{website.domain}"
-        db.commit()
-    except Exception as exc:
-        if website:
-            website.status = WebsiteStatusEnum.FAILED
-            db.commit()
-        print("Error processing website creation: " + str(exc))
-        return
-
-
 @router.get("/", response_model=WebsiteListResponse)
 async def list_websites(
     page: int = Query(1, ge=1),
@@ -219,21 +253,7 @@ async def list_websites(
     total = db.query(Website).count()
 
     # Convert to response models
-    website_responses = []
-    for website in websites:
-        website_responses.append(
-            WebsiteResponse(
-                id=str(website.id),
-                website_id=str(website.website_id),
-                domain=str(website.domain),
-                resource_plan=website.resource_plan.value,
-                website_type=website.website_type.value,
-                status=website.status.value,
-                created_at=website.created_at,
-                updated_at=website.updated_at,
-                deployed_at=website.deployed_at,
-            )
-        )
+    website_responses = [website_response(website) for website in websites]
 
     return WebsiteListResponse(
         websites=website_responses, total=total, page=page, size=size
@@ -242,54 +262,463 @@ async def list_websites(
 
 @router.get("/{website_id}", response_model=WebsiteResponse)
 async def get_website(website_id: str):
-    """Get website details."""
-    # TODO: Implement database query
-    raise HTTPException(status_code=404, detail="Website not found")
+    """Get website details (served from the website cache)."""
+    website = website_cache.get(website_id)
+    if website is None:
+        raise HTTPException(status_code=404, detail="Website not found")
+    return website
+
+
+# WebsiteUpdateRequest field -> (Website column, converter)
+UPDATABLE_FIELDS = {
+    "plan": ("resource_plan", lambda v: ResourcePlanEnum(v)),
+    "storageClass": ("storage_class", str),
+    "adminEmail": ("admin_email", str),
+    "blogName": ("blog_name", str),
+    "description": ("description", str),
+}
 
 
-@router.delete("/{website_id}", response_model=JobResponse)
-async def delete_website(website_id: str, background_tasks: BackgroundTasks):
-    """Delete a website deployment."""
-    # TODO: Check if website exists
+@router.patch("/{website_id}", response_model=WebsiteUpdateResponse)
+async def update_website(
+    website_id: str,
+    request: WebsiteUpdateRequest,
+    db: Session = Depends(get_db),
+):
+    """Update a website in place.
+
+    Only changed columns are written. The values file is re-rendered and
+    pushed only if its content changed, and only then is a sync job
+    enqueued to roll the change out.
+    """
+    with tracer.span("api.update_website", website_id=website_id):
+        return await run_in_threadpool(_update_website, website_id, request, db)
 
-    # Create job
+
+def _update_website(
+    website_id: str, request: WebsiteUpdateRequest, db: Session
+) -> WebsiteUpdateResponse:
+    website = db.query(Website).filter(Website.website_id == website_id).first()
+    if not website:
+        raise HTTPException(status_code=404, detail="Website not found")
+    if website.status == WebsiteStatusEnum.DELETING:
+        raise HTTPException(status_code=409, detail="Website is being deleted")
+
+    changed_fields = []
+    for name, value in request.model_dump(exclude_unset=True).items():
+        if value is None:
+            continue
+        column, convert = UPDATABLE_FIELDS[name]
+        value = convert(value)
+        if getattr(website, column) != value:
+            setattr(website, column, value)
+            changed_fields.append(column)
+    response = WebsiteUpdateResponse(
+        website_id=website_id, changed_fields=changed_fields, values_changes=[]
+    )
+    if not changed_fields:
+        return response
+
+    # Header is stable (created_at), so only the affected keys change
+    layout = github_service.layout
+    entry = layout.manifest().get(website_id)
+    old_content = None
+    if entry:
+        try:
+            old_content = (layout.values_dir / entry["path"]).read_text()
+        except FileNotFoundError:
+            # Stale manifest entry: treat the site as having no file yet
+            pass
+    new_content = website.to_values_file()
+    response.values_changes = diff_values(
+        yaml.safe_load(old_content) if old_content else {},
+        yaml.safe_load(new_content),
+    )
+    if new_content == old_content:
+        # e.g. description only: nothing to push or roll out
+        db.commit()
+        return response
+
+    layout.write(website_id, new_content)
+    result = values_pipeline.push(website_id, "updated", str(website.namespace))
+    if result.get("pending"):
+        # The leader may still push this, so keep the change; if it does
+        # not, the reconciler finds the drift and pushes it
+        db.commit()
+        response.pending = True
+        return response
+    if not result["success"] and not result.get("queued"):
+        # Leave database, file and branch as they were
+        db.rollback()
+        if old_content is None:
+            layout.remove(website_id)
+        else:
+            layout.write(website_id, old_content)
+        raise HTTPException(
+            status_code=502, detail=f"GitHub push failed: {result['message']}"
+        )
+    db.commit()
+
+    response.queued = bool(result.get("queued"))
+    response.pushed = not response.queued
+    if response.pushed:
+        # Queued changes are rolled out by ArgoCD once the outbox drains
+        response.sync_job_id = _enqueue_sync(website)
+    return response
+
+
+def _enqueue_sync(website: Website) -> str:
     job_id = str(uuid.uuid4())
-    job = JobResponse(
-        id=job_id,
-        job_type=JobType.WEBSITE_DELETE,
-        status=JobStatus.PENDING,
-        website_id=website_id,
-        progress=0,
-        logs=[],
-        created_at=datetime.utcnow(),
+    job_store.create(
+        JobResponse(
+            id=job_id,
+            job_type=JobType.WEBSITE_UPDATE,
+            status=JobStatus.PENDING,
+            website_id=str(website.website_id),
+            created_at=datetime.utcnow(),
+            logs=["Values updated, sync queued"],
+        )
+    )
+    enqueue_website_job(
+        "interactive",
+        sync_website_task,
+        job_id,
+        str(website.website_id),
+        str(website.namespace),
+        cluster=str(website.cluster),
+        website_id=str(website.website_id),
+        job_id=job_id,
     )
+    return job_id
 
-    # TODO: Add job to queue
-    # background_tasks.add_task(delete_website_task, job_id, website_id)
 
+@router.delete("/{website_id}", response_model=JobResponse)
+async def delete_website(website_id: str, db: Session = Depends(get_db)):
+    """Delete a website deployment.
+
+    The site is marked DELETING and torn down by a worker job; its row is
+    removed once its values are off the branch. Deleting a site that is
+    already DELETING re-runs the teardown.
+    """
+    website = db.query(Website).filter(Website.website_id == website_id).first()
+    if not website:
+        raise HTTPException(status_code=404, detail="Website not found")
+    return _enqueue_teardown([website])
+
+
+def _select_websites(request: WebsiteFilter, db: Session) -> List[Website]:
+    """Websites matching a bulk action filter (400 if it is empty)."""
+    filters = []
+    if request.websiteIds is not None:
+        filters.append(Website.website_id.in_(request.websiteIds))
+    if request.cluster:
+        filters.append(Website.cluster == request.cluster)
+    if request.status:
+        try:
+            filters.append(Website.status == WebsiteStatusEnum(request.status))
+        except ValueError:
+            raise HTTPException(
+                status_code=400, detail=f"Unknown status '{request.status}'"
+            )
+    if request.plan:
+        filters.append(Website.resource_plan == ResourcePlanEnum(request.plan.value))
+    if request.type:
+        filters.append(Website.website_type == WebsiteTypeEnum(request.type.value))
+    if not filters:
+        raise HTTPException(status_code=400, detail="At least one filter is required")
+    return db.query(Website).filter(*filters).order_by(Website.website_id).all()
+
+
+def _check_bulk_limit(count: int, limit: int, force: bool) -> None:
+    if count > limit and not force:
+        raise HTTPException(
+            status_code=400,
+            detail=(
+                f"Filter matches {count} websites (limit {limit}); "
+                "re-run with force"
+            ),
+        )
+
+
+@router.post("/bulk-delete", response_model=WebsiteBulkResponse)
+async def bulk_delete_websites(
+    request: WebsiteBulkDeleteRequest, db: Session = Depends(get_db)
+):
+    """Delete every website matching a filter, in one bulk-lane job."""
+    websites = _select_websites(request, db)
+    response = WebsiteBulkResponse(
+        website_ids=[str(w.website_id) for w in websites], matched=len(websites)
+    )
+    if request.dryRun or not websites:
+        return response
+    _check_bulk_limit(len(websites), settings.BULK_DELETE_MAX, request.force)
+    response.job_id = _enqueue_teardown(websites, cluster=request.cluster).id
+    return response
+
+
+def _enqueue_teardown(
+    websites: List[Website], cluster: Optional[str] = None
+) -> JobResponse:
+    """Mark sites DELETING and enqueue one job tearing them all down."""
+    for website in websites:
+        status_buffer.record(
+            str(website.website_id), status=WebsiteStatusEnum.DELETING
+        )
+    # One batched UPDATE, ordered after any transition buffered before it
+    status_buffer.flush()
+
+    single = len(websites) == 1
+    job_id = str(uuid.uuid4())
+    job = job_store.create(
+        JobResponse(
+            id=job_id,
+            job_type=JobType.WEBSITE_DELETE,
+            status=JobStatus.PENDING,
+            website_id=str(websites[0].website_id) if single else None,
+            progress=0,
+            logs=[f"Deletion of {len(websites)} website(s) queued"],
+            created_at=datetime.utcnow(),
+        )
+    )
+    if single:
+        website = websites[0]
+        enqueue_website_job(
+            "interactive",
+            delete_website_task,
+            job_id,
+            str(website.website_id),
+            str(website.namespace),
+            cluster=str(website.cluster),
+            website_id=str(website.website_id),
+            job_id=job_id,
+        )
+    else:
+        enqueue_website_job(
+            "bulk",
+            bulk_delete_websites_task,
+            job_id,
+            {str(w.website_id): str(w.namespace) for w in websites},
+            cluster=cluster,
+            job_id=job_id,
+        )
     return job
 
 
+def _parse_since(since: Optional[str]) -> Optional[int]:
+    """``30s``/``5m``/``2h`` (or plain seconds) -> seconds."""
+    if not since:
+        return None
+    match = re.fullmatch(r"(\d+)([smh]?)", since)
+    if not match:
+        raise HTTPException(
+            status_code=400, detail="since must look like 30s, 5m or 2h"
+        )
+    return int(match.group(1)) * {"": 1, "s": 1, "m": 60, "h": 3600}[match.group(2)]
+
+
 @router.get("/{website_id}/logs")
-async def get_website_logs(website_id: str):
-    """Get website deployment logs."""
-    # TODO: Implement log retrieval from Kubernetes
-    return {"logs": []}
+async def get_website_logs(
+    website_id: str,
+    request: Request,
+    tail: Optional[int] = Query(100, ge=0, le=settings.POD_LOGS_MAX_TAIL),
+    since: Optional[str] = Query(None, description="e.g. 30s, 5m, 2h"),
+    follow: bool = Query(False),
+    pod: Optional[str] = Query(None),
+    container: Optional[str] = Query(None),
+    timestamps: bool = Query(False),
+    db: Session = Depends(get_db),
+):
+    """Stream container logs of the website's pods.
+
+    Plain text (chunked) by default, or Server-Sent Events when the client
+    accepts ``text/event-stream``. With several containers each line is
+    prefixed with ``[pod/container]``. Followers of the same pod share one
+    upstream stream of live lines after reading their own backlog.
+    """
+    website = db.query(Website).filter(Website.website_id == website_id).first()
+    if not website:
+        raise HTTPException(status_code=404, detail="Website not found")
+    since_seconds = _parse_since(since)
+    namespace = str(website.namespace)
+    context = kubernetes_service.context_for(str(website.cluster))
+    try:
+        targets = await run_in_threadpool(
+            pod_log_hub.containers, namespace, context, pod, container
+        )
+    except ApiException as e:
+        raise HTTPException(status_code=502, detail=f"Kubernetes error: {e.reason}")
+    if not targets:
+        raise HTTPException(status_code=404, detail="No matching pods")
+
+    sse = "text/event-stream" in request.headers.get("accept", "")
+    media_type = "text/event-stream" if sse else "text/plain"
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+    def frame(line: str) -> str:
+        return f"data: {line}\n\n" if sse else f"{line}\n"
+
+    if not follow:
+        try:
+            lines = await run_in_threadpool(
+                pod_log_hub.read,
+                namespace,
+                targets,
+                tail,
+                since_seconds,
+                timestamps,
+                context,
+            )
+        except ApiException as e:
+            raise HTTPException(
+                status_code=502, detail=f"Kubernetes error: {e.reason}"
+            )
+        # Sync iterator: Starlette pulls it chunk by chunk in a thread
+        return StreamingResponse(
+            (frame(line) for line in lines), media_type=media_type, headers=headers
+        )
+
+    if not pod_log_hub.acquire_follower(website_id):
+        raise HTTPException(
+            status_code=429,
+            detail=(
+                f"Website already has {settings.POD_LOGS_MAX_FOLLOWERS} "
+                "log followers"
+            ),
+        )
+
+    async def stream():
+        async for line in pod_log_hub.follow(
+            namespace, targets, tail, since_seconds, timestamps, context
+        ):
+            if line is None:
+                if sse:
+                    yield ": keep-alive\n\n"
+                continue
+            yield frame(line)
+
+    # Runs after the response ends, including on client disconnect
+    release = BackgroundTask(pod_log_hub.release_follower, website_id)
+    return StreamingResponse(
+        stream(), media_type=media_type, headers=headers, background=release
+    )
+
+
+# States in which a site has deployments worth restarting
+RESTARTABLE = {
+    WebsiteStatusEnum.CREATING,
+    WebsiteStatusEnum.RUNNING,
+    WebsiteStatusEnum.FAILED,
+}
 
 
 @router.post("/{website_id}/restart", response_model=JobResponse)
-async def restart_website(website_id: str, background_tasks: BackgroundTasks):
-    """Restart website deployment."""
-    # TODO: Implement restart logic
+async def restart_website(website_id: str, db: Session = Depends(get_db)):
+    """Restart website deployment.
+
+    Triggers a rolling restart of the site's deployments (like ``kubectl
+    rollout restart``) from a worker job, which waits for the rollout.
+    """
+    website = db.query(Website).filter(Website.website_id == website_id).first()
+    if not website:
+        raise HTTPException(status_code=404, detail="Website not found")
+    if website.status not in RESTARTABLE:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Website is {website.status.value}, nothing to restart",
+        )
+    return _enqueue_restart([website], "interactive")
+
+
+@router.post("/bulk-restart", response_model=WebsiteBulkResponse)
+async def bulk_restart_websites(
+    request: WebsiteBulkRestartRequest, db: Session = Depends(get_db)
+):
+    """Rolling restart of every website matching a filter.
+
+    One bulk-lane job restarts them cluster by cluster, with at most
+    ``maxSurge`` namespaces per cluster rolling at a time.
+    """
+    websites = [w for w in _select_websites(request, db) if w.status in RESTARTABLE]
+    response = WebsiteBulkResponse(
+        website_ids=[str(w.website_id) for w in websites], matched=len(websites)
+    )
+    if request.dryRun or not websites:
+        return response
+    _check_bulk_limit(len(websites), settings.RESTART_BULK_MAX, request.force)
+    response.job_id = _enqueue_restart(
+        websites,
+        "bulk",
+        cluster=request.cluster,
+        parallelism=request.parallelism,
+        max_surge=request.maxSurge,
+    ).id
+    return response
+
+
+def _enqueue_restart(
+    websites: List[Website],
+    lane: str,
+    cluster: Optional[str] = None,
+    parallelism: Optional[int] = None,
+    max_surge: Optional[int] = None,
+) -> JobResponse:
+    single = len(websites) == 1
     job_id = str(uuid.uuid4())
-    job = JobResponse(
-        id=job_id,
-        job_type=JobType.WEBSITE_UPDATE,
-        status=JobStatus.PENDING,
-        website_id=website_id,
-        progress=0,
-        logs=[],
-        created_at=datetime.utcnow(),
+    job = job_store.create(
+        JobResponse(
+            id=job_id,
+            job_type=JobType.WEBSITE_RESTART,
+            status=JobStatus.PENDING,
+            website_id=str(websites[0].website_id) if single else None,
+            progress=0,
+            logs=[f"Restart of {len(websites)} website(s) queued"],
+            created_at=datetime.utcnow(),
+        )
+    )
+    targets = [
+        {
+            "website_id": str(w.website_id),
+            "cluster": str(w.cluster),
+            "namespace": str(w.namespace),
+        }
+        for w in websites
+    ]
+    enqueue_website_job(
+        lane,
+        restart_websites_task,
+        job_id,
+        targets,
+        parallelism,
+        max_surge,
+        cluster=str(websites[0].cluster) if single else cluster,
+        website_id=str(websites[0].website_id) if single else None,
+        job_id=job_id,
     )
-
     return job
+
+
+@router.post("/values:preview")
+async def preview_fleet_values(only_changed: bool = Query(True)):
+    """Dry run: render every website's values and diff against git.
+
+    Streams one JSON object per line (NDJSON), then a summary line.
+    Nothing is written or pushed.
+    """
+    try:
+        results = await run_in_threadpool(values_preview.preview_fleet, only_changed)
+    except RuntimeError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    lines = (json.dumps(result, default=str) + "\n" for result in results)
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+
+@router.post("/{website_id}/values:preview")
+async def preview_website_values(website_id: str, db: Session = Depends(get_db)):
+    """Dry run: render a website's values and diff against the committed file."""
+    website = db.query(Website).filter(Website.website_id == website_id).first()
+    if not website:
+        raise HTTPException(status_code=404, detail="Website not found")
+    try:
+        return await run_in_threadpool(values_preview.preview, website)
+    except RuntimeError as e:
+        raise HTTPException(status_code=502, detail=str(e))
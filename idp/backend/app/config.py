@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Dict, List, Optional
 
 from pydantic_settings import BaseSettings
 
@@ -20,12 +20,153 @@ class Settings(BaseSettings):
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
 
+    # Idempotency keys (POST endpoints that create jobs)
+    IDEMPOTENCY_TTL_SECONDS: int = 60 * 60 * 24
+    IDEMPOTENCY_WAIT_TIMEOUT: float = 30.0
+
+    # Admission control for provisioning (per tenant and cluster)
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_RATE_PER_SECOND: float = 0.5
+    ADMISSION_BURST: int = 10
+    ADMISSION_MAX_CONCURRENT: int = 5
+    ADMISSION_SLOT_LEASE_SECONDS: int = 15 * 60
+    # Addresses/CIDRs whose X-Tenant-ID and X-Forwarded-For headers are trusted
+    ADMISSION_TRUSTED_PROXIES: List[str] = []
+
+    # Worker per-cluster concurrency caps
+    CLUSTER_MAX_CONCURRENT_JOBS: int = 4
+    CLUSTER_CONCURRENCY_OVERRIDES: Dict[str, int] = {}
+    CLUSTER_SLOT_LEASE_SECONDS: int = 30 * 60
+    CLUSTER_SLOT_RETRY_SECONDS: int = 5
+
+    # Worker supervisor (python -m app.supervisor)
+    WORKER_MIN_PROCESSES: int = 1
+    WORKER_MAX_PROCESSES: int = 4
+    WORKER_SCALE_INTERVAL: float = 5.0
+    WORKER_SCALE_UP_QUEUE_DEPTH: int = 5  # queued jobs per worker
+    WORKER_SCALE_UP_JOB_AGE: float = 30.0
+    WORKER_SCALE_DOWN_IDLE_SECONDS: float = 60.0
+    WORKER_DRAIN_TIMEOUT: float = 300.0
+
+    # Leader election for the values watcher/push pipeline
+    LEADER_ELECTION_ENABLED: bool = True
+    LEADER_LEASE_TTL: float = 10.0
+    PUSH_FORWARD_TIMEOUT: float = 120.0
+
+    # Git remote outage handling (circuit breaker + shared outbox)
+    GIT_BREAKER_FAILURE_THRESHOLD: int = 3
+    GIT_BREAKER_RESET_TIMEOUT: float = 60.0
+    PUSH_OUTBOX_DRAIN_INTERVAL: float = 30.0
+
     # Git Repository
     GIT_REPO_URL: str = "https://github.com/NaserRaoofi/apps-repo.git"
     GIT_REPO_PATH: str = "/tmp/apps-repo"
+    GIT_PUSH_MAX_ATTEMPTS: int = 5
+    GIT_PUSH_BACKOFF_BASE: float = 0.5
+    GIT_PUSH_BACKOFF_MAX: float = 8.0
+    GIT_LOCK_TIMEOUT: int = 300  # lock auto-expires if a holder dies
+    GIT_LOCK_WAIT_TIMEOUT: float = 120.0
+    GIT_REMOTE_TIMEOUT: float = 120.0  # per fetch/push; a timeout is an outage
+    # Sparse/shallow/blobless checkout management (see repo_checkout.py)
+    GIT_FETCH_DEPTH: int = 50  # 0 fetches full history
+    GIT_SPARSE_CONVERT_EXISTING: bool = False
+    # Scheduled repack/commit-graph/prune on the values leader
+    GIT_MAINTENANCE_ENABLED: bool = True
+    GIT_MAINTENANCE_INTERVAL: float = 60 * 60
+    GIT_PRUNE_EXPIRE: str = "2.weeks.ago"
+    # Values directory layout (migrate with python -m app.services.values_layout)
+    VALUES_SHARDED: bool = False
+    VALUES_SHARD_WIDTH: int = 2  # hex chars of sha1(website_id) per shard
+    # Database / values files / git reconciliation
+    RECONCILE_BATCH_SIZE: int = 200
+    RECONCILE_MAX_DELETIONS: int = 50  # larger plans need force=true
+    # Website teardown (values/apps removals are group-committed)
+    DELETE_BATCH_SIZE: int = 200  # sites per removal commit
+    DELETE_PARALLELISM: int = 8  # concurrent namespace delete calls
+    BULK_DELETE_MAX: int = 50  # larger bulk deletes need force=true
+    # Dry-run values preview (fleet variant renders on a process pool)
+    PREVIEW_PROCESSES: int = 4
+    PREVIEW_CHUNK_SIZE: int = 250
+
+    # Logging (JSON lines through a QueueHandler; see logging_config.py)
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"  # or "text"
+    LOG_LEVELS: Dict[str, str] = {}  # per-logger overrides
+    LOG_RATE_LIMIT_WINDOW: float = 60.0
+    LOG_RATE_LIMIT_BURST: int = 5  # identical warnings/errors per window
+    # Loggers of the watcher and background loops; others are never limited
+    LOG_RATE_LIMITED_LOGGERS: List[str] = [
+        "app.services.github_service",
+        "app.services.values_pipeline",
+        "app.services.deployment_watcher",
+        "app.services.leader_election",
+        "app.services.git_maintenance",
+        "app.services.status_buffer",
+        "app.services.metrics",
+        "app.services.tracing",
+    ]
+
+    # Per-request profiling (middleware only installed when enabled)
+    PROFILING_ENABLED: bool = False
+    PROFILING_ADMIN_TOKEN: Optional[str] = None
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_DIR: str = "./profiles"
+    PROFILING_MAX_FILES: int = 50
+    PROFILING_MAX_SECONDS: float = 30.0  # profile cut off after this long
+
+    # Metrics (counters/summaries shared across processes via Redis)
+    METRICS_FLUSH_INTERVAL: float = 10.0
+
+    # Tracing (spans per stage; see services/tracing.py)
+    TRACING_ENABLED: bool = True
+    TRACING_EXPORTER: str = "none"  # "file" or "otlp"
+    TRACING_FILE: str = "./traces.jsonl"
+    TRACING_OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"
+    TRACING_JOB_TTL: int = 7 * 24 * 60 * 60  # per-job span breakdowns
 
     # Kubernetes
     KUBECONFIG_PATH: Optional[str] = None
+    KUBERNETES_POOL_MAXSIZE: int = 16
+    KUBERNETES_REQUEST_TIMEOUT: float = 30.0
+    KUBERNETES_CONTEXTS: Dict[str, str] = {}  # cluster -> kubeconfig context
+
+    # Deployment verification (shared watch across all provisioning jobs)
+    DEPLOYMENT_VERIFY_ENABLED: bool = True
+    DEPLOYMENT_VERIFY_TIMEOUT: float = 600.0
+    DEPLOYMENT_VERIFY_REQUIRE_INGRESS: bool = True
+    DEPLOYMENT_WATCH_LABEL_SELECTOR: Optional[str] = None
+    DEPLOYMENT_STATUS_FLUSH_INTERVAL: float = 2.0  # leader pass over registrations
+
+    # Rolling restarts (waves of restartedAt patches, see rollout_restart.py)
+    RESTART_PARALLELISM: int = 5  # concurrent patch calls
+    RESTART_MAX_SURGE: int = 10  # namespaces rolling at once per cluster
+    RESTART_BULK_MAX: int = 50  # larger bulk restarts need force=true
+
+    # Pod log streaming (shared follow streams, see pod_logs.py)
+    POD_LOGS_QUEUE_SIZE: int = 1000  # per viewer; slower viewers drop lines
+    POD_LOGS_MAX_FOLLOWERS: int = 5  # concurrent followers per website
+    POD_LOGS_MAX_TAIL: int = 10000
+    POD_LOGS_IDLE_TIMEOUT: float = 60.0  # upstream read timeout
+    POD_LOGS_HEARTBEAT: float = 15.0
+
+    # Website lookup cache (in-process LRU over Redis, see website_cache.py)
+    WEBSITE_CACHE_SIZE: int = 10000  # entries in each API process
+    WEBSITE_CACHE_LOCAL_TTL: float = 30.0  # bound on staleness if pub/sub drops
+    WEBSITE_CACHE_TTL: int = 300  # seconds in Redis
+
+    # Website status write-behind buffer
+    STATUS_FLUSH_INTERVAL: float = 1.0
+    STATUS_FLUSH_BATCH_SIZE: int = 100
+
+    # ArgoCD
+    ARGOCD_SERVER_URL: Optional[str] = None
+    ARGOCD_AUTH_TOKEN: Optional[str] = None
+    ARGOCD_VERIFY_TLS: bool = True
+    ARGOCD_APP_PREFIX: str = ""
+    ARGOCD_REQUEST_TIMEOUT: float = 30.0
+    ARGOCD_MAX_CONNECTIONS: int = 10
+    ARGOCD_MAX_CONCURRENT_SYNCS: int = 4
+    ARGOCD_SYNC_COALESCE_WINDOW: float = 2.0
 
     # AWS/Terraform
     AWS_REGION: str = "us-west-2"
@@ -1,6 +1,7 @@
 import enum
 
-from sqlalchemy import Column, DateTime
+import yaml
+from sqlalchemy import JSON, Column, DateTime
 from sqlalchemy import Enum as SQLEnum
 from sqlalchemy import Integer, String, Text
 from sqlalchemy.ext.declarative import declarative_base
@@ -28,6 +29,7 @@ class DatabaseTypeEnum(enum.Enum):
 
 class WebsiteStatusEnum(enum.Enum):
     PENDING = "pending"
+    QUEUED = "queued"  # values waiting in the push outbox
     CREATING = "creating"
     RUNNING = "running"
     FAILED = "failed"
@@ -35,6 +37,24 @@ class WebsiteStatusEnum(enum.Enum):
     DELETING = "deleting"
 
 
+class JobStatusEnum(enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class JobTypeEnum(enum.Enum):
+    WEBSITE_CREATE = "website_create"
+    WEBSITE_UPDATE = "website_update"
+    WEBSITE_DELETE = "website_delete"
+    WEBSITE_RESTART = "website_restart"
+    TERRAFORM_APPLY = "terraform_apply"
+    TERRAFORM_DESTROY = "terraform_destroy"
+    VALUES_RECONCILE = "values_reconcile"
+
+
 class Website(Base):
     __tablename__ = "websites"
 
@@ -216,3 +236,41 @@ class Website(Base):
         return values
 
         return values
+
+    def to_values_file(self) -> str:
+        """Render the values file content: header comment + Helm values."""
+        header = (
+            f"# Helm values for website: {self.website_id}\n"
+            f"# Domain: {self.domain}\n"
+            f"# Type: {self.website_type.value}\n"
+            f"# Plan: {self.resource_plan.value}\n"
+            f"# Generated: {self.created_at}\n"
+            "# Auto-generated by Website IDP - DO NOT EDIT MANUALLY\n\n"
+        )
+        return header + yaml.dump(
+            self.to_helm_values(), default_flow_style=False, indent=2
+        )
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(String(36), primary_key=True)
+    job_type = Column(SQLEnum(JobTypeEnum), nullable=False)
+    status = Column(
+        SQLEnum(JobStatusEnum),
+        default=JobStatusEnum.PENDING,
+        index=True,
+    )
+    website_id = Column(String(50), index=True, nullable=True)
+    progress = Column(Integer, default=0)
+    logs = Column(JSON, default=list)
+    error_message = Column(Text, nullable=True)
+
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<Job(id='{self.id}', status='{self.status}')>"
@@ -0,0 +1,5 @@
+import redis
+from app.config import settings
+
+# Shared Redis connection (connection-pooled, safe to use across threads)
+redis_client = redis.from_url(settings.REDIS_URL)
@@ -0,0 +1,246 @@
+"""
+Structured, non-blocking logging.
+
+``setup_logging()`` installs a ``QueueHandler`` on the root logger; a
+``QueueListener`` thread does the formatting and the actual stdout writes,
+so logging never blocks the event loop or a worker on I/O.
+
+Every record is tagged with the current request, job and website IDs:
+- request_id: set per HTTP request by ``RequestContextMiddleware``
+  (honours an incoming ``X-Request-ID``) and carried into RQ jobs;
+- job_id: ``process_registry.current_job_id``, set by ``job_context``;
+- website_id: set with ``log_context(website_id=...)``.
+
+Output is one JSON object per line (LOG_FORMAT=text for humans). Levels are
+LOG_LEVEL globally plus LOG_LEVELS per logger, e.g.
+``LOG_LEVELS='{"sqlalchemy.engine": "WARNING"}'``. Warnings and errors from
+the watcher and background loops (LOG_RATE_LIMITED_LOGGERS) are rate
+limited per call site (LOG_RATE_LIMIT_*), which keeps a flapping watcher
+from flooding the output; request and job failures are always logged.
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, Iterator, Optional, Tuple
+
+from app.config import settings
+from app.services.process_registry import current_job_id
+
+request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+website_id: ContextVar[Optional[str]] = ContextVar("website_id", default=None)
+
+_CONTEXT_FIELDS = ("request_id", "job_id", "website_id")
+# Attributes every LogRecord has; anything else was passed via ``extra``
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+@contextmanager
+def log_context(**ids: Optional[str]) -> Iterator[None]:
+    """Tag log records in this block with ``request_id``/``website_id``."""
+    tokens = []
+    for name, value in ids.items():
+        var = {"request_id": request_id, "website_id": website_id}[name]
+        tokens.append((var, var.set(value)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """Copies the correlation IDs onto the record in the emitting thread."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id.get()
+        record.job_id = current_job_id.get()
+        record.website_id = website_id.get()
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """Lets WARNING+ records from each call site through BURST times per WINDOW.
+
+    Records are keyed by where they were logged (logger, file, line), not by
+    message text, so f-string messages with varying details are limited
+    together. The first record after a window with suppressions reports how
+    many were dropped.
+    """
+
+    def __init__(self, window: float, burst: int):
+        super().__init__()
+        self.window = window
+        self.burst = burst
+        self._lock = threading.Lock()
+        # (logger, file, line) -> (window start, count, suppressed)
+        self._seen: Dict[Tuple[str, str, int], Tuple[float, int, int]] = {}
+        self._last_prune = time.monotonic()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING:
+            return True
+        key = (record.name, record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            start, count, suppressed = self._seen.get(key, (now, 0, 0))
+            if now - start >= self.window:
+                if suppressed:
+                    record.suppressed = suppressed
+                start, count, suppressed = now, 0, 0
+            count += 1
+            allowed = count <= self.burst
+            if not allowed:
+                suppressed += 1
+            self._seen[key] = (start, count, suppressed)
+            if now - self._last_prune >= self.window:
+                self._prune(now)
+        return allowed
+
+    def _prune(self, now: float) -> None:
+        # Expired windows with nothing left to report are forgotten; ones
+        # with suppressions stay until their call site logs again
+        self._seen = {
+            key: entry
+            for key, entry in self._seen.items()
+            if now - entry[0] < self.window or entry[2]
+        }
+        self._last_prune = now
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for name in _CONTEXT_FIELDS:
+            value = getattr(record, name, None)
+            if value:
+                entry[name] = value
+        for name, value in vars(record).items():
+            if name not in _RECORD_ATTRS and name not in _CONTEXT_FIELDS:
+                entry[name] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s%(ids)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        ids = [
+            f"{name}={getattr(record, name)}"
+            for name in _CONTEXT_FIELDS
+            if getattr(record, name, None)
+        ]
+        record.ids = f" [{' '.join(ids)}]" if ids else ""
+        return super().format(record)
+
+
+def setup_logging() -> None:
+    """Route all logging through a queue to a JSON stdout writer."""
+    global _listener
+    if _listener is not None:
+        return
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(
+        TextFormatter() if settings.LOG_FORMAT == "text" else JsonFormatter()
+    )
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    # Filters run in the emitting thread, where the context vars are set
+    queue_handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(settings.LOG_LEVEL.upper())
+
+    # Libraries that attached their own stdout handlers (SQLAlchemy echo)
+    # would write synchronously: send them through the queue instead
+    for logger in list(logging.root.manager.loggerDict.values()):
+        if isinstance(logger, logging.Logger):
+            for handler in list(logger.handlers):
+                if isinstance(handler, logging.StreamHandler):
+                    logger.removeHandler(handler)
+            logger.propagate = True
+
+    for name, level in settings.LOG_LEVELS.items():
+        logging.getLogger(name).setLevel(level.upper())
+
+    # Logger filters only see records logged on that logger, so distinct
+    # per-website failures elsewhere are never dropped
+    rate_limit = RateLimitFilter(
+        settings.LOG_RATE_LIMIT_WINDOW, settings.LOG_RATE_LIMIT_BURST
+    )
+    for name in settings.LOG_RATE_LIMITED_LOGGERS:
+        logging.getLogger(name).addFilter(rate_limit)
+
+    _listener = logging.handlers.QueueListener(
+        log_queue, stream, respect_handler_level=True
+    )
+    _listener.start()
+
+
+def _restart_listener_in_child() -> None:
+    # Forked children (RQ work horses, supervised workers) inherit the queue
+    # but not the listener thread
+    if _listener is not None:
+        _listener._thread = None
+        _listener.start()
+
+
+os.register_at_fork(after_in_child=_restart_listener_in_child)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records; call before the process exits."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class RequestContextMiddleware:
+    """ASGI middleware giving each request an ID for logs and responses."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        incoming = headers.get(b"x-request-id", b"").decode("latin-1")[:64]
+        rid = incoming or uuid.uuid4().hex
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message = {
+                    **message,
+                    "headers": list(message.get("headers") or [])
+                    + [(b"x-request-id", rid.encode())],
+                }
+            await send(message)
+
+        with log_context(request_id=rid):
+            await self.app(scope, receive, send_with_id)
@@ -1,13 +1,34 @@
+import logging
+
 import uvicorn
-from app.api.routes import health, jobs, websites
+from app.api.routes import health, jobs, metrics, profiles, reconcile, websites
 from app.config import settings
 from app.database import init_db
+from app.logging_config import (
+    RequestContextMiddleware,
+    setup_logging,
+    shutdown_logging,
+)
+from app.services.deployment_watcher import deployment_watcher
 from app.services.github_service import github_service
+from app.services.metrics import metrics as metrics_registry
+from app.services.process_registry import process_registry
+from app.services.profiler import ProfilingMiddleware
+from app.services.status_buffer import status_buffer
+from app.services.tracing import tracer
+from app.services.values_pipeline import values_pipeline
+from app.services.values_preview import shutdown_pool as shutdown_preview_pool
+from app.services.website_cache import website_cache
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.responses import RedirectResponse
 
+# Route all logging through the non-blocking JSON pipeline
+setup_logging()
+logger = logging.getLogger(__name__)
+
 # Create FastAPI instance
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -30,23 +51,53 @@ app.add_middleware(
 # Trusted Host Middleware
 app.add_middleware(TrustedHostMiddleware, allowed_hosts=["*"])
 
+# Request IDs for logs and X-Request-ID responses
+app.add_middleware(RequestContextMiddleware)
+
+# Profiling Middleware: not installed at all unless enabled (zero overhead)
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
 
 # Initialize database on startup
 @app.on_event("startup")
 async def startup_event():
     """Initialize database tables on startup."""
     init_db()
+    # Kill git subprocesses of cancelled background jobs in this process
+    process_registry.start_listener()
+    # Evict website lookups changed by other replicas and workers
+    website_cache.start_listener()
+    # Share this process's counters with the other API and worker processes
+    metrics_registry.start_flusher()
+    # Clone the apps repo (sparse, shallow, blobless) if it is missing; a
+    # clone can take a while, so keep it off the event loop
+    await run_in_threadpool(github_service.checkout.ensure)
     # Ensure GitHub service pushes to main branch
     github_service.set_target_branch("main")
-    # Start background watcher for new values files
+    # Campaign to run the shared deployment watch (jobs register via Redis)
+    deployment_watcher.start()
+    # Start the watcher and push pipeline on the elected leader only
     try:
-        github_service.start_watcher()
+        values_pipeline.start()
     except Exception as e:
-        print(f"Failed to start values watcher: {e}")
+        logger.error(f"Failed to start values watcher: {e}")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release leadership and flush pending updates on shutdown."""
+    values_pipeline.stop()
+    deployment_watcher.stop()
+    status_buffer.stop()
+    shutdown_preview_pool()
+    tracer.flush()
+    shutdown_logging()
 
 
 # Include API routes
 app.include_router(health.router, prefix="/health", tags=["health"])
+app.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
 app.include_router(
     websites.router,
     prefix=f"{settings.API_V1_STR}/websites",
@@ -57,6 +108,16 @@ app.include_router(
     prefix=f"{settings.API_V1_STR}/jobs",
     tags=["jobs"],
 )
+app.include_router(
+    profiles.router,
+    prefix=f"{settings.API_V1_STR}/profiles",
+    tags=["profiles"],
+)
+app.include_router(
+    reconcile.router,
+    prefix=f"{settings.API_V1_STR}/reconcile",
+    tags=["reconcile"],
+)
 
 
 # Root endpoint
@@ -10,14 +10,17 @@ class JobStatus(str, Enum):
     RUNNING = "running"
     COMPLETED = "completed"
     FAILED = "failed"
+    CANCELLED = "cancelled"
 
 
 class JobType(str, Enum):
     WEBSITE_CREATE = "website_create"
     WEBSITE_UPDATE = "website_update"
     WEBSITE_DELETE = "website_delete"
+    WEBSITE_RESTART = "website_restart"
     TERRAFORM_APPLY = "terraform_apply"
     TERRAFORM_DESTROY = "terraform_destroy"
+    VALUES_RECONCILE = "values_reconcile"
 
 
 class JobResponse(BaseModel):
@@ -45,3 +48,13 @@ class JobListResponse(BaseModel):
     total: int
     page: int
     size: int
+
+
+class JobTraceResponse(BaseModel):
+    """Spans recorded for a job and the time spent per stage."""
+
+    job_id: str
+    trace_ids: list[str]
+    total_ms: float
+    breakdown_ms: dict[str, float]
+    spans: list[dict]
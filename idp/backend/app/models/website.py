@@ -1,6 +1,6 @@
 from datetime import datetime
 from enum import Enum
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, Field, validator
 
@@ -91,6 +91,37 @@ class WebsiteResponse(BaseModel):
         from_attributes = True
 
 
+class WebsiteUpdateRequest(BaseModel):
+    """Partial update of a website; omitted fields are left unchanged."""
+
+    plan: Optional[ResourcePlan] = Field(None, description="Resource plan")
+    storageClass: Optional[str] = Field(None, description="Storage class")
+    adminEmail: Optional[str] = Field(None, description="WordPress admin email")
+    blogName: Optional[str] = Field(None, description="WordPress blog name")
+    description: Optional[str] = Field(None, description="Free-form description")
+
+
+class ValuesChange(BaseModel):
+    """One changed key in a rendered values file."""
+
+    path: str
+    op: str  # added | removed | changed
+    old: Optional[Any] = None
+    new: Optional[Any] = None
+
+
+class WebsiteUpdateResponse(BaseModel):
+    """Result of a website update."""
+
+    website_id: str
+    changed_fields: List[str]
+    values_changes: List[ValuesChange]
+    pushed: bool = False
+    queued: bool = False
+    pending: bool = False  # forwarded push not confirmed by the leader
+    sync_job_id: Optional[str] = None
+
+
 class WebsiteListResponse(BaseModel):
     """Response model for website list."""
 
@@ -116,3 +147,40 @@ class ResourcePlansResponse(BaseModel):
     """Response model for available resource plans."""
 
     plans: Dict[str, ResourcePlanInfo]
+
+
+class WebsiteFilter(BaseModel):
+    """Selects websites for a bulk action; at least one field is required."""
+
+    websiteIds: Optional[List[str]] = Field(None, description="Explicit IDs")
+    cluster: Optional[str] = Field(None, description="Cluster name")
+    status: Optional[str] = Field(None, description="Website status, e.g. failed")
+    plan: Optional[ResourcePlan] = Field(None, description="Resource plan")
+    type: Optional[WebsiteType] = Field(None, description="Website type")
+    dryRun: bool = Field(False, description="Only list the matching websites")
+
+
+class WebsiteBulkDeleteRequest(WebsiteFilter):
+    """Delete every website matching the filter."""
+
+    force: bool = Field(False, description="Allow more than BULK_DELETE_MAX")
+
+
+class WebsiteBulkRestartRequest(WebsiteFilter):
+    """Rolling restart of every website matching the filter."""
+
+    force: bool = Field(False, description="Allow more than RESTART_BULK_MAX")
+    parallelism: Optional[int] = Field(
+        None, ge=1, description="Concurrent patch calls (RESTART_PARALLELISM)"
+    )
+    maxSurge: Optional[int] = Field(
+        None, ge=0, description="Namespaces rolling at once per cluster"
+    )
+
+
+class WebsiteBulkResponse(BaseModel):
+    """Websites matched by a bulk action and the job acting on them."""
+
+    website_ids: List[str]
+    matched: int
+    job_id: Optional[str] = None
@@ -0,0 +1,224 @@
+"""
+Per-tenant admission control for provisioning requests.
+
+Each (tenant, cluster) pair gets:
+- A token bucket (ADMISSION_RATE_PER_SECOND refill, ADMISSION_BURST size)
+  limiting how fast new provisioning jobs may be submitted.
+- A concurrency cap (ADMISSION_MAX_CONCURRENT) on jobs in flight. Slots are
+  leases in a sorted set, so a worker that dies without releasing its slot
+  only holds it for ADMISSION_SLOT_LEASE_SECONDS.
+
+Both checks run atomically in one Redis Lua script, so limits hold across
+API replicas. If Redis is unreachable the same algorithm runs in memory
+per process.
+"""
+
+import ipaddress
+import logging
+import math
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import redis
+from app.config import settings
+from app.database.redis import redis_client
+from app.services.metrics import metrics
+from fastapi import Request
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "idp:admission:"
+
+# KEYS: bucket, slots
+# ARGV: rate, burst, max_concurrent, now, lease, slot_id
+ADMIT_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local max_concurrent = tonumber(ARGV[3])
+local now = tonumber(ARGV[4])
+local lease = tonumber(ARGV[5])
+
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now)
+local in_flight = redis.call('ZCARD', KEYS[2])
+if in_flight >= max_concurrent then
+    local oldest = redis.call('ZRANGE', KEYS[2], 0, 0, 'WITHSCORES')
+    return {0, 'concurrency', tostring(tonumber(oldest[2]) - now)}
+end
+
+local data = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(data[1]) or burst
+local ts = tonumber(data[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+if tokens < 1 then
+    return {0, 'rate', tostring((1 - tokens) / rate)}
+end
+tokens = tokens - 1
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+redis.call('ZADD', KEYS[2], now + lease, ARGV[6])
+redis.call('EXPIRE', KEYS[2], math.ceil(lease) + 1)
+return {1, 'ok', '0'}
+"""
+
+
+def _is_trusted_proxy(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(
+        ip in ipaddress.ip_network(network, strict=False)
+        for network in settings.ADMISSION_TRUSTED_PROXIES
+    )
+
+
+@dataclass
+class AdmissionDecision:
+    """Outcome of an admission check."""
+
+    admitted: bool
+    reason: str
+    retry_after: float = 0.0
+    slot_id: Optional[str] = None
+
+
+class _LocalState:
+    """In-memory fallback state for one (tenant, cluster) pair."""
+
+    def __init__(self, burst: float, now: float):
+        self.tokens = burst
+        self.ts = now
+        self.slots: Dict[str, float] = {}
+
+
+class AdmissionController:
+    """Token-bucket rate limiting plus a concurrency cap per tenant/cluster."""
+
+    def __init__(self, client: redis.Redis = redis_client):
+        self.client = client
+        self.rate = settings.ADMISSION_RATE_PER_SECOND
+        self.burst = settings.ADMISSION_BURST
+        self.max_concurrent = settings.ADMISSION_MAX_CONCURRENT
+        self.lease = settings.ADMISSION_SLOT_LEASE_SECONDS
+        self._script = client.register_script(ADMIT_SCRIPT)
+        self._lock = threading.Lock()
+        self._local: Dict[Tuple[str, str], _LocalState] = {}
+
+    @staticmethod
+    def tenant_for(request: Request) -> str:
+        """Identify the tenant of a request.
+
+        ``X-Tenant-ID`` (set by the authenticating proxy) and
+        ``X-Forwarded-For`` are only honoured on connections from
+        ADMISSION_TRUSTED_PROXIES; anyone else is limited by their own
+        address, whatever headers they send.
+        """
+        peer = request.client.host if request.client else None
+        if peer is None:
+            return "anonymous"
+        if not _is_trusted_proxy(peer):
+            return peer
+        tenant = request.headers.get("X-Tenant-ID")
+        if tenant:
+            return tenant
+        forwarded = request.headers.get("X-Forwarded-For", "")
+        # The proxy appends the address it saw last
+        hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+        return hops[-1] if hops else peer
+
+    @staticmethod
+    def _keys(tenant: str, cluster: str) -> List[str]:
+        base = f"{KEY_PREFIX}{tenant}:{cluster}"
+        return [f"{base}:bucket", f"{base}:slots"]
+
+    def admit(self, tenant: str, cluster: str) -> AdmissionDecision:
+        """Try to admit one provisioning job for a tenant on a cluster."""
+        if not settings.ADMISSION_ENABLED:
+            return AdmissionDecision(admitted=True, reason="disabled")
+        slot_id = str(uuid.uuid4())
+        try:
+            admitted, reason, retry_after = self._script(
+                keys=self._keys(tenant, cluster),
+                args=[
+                    self.rate,
+                    self.burst,
+                    self.max_concurrent,
+                    time.time(),
+                    self.lease,
+                    slot_id,
+                ],
+            )
+            if isinstance(reason, bytes):
+                reason = reason.decode()
+            decision = AdmissionDecision(
+                admitted=bool(admitted),
+                reason=reason,
+                retry_after=float(retry_after),
+                slot_id=slot_id if admitted else None,
+            )
+        except redis.RedisError as e:
+            logger.warning(f"Admission store unavailable, using local state: {e}")
+            decision = self._admit_local(tenant, cluster, slot_id)
+
+        outcome = "admitted" if decision.admitted else "rejected"
+        metrics.inc(
+            "idp_admission_requests_total",
+            outcome=outcome,
+            reason=decision.reason,
+            cluster=cluster,
+        )
+        return decision
+
+    def _admit_local(
+        self, tenant: str, cluster: str, slot_id: str
+    ) -> AdmissionDecision:
+        now = time.time()
+        with self._lock:
+            state = self._local.get((tenant, cluster))
+            if state is None:
+                state = self._local[(tenant, cluster)] = _LocalState(self.burst, now)
+            state.slots = {s: exp for s, exp in state.slots.items() if exp > now}
+            if len(state.slots) >= self.max_concurrent:
+                return AdmissionDecision(
+                    admitted=False,
+                    reason="concurrency",
+                    retry_after=min(state.slots.values()) - now,
+                )
+            state.tokens = min(
+                self.burst, state.tokens + max(0.0, now - state.ts) * self.rate
+            )
+            state.ts = now
+            if state.tokens < 1:
+                return AdmissionDecision(
+                    admitted=False,
+                    reason="rate",
+                    retry_after=(1 - state.tokens) / self.rate,
+                )
+            state.tokens -= 1
+            state.slots[slot_id] = now + self.lease
+            return AdmissionDecision(admitted=True, reason="ok", slot_id=slot_id)
+
+    def release(self, tenant: str, cluster: str, slot_id: Optional[str]) -> None:
+        """Return a concurrency slot once the provisioning job is done."""
+        if not slot_id:
+            return
+        with self._lock:
+            state = self._local.get((tenant, cluster))
+            if state is not None:
+                state.slots.pop(slot_id, None)
+        try:
+            self.client.zrem(self._keys(tenant, cluster)[1], slot_id)
+        except redis.RedisError as e:
+            logger.warning(f"Failed to release admission slot: {e}")
+
+
+def retry_after_header(decision: AdmissionDecision) -> Dict[str, str]:
+    """Retry-After header value (whole seconds, at least 1)."""
+    return {"Retry-After": str(max(1, math.ceil(decision.retry_after)))}
+
+
+# Create singleton instance
+admission_controller = AdmissionController()
@@ -0,0 +1,178 @@
+"""
+ArgoCD service for triggering application syncs over the REST API.
+
+- One shared httpx client (keep-alive, HTTP/2, bounded connection pool).
+- Sync requests for the same application arriving within
+  ARGOCD_SYNC_COALESCE_WINDOW are collapsed into a single API call, across
+  all API and worker processes: the first request claims
+  ``idp:argocd-sync:<app>`` (SET NX, the window as TTL) and syncs once the
+  window closes, so the sync picks up every commit pushed during it.
+  Requests from other processes return straight away with status
+  ``coalesced``; requests in the claiming process share its result. If
+  Redis is unreachable, requests are only coalesced within each process.
+- A semaphore caps concurrent sync calls so bulk onboarding cannot flood
+  the ArgoCD API server.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+import redis
+from app.config import settings
+from app.database.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+SYNC_KEY_PREFIX = "idp:argocd-sync:"
+
+
+class _PendingSync:
+    """A coalesced sync shared by all callers for one application."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 1
+
+
+class ArgoCDService:
+    """Service for ArgoCD API operations."""
+
+    def __init__(
+        self,
+        server_url: Optional[str] = None,
+        auth_token: Optional[str] = None,
+        redis_conn: redis.Redis = redis_client,
+    ):
+        self.server_url = server_url or settings.ARGOCD_SERVER_URL
+        self.auth_token = auth_token or settings.ARGOCD_AUTH_TOKEN
+        self.redis = redis_conn
+        self._client: Optional[httpx.Client] = None
+        self._lock = threading.Lock()
+        self._pending: Dict[str, _PendingSync] = {}
+        self._semaphore = threading.BoundedSemaphore(
+            settings.ARGOCD_MAX_CONCURRENT_SYNCS
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.server_url)
+
+    def client(self) -> httpx.Client:
+        """Return the shared HTTP client, creating it on first use."""
+        if self._client is not None:
+            return self._client
+        with self._lock:
+            if self._client is None:
+                headers = {}
+                if self.auth_token:
+                    headers["Authorization"] = f"Bearer {self.auth_token}"
+                self._client = httpx.Client(
+                    base_url=str(self.server_url).rstrip("/"),
+                    headers=headers,
+                    http2=True,
+                    verify=settings.ARGOCD_VERIFY_TLS,
+                    timeout=settings.ARGOCD_REQUEST_TIMEOUT,
+                    limits=httpx.Limits(
+                        max_connections=settings.ARGOCD_MAX_CONNECTIONS,
+                        max_keepalive_connections=settings.ARGOCD_MAX_CONNECTIONS,
+                        keepalive_expiry=60.0,
+                    ),
+                )
+        return self._client
+
+    def application_name(self, website_id: str) -> str:
+        """ArgoCD application name generated by the ApplicationSet."""
+        return f"{settings.ARGOCD_APP_PREFIX}{website_id}"
+
+    def _claim_window(self, app_name: str) -> bool:
+        """Open the coalescing window fleet-wide.
+
+        False if another process already holds it for this application.
+        """
+        window_ms = max(1, int(settings.ARGOCD_SYNC_COALESCE_WINDOW * 1000))
+        try:
+            return bool(
+                self.redis.set(f"{SYNC_KEY_PREFIX}{app_name}", 1, nx=True, px=window_ms)
+            )
+        except redis.RedisError as e:
+            logger.warning(f"Sync coalescing limited to this process: {e}")
+            return True
+
+    def sync_application(self, app_name: str) -> Dict[str, Any]:
+        """Request a sync, coalescing concurrent requests for the same app."""
+        with self._lock:
+            pending = self._pending.get(app_name)
+            if pending is not None:
+                pending.waiters += 1
+                leader = False
+            else:
+                pending = self._pending[app_name] = _PendingSync()
+                leader = True
+
+        if not leader:
+            pending.event.wait(
+                settings.ARGOCD_SYNC_COALESCE_WINDOW + settings.ARGOCD_REQUEST_TIMEOUT
+            )
+            if pending.error is not None:
+                raise pending.error
+            return pending.result or {}
+
+        try:
+            if not self._claim_window(app_name):
+                # Another process syncs once its window closes, which picks
+                # up whatever was pushed before this request
+                with self._lock:
+                    self._pending.pop(app_name, None)
+                logger.info(f"Sync for {app_name} coalesced into another process")
+                pending.result = {"application": app_name, "status": "coalesced"}
+                return pending.result
+
+            # Leader: hold the window open so later requests join this sync
+            time.sleep(settings.ARGOCD_SYNC_COALESCE_WINDOW)
+            with self._lock:
+                # New requests from here on start a fresh sync
+                self._pending.pop(app_name, None)
+            with self._semaphore:
+                pending.result = self._post_sync(app_name)
+            if pending.waiters > 1:
+                logger.info(
+                    f"Coalesced {pending.waiters} sync requests for {app_name}"
+                )
+            return pending.result
+        except BaseException as e:
+            pending.error = e
+            raise
+        finally:
+            pending.event.set()
+
+    def _post_sync(self, app_name: str) -> Dict[str, Any]:
+        response = self.client().post(
+            f"/api/v1/applications/{app_name}/sync",
+            json={"prune": False, "dryRun": False},
+        )
+        if (
+            response.status_code == 400
+            and "already in progress" in response.text.lower()
+        ):
+            # A sync that is already running will pick up the latest commit
+            logger.info(f"Sync already in progress for {app_name}")
+            return {"application": app_name, "status": "in_progress"}
+        response.raise_for_status()
+        logger.info(f"Triggered ArgoCD sync for {app_name}")
+        return response.json()
+
+    def close(self) -> None:
+        """Close the shared HTTP client."""
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+
+# Create singleton instance
+argocd_service = ArgoCDService()
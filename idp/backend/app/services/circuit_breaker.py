@@ -0,0 +1,88 @@
+"""
+Minimal circuit breaker.
+
+closed    -> calls go through; FAILURE_THRESHOLD consecutive failures open it.
+open      -> calls are refused until RESET_TIMEOUT has passed.
+half_open -> one probe call per RESET_TIMEOUT is let through; success
+             closes the breaker, failure opens it again.
+"""
+
+import threading
+import time
+
+from app.services.metrics import metrics
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    """Thread-safe circuit breaker for calls to an unreliable dependency."""
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started_at: float | None = None
+        self._publish()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if (
+            self._state == OPEN
+            and time.monotonic() - self._opened_at >= self.reset_timeout
+        ):
+            self._state = HALF_OPEN
+            self._probe_started_at = None
+            self._publish()
+        return self._state
+
+    def _publish(self) -> None:
+        metrics.set_gauge(
+            "idp_circuit_breaker_state", _STATE_VALUES[self._state], breaker=self.name
+        )
+
+    def allow(self) -> bool:
+        """Return True if a call may be attempted now."""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN:
+                # A probe whose outcome was never recorded expires
+                now = time.monotonic()
+                if (
+                    self._probe_started_at is None
+                    or now - self._probe_started_at >= self.reset_timeout
+                ):
+                    self._probe_started_at = now
+                    return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probe_started_at = None
+            self._publish()
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._probe_started_at = None
+                metrics.inc("idp_circuit_breaker_opened_total", breaker=self.name)
+            self._publish()
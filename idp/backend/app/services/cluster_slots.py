@@ -0,0 +1,75 @@
+"""
+Per-cluster concurrency limits shared by all RQ workers.
+
+Each cluster has a counting semaphore in Redis (a sorted set of leases), so
+at most CLUSTER_MAX_CONCURRENT_JOBS jobs (or the cluster's entry in
+CLUSTER_CONCURRENCY_OVERRIDES) touch one cluster at a time across every
+worker process. Leases expire after CLUSTER_SLOT_LEASE_SECONDS, so a
+crashed worker cannot hold a slot forever.
+"""
+
+import logging
+import time
+import uuid
+from typing import Optional
+
+import redis
+from app.config import settings
+from app.database.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "idp:cluster-slots:"
+
+# KEYS: slots; ARGV: limit, now, lease, token
+ACQUIRE_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[2])
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], tonumber(ARGV[2]) + tonumber(ARGV[3]), ARGV[4])
+redis.call('EXPIRE', KEYS[1], math.ceil(tonumber(ARGV[3])) + 1)
+return 1
+"""
+
+
+class ClusterSlots:
+    """Redis-backed counting semaphore per cluster."""
+
+    def __init__(self, client: redis.Redis = redis_client):
+        self.client = client
+        self._script = client.register_script(ACQUIRE_SCRIPT)
+
+    @staticmethod
+    def limit_for(cluster: str) -> int:
+        return settings.CLUSTER_CONCURRENCY_OVERRIDES.get(
+            cluster, settings.CLUSTER_MAX_CONCURRENT_JOBS
+        )
+
+    def acquire(self, cluster: str) -> Optional[str]:
+        """Take a slot for ``cluster``; returns a token or None if full."""
+        token = str(uuid.uuid4())
+        acquired = self._script(
+            keys=[KEY_PREFIX + cluster],
+            args=[
+                self.limit_for(cluster),
+                time.time(),
+                settings.CLUSTER_SLOT_LEASE_SECONDS,
+                token,
+            ],
+        )
+        return token if acquired else None
+
+    def release(self, cluster: str, token: str) -> None:
+        try:
+            self.client.zrem(KEY_PREFIX + cluster, token)
+        except redis.RedisError as e:
+            logger.warning(f"Failed to release slot for cluster {cluster}: {e}")
+
+    def in_use(self, cluster: str) -> int:
+        key = KEY_PREFIX + cluster
+        return int(self.client.zcount(key, time.time(), "+inf"))
+
+
+# Create singleton instance
+cluster_slots = ClusterSlots()
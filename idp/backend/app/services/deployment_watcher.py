@@ -0,0 +1,577 @@
+"""
+Deployment verification over a single shared Kubernetes watch.
+
+One elected process (see ``LeaderElector``) runs a cluster-wide watch per
+resource kind (deployments, ingresses, pods) and Kubernetes context, and
+keeps the readiness of the namespaces being waited on. Provisioning jobs,
+including forked RQ work horses, only register interest in Redis:
+- ``track`` adds a registration to the ``idp:rollouts`` hash and returns;
+- ``wait`` also blocks on ``idp:rollout-result:<token>`` for the outcome.
+Hundreds of concurrent rollouts therefore cost three watch connections per
+cluster in total instead of one poll loop each, and nothing is lost when a
+short-lived job process exits.
+
+The leader picks up new registrations every DEPLOYMENT_STATUS_FLUSH_INTERVAL,
+seeds their namespace from a namespaced list (later watch events take
+precedence), expires rollouts that exceed their deadline and hands finished
+ones to the status write-behind buffer in its own long-lived process.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import redis
+from app.config import settings
+from app.database.models import WebsiteStatusEnum
+from app.database.redis import redis_client
+from app.services.kubernetes_service import KubernetesService, kubernetes_service
+from app.services.leader_election import LeaderElector
+from app.services.status_buffer import status_buffer
+from kubernetes import watch
+from kubernetes.client.rest import ApiException
+
+logger = logging.getLogger(__name__)
+
+ROLLOUTS_KEY = "idp:rollouts"
+RESULT_PREFIX = "idp:rollout-result:"
+# How long an outcome waits for a ``wait`` caller to collect it
+RESULT_TTL = 300
+
+# Container waiting reasons worth surfacing when a rollout times out
+POD_PROBLEM_REASONS = {
+    "CrashLoopBackOff",
+    "ImagePullBackOff",
+    "ErrImagePull",
+    "CreateContainerConfigError",
+    "InvalidImageName",
+}
+
+# (Kubernetes context, namespace); None is the default context
+NamespaceKey = Tuple[Optional[str], str]
+
+
+class _NamespaceState:
+    """Latest observed readiness of the objects in one namespace."""
+
+    def __init__(self):
+        self.deployments: Dict[str, bool] = {}
+        self.ingresses: Dict[str, bool] = {}
+        self.pod_problem: Optional[str] = None
+        self.generations: Dict[str, int] = {}
+        # Deployments only count as ready from this generation on (restarts)
+        self.min_generations: Dict[str, int] = {}
+
+    def is_ready(self, require_ingress: bool) -> bool:
+        if not self.deployments or not all(self.deployments.values()):
+            return False
+        if require_ingress:
+            return bool(self.ingresses) and any(self.ingresses.values())
+        return True
+
+
+class Rollout:
+    """A single job's interest in a namespace becoming ready."""
+
+    def __init__(
+        self,
+        namespace: str,
+        website_id: str,
+        deadline: float,
+        context: Optional[str] = None,
+        generations: Optional[Dict[str, int]] = None,
+        record_status: bool = True,
+        token: Optional[str] = None,
+    ):
+        self.token = token or uuid.uuid4().hex
+        self.namespace = namespace
+        self.website_id = website_id
+        self.deadline = deadline  # epoch seconds, shared across hosts
+        self.context = context
+        self.generations = generations or {}
+        self.record_status = record_status
+        self.ready = False
+        self.reason: Optional[str] = None
+        self.finished_at: Optional[datetime] = None
+
+    @property
+    def key(self) -> NamespaceKey:
+        return (self.context, self.namespace)
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "namespace": self.namespace,
+                "website_id": self.website_id,
+                "deadline": self.deadline,
+                "context": self.context,
+                "generations": self.generations,
+                "record_status": self.record_status,
+            }
+        )
+
+    @classmethod
+    def from_json(cls, token: str, raw: str) -> "Rollout":
+        return cls(token=token, **json.loads(raw))
+
+
+def _deployment_ready(deployment) -> bool:
+    spec_replicas = deployment.spec.replicas if deployment.spec else 1
+    status = deployment.status
+    if status is None:
+        return False
+    if (status.observed_generation or 0) < (deployment.metadata.generation or 0):
+        return False
+    desired = 1 if spec_replicas is None else spec_replicas
+    return (status.updated_replicas or 0) >= desired and (
+        status.available_replicas or 0
+    ) >= desired
+
+
+def _ingress_ready(ingress) -> bool:
+    status = ingress.status
+    return bool(
+        status and status.load_balancer and status.load_balancer.ingress
+    )
+
+
+def _pod_problem(pod) -> Optional[str]:
+    statuses = (pod.status.container_statuses if pod.status else None) or []
+    for cs in statuses:
+        waiting = cs.state.waiting if cs.state else None
+        if waiting and waiting.reason in POD_PROBLEM_REASONS:
+            return f"pod {pod.metadata.name}: {waiting.reason}"
+    return None
+
+
+class DeploymentWatcher:
+    """Multiplexes one set of watch streams across all in-flight rollouts."""
+
+    def __init__(
+        self,
+        kube: KubernetesService = kubernetes_service,
+        client: redis.Redis = redis_client,
+    ):
+        self.kube = kube
+        self.client = client
+        self.require_ingress = settings.DEPLOYMENT_VERIFY_REQUIRE_INGRESS
+        self.elector = LeaderElector("deployment-watcher", client)
+        self._lock = threading.Lock()
+        self._namespaces: Dict[NamespaceKey, _NamespaceState] = {}
+        self._rollouts: Dict[NamespaceKey, List[Rollout]] = {}
+        self._finished: List[Rollout] = []
+        # Contexts with running watch threads, for the current leadership term
+        self._watched: Dict[Optional[str], List[threading.Thread]] = {}
+        self._sync_thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    # --- Registration (any process) ---
+    def track(
+        self,
+        namespace: str,
+        website_id: str,
+        timeout: Optional[float] = None,
+        context: Optional[str] = None,
+        generations: Optional[Dict[str, int]] = None,
+        record_status: bool = True,
+    ) -> Rollout:
+        """Register interest in a namespace and return without waiting.
+
+        With ``record_status`` the outcome is written to the website row
+        (RUNNING and ``deployed_at``, or FAILED). ``generations`` makes
+        deployments count as not ready until they reach them; pass the
+        generations returned by a patch (e.g. a restart) so an event from
+        before the patch cannot end the wait.
+        """
+        timeout = timeout or settings.DEPLOYMENT_VERIFY_TIMEOUT
+        rollout = Rollout(
+            namespace,
+            website_id,
+            time.time() + timeout,
+            context=context,
+            generations=generations,
+            record_status=record_status,
+        )
+        try:
+            self.client.hset(ROLLOUTS_KEY, rollout.token, rollout.to_json())
+        except redis.RedisError as e:
+            logger.error(f"Cannot register rollout of {website_id}: {e}")
+            rollout.reason = f"deployment watcher unavailable: {e}"
+            rollout.finished_at = datetime.utcnow()
+        return rollout
+
+    def wait(
+        self,
+        namespace: str,
+        website_id: str,
+        timeout: Optional[float] = None,
+        context: Optional[str] = None,
+        generations: Optional[Dict[str, int]] = None,
+        record_status: bool = True,
+    ) -> Rollout:
+        """Track a namespace and block until it is ready or times out."""
+        rollout = self.track(
+            namespace, website_id, timeout, context, generations, record_status
+        )
+        if rollout.finished_at is not None:
+            return rollout
+        # The leader expires overdue rollouts on its next pass
+        grace = 2 * settings.DEPLOYMENT_STATUS_FLUSH_INTERVAL + 5
+        blpop_timeout = max(1, int(rollout.deadline - time.time() + grace))
+        try:
+            reply = self.client.blpop(
+                [RESULT_PREFIX + rollout.token], timeout=blpop_timeout
+            )
+        except redis.RedisError as e:
+            reply = None
+            rollout.reason = f"deployment watcher unavailable: {e}"
+        if reply is None:
+            rollout.reason = rollout.reason or "no answer from the deployment watcher"
+            try:
+                self.client.hdel(ROLLOUTS_KEY, rollout.token)
+            except redis.RedisError:
+                pass
+        else:
+            result = json.loads(reply[1])
+            rollout.ready = result["ready"]
+            rollout.reason = result["reason"]
+        rollout.finished_at = datetime.utcnow()
+        return rollout
+
+    def in_flight(self) -> int:
+        """Rollouts followed by this process (only non-zero on the leader)."""
+        with self._lock:
+            return sum(len(r) for r in self._rollouts.values())
+
+    # --- Lifecycle (long-lived processes: API and worker main process) ---
+    def start(self) -> None:
+        """Campaign for leadership; the leader runs the watches."""
+        if not settings.LEADER_ELECTION_ENABLED:
+            self._serve()
+            return
+        self.elector.start(self._serve, self._stop_serving)
+
+    def stop(self) -> None:
+        """Release leadership and flush pending status updates."""
+        if settings.LEADER_ELECTION_ENABLED:
+            self.elector.stop()
+        else:
+            self._stop_serving()
+
+    def _serve(self) -> None:
+        if self._sync_thread and self._sync_thread.is_alive():
+            return
+        # Each leadership term gets its own stop event, so threads from a
+        # previous term stay stopped
+        self._stop_event = threading.Event()
+        self._sync_thread = threading.Thread(
+            target=self._sync_loop,
+            args=(self._stop_event,),
+            name="deployment-watch-sync",
+            daemon=True,
+        )
+        self._sync_thread.start()
+
+    def _stop_serving(self) -> None:
+        self._stop_event.set()
+        threads = [t for ts in self._watched.values() for t in ts]
+        if self._sync_thread:
+            threads.append(self._sync_thread)
+        for t in threads:
+            # Watch threads may be blocked on a read; they are daemons
+            t.join(timeout=1)
+        self._sync_thread = None
+        try:
+            self.sync(load=False)
+        except redis.RedisError as e:
+            logger.warning(f"Could not publish rollout results: {e}")
+        with self._lock:
+            # Registrations stay in Redis for the next leader
+            self._watched = {}
+            self._namespaces = {}
+            self._rollouts = {}
+            self._finished = []
+        status_buffer.flush()
+
+    def _after_fork(self) -> None:
+        # Work horses only register and wait; the watches stay in the parent
+        self._lock = threading.Lock()
+        self.elector = LeaderElector("deployment-watcher", self.client)
+        self._namespaces = {}
+        self._rollouts = {}
+        self._finished = []
+        self._watched = {}
+        self._sync_thread = None
+        self._stop_event = threading.Event()
+
+    # --- Registrations (leader) ---
+    def sync(self, load: bool = True) -> int:
+        """Pick up new registrations, expire overdue ones, publish results.
+
+        Returns the number of rollouts that finished.
+        """
+        if load:
+            registrations = self.client.hgetall(ROLLOUTS_KEY)
+            with self._lock:
+                known = {r.token for r in self._finished}
+                for rollouts in self._rollouts.values():
+                    known.update(r.token for r in rollouts)
+            for token, raw in registrations.items():
+                token = token.decode() if isinstance(token, bytes) else token
+                if token not in known:
+                    self._add(Rollout.from_json(token, raw))
+        with self._lock:
+            self._expire_locked()
+            finished, self._finished = self._finished, []
+        if not finished:
+            return 0
+        try:
+            pipe = self.client.pipeline()
+            for rollout in finished:
+                result_key = RESULT_PREFIX + rollout.token
+                pipe.rpush(
+                    result_key,
+                    json.dumps({"ready": rollout.ready, "reason": rollout.reason}),
+                )
+                pipe.expire(result_key, RESULT_TTL)
+                pipe.hdel(ROLLOUTS_KEY, rollout.token)
+            pipe.execute()
+        except redis.RedisError:
+            with self._lock:
+                self._finished = finished + self._finished
+            raise
+        for rollout in finished:
+            if not rollout.record_status:
+                continue
+            if rollout.ready:
+                status_buffer.record(
+                    rollout.website_id,
+                    status=WebsiteStatusEnum.RUNNING,
+                    deployed_at=rollout.finished_at,
+                )
+            else:
+                status_buffer.record(
+                    rollout.website_id, status=WebsiteStatusEnum.FAILED
+                )
+        return len(finished)
+
+    def _add(self, rollout: Rollout) -> None:
+        try:
+            self._ensure_watching(rollout.context)
+        except Exception as e:
+            # Still tracked, so the rollout fails at its deadline
+            logger.error(f"Cannot watch context {rollout.context or 'default'}: {e}")
+        with self._lock:
+            fresh = rollout.key not in self._namespaces
+            state = self._state(rollout.key)
+            for name, generation in rollout.generations.items():
+                if state.generations.get(name, 0) >= generation:
+                    continue  # the watch has already seen this generation
+                state.min_generations[name] = generation
+                state.deployments[name] = False
+            self._rollouts.setdefault(rollout.key, []).append(rollout)
+        if fresh:
+            self._seed(rollout.key)
+        with self._lock:
+            self._check_locked(rollout.key)
+
+    def _seed(self, key: NamespaceKey) -> None:
+        """Fill a newly tracked namespace's state from a namespaced list."""
+        context, namespace = key
+        kwargs = {}
+        if settings.DEPLOYMENT_WATCH_LABEL_SELECTOR:
+            kwargs["label_selector"] = settings.DEPLOYMENT_WATCH_LABEL_SELECTOR
+        try:
+            deployments = self.kube.apps_v1(context).list_namespaced_deployment(
+                namespace, **kwargs
+            )
+            ingresses = self.kube.networking_v1(context).list_namespaced_ingress(
+                namespace, **kwargs
+            )
+            pods = self.kube.core_v1(context).list_namespaced_pod(namespace, **kwargs)
+        except Exception as e:
+            # The watch will still report the namespace's objects as they change
+            logger.warning(f"Could not list {namespace} ({context or 'default'}): {e}")
+            return
+        with self._lock:
+            state = self._namespaces.get(key)
+            if state is None:
+                return
+            # Anything the watch reported meanwhile is newer than the list
+            for deployment in deployments.items:
+                if deployment.metadata.name not in state.generations:
+                    self._on_deployment(context, "ADDED", deployment, check=False)
+            for ingress in ingresses.items:
+                if ingress.metadata.name not in state.ingresses:
+                    self._on_ingress(context, "ADDED", ingress, check=False)
+            if state.pod_problem is None:
+                problems = filter(None, map(_pod_problem, pods.items))
+                state.pod_problem = next(problems, None)
+
+    def _ensure_watching(self, context: Optional[str]) -> None:
+        with self._lock:
+            threads = self._watched.get(context)
+            if threads and all(t.is_alive() for t in threads):
+                return
+            apps = self.kube.apps_v1(context)
+            networking = self.kube.networking_v1(context)
+            core = self.kube.core_v1(context)
+            targets = {
+                "deployments": (
+                    apps.list_deployment_for_all_namespaces,
+                    self._on_deployment,
+                ),
+                "ingresses": (
+                    networking.list_ingress_for_all_namespaces,
+                    self._on_ingress,
+                ),
+                "pods": (core.list_pod_for_all_namespaces, self._on_pod),
+            }
+            threads = [
+                threading.Thread(
+                    target=self._watch_loop,
+                    args=(context, list_func, handler, self._stop_event),
+                    name=f"deployment-watch-{kind}-{context or 'default'}",
+                    daemon=True,
+                )
+                for kind, (list_func, handler) in targets.items()
+            ]
+            self._watched[context] = threads
+            for t in threads:
+                t.start()
+
+    # --- Watch handling ---
+    def _watch_loop(
+        self,
+        context: Optional[str],
+        list_func: Callable,
+        handler: Callable,
+        stop_event: threading.Event,
+    ) -> None:
+        resource_version = None
+        while not stop_event.is_set():
+            w = watch.Watch()
+            kwargs = {"timeout_seconds": 300}
+            if settings.DEPLOYMENT_WATCH_LABEL_SELECTOR:
+                kwargs["label_selector"] = settings.DEPLOYMENT_WATCH_LABEL_SELECTOR
+            if resource_version:
+                kwargs["resource_version"] = resource_version
+            try:
+                for event in w.stream(list_func, **kwargs):
+                    if stop_event.is_set():
+                        w.stop()
+                        break
+                    obj = event["object"]
+                    with self._lock:
+                        handler(context, event["type"], obj)
+                resource_version = w.resource_version
+            except ApiException as e:
+                if e.status == 410:
+                    # Resource version too old: relist from scratch
+                    resource_version = None
+                else:
+                    logger.warning(f"Deployment watch error: {e}")
+                    stop_event.wait(5)
+            except Exception as e:
+                logger.warning(f"Deployment watch error: {e}")
+                stop_event.wait(5)
+
+    def _state(self, key: NamespaceKey) -> _NamespaceState:
+        state = self._namespaces.get(key)
+        if state is None:
+            state = self._namespaces[key] = _NamespaceState()
+        return state
+
+    def _on_deployment(
+        self, context: Optional[str], event_type: str, deployment, check: bool = True
+    ) -> None:
+        key = (context, deployment.metadata.namespace)
+        state = self._namespaces.get(key)
+        if state is None:
+            return  # nobody is waiting on this namespace
+        name = deployment.metadata.name
+        if event_type == "DELETED":
+            state.deployments.pop(name, None)
+            state.generations.pop(name, None)
+            state.min_generations.pop(name, None)
+        else:
+            generation = deployment.metadata.generation or 0
+            state.generations[name] = generation
+            current = generation >= state.min_generations.get(name, 0)
+            state.deployments[name] = current and _deployment_ready(deployment)
+            if current:
+                state.min_generations.pop(name, None)
+        if check:
+            self._check_locked(key)
+
+    def _on_ingress(
+        self, context: Optional[str], event_type: str, ingress, check: bool = True
+    ) -> None:
+        key = (context, ingress.metadata.namespace)
+        state = self._namespaces.get(key)
+        if state is None:
+            return
+        if event_type == "DELETED":
+            state.ingresses.pop(ingress.metadata.name, None)
+        else:
+            state.ingresses[ingress.metadata.name] = _ingress_ready(ingress)
+        if check:
+            self._check_locked(key)
+
+    def _on_pod(self, context: Optional[str], event_type: str, pod) -> None:
+        if event_type == "DELETED":
+            return
+        state = self._namespaces.get((context, pod.metadata.namespace))
+        if state is not None:
+            state.pod_problem = _pod_problem(pod)
+
+    def _check_locked(self, key: NamespaceKey) -> None:
+        state = self._namespaces.get(key)
+        if state and key in self._rollouts and state.is_ready(self.require_ingress):
+            self._finish_locked(key)
+
+    def _finish_locked(self, key: NamespaceKey) -> None:
+        now = datetime.utcnow()
+        for rollout in self._rollouts.pop(key, []):
+            rollout.ready = True
+            rollout.finished_at = now
+            self._finished.append(rollout)
+        # Untracked namespaces are not kept
+        self._namespaces.pop(key, None)
+
+    # --- Deadlines ---
+    def _expire_locked(self) -> None:
+        now = time.time()
+        for key, rollouts in list(self._rollouts.items()):
+            expired = [r for r in rollouts if r.deadline <= now]
+            if not expired:
+                continue
+            state = self._namespaces.get(key)
+            reason = "rollout timed out"
+            if state and state.pod_problem:
+                reason = f"{reason} ({state.pod_problem})"
+            self._rollouts[key] = [r for r in rollouts if r.deadline > now]
+            for rollout in expired:
+                rollout.reason = reason
+                rollout.finished_at = datetime.utcnow()
+                self._finished.append(rollout)
+            if not self._rollouts[key]:
+                del self._rollouts[key]
+                self._namespaces.pop(key, None)
+
+    def _sync_loop(self, stop_event: threading.Event) -> None:
+        while not stop_event.wait(settings.DEPLOYMENT_STATUS_FLUSH_INTERVAL):
+            try:
+                self.sync()
+            except Exception as e:
+                logger.error(f"Failed to sync deployment rollouts: {e}")
+
+
+# Create singleton instance
+deployment_watcher = DeploymentWatcher()
+os.register_at_fork(after_in_child=deployment_watcher._after_fork)
@@ -0,0 +1,136 @@
+"""
+Periodic maintenance of the values repository.
+
+Run on the values pipeline leader every GIT_MAINTENANCE_INTERVAL seconds:
+- removes per-push worktrees and temp branches left by interrupted pushes
+  and runs ``git worktree prune``;
+- ``git maintenance`` tasks: loose-objects, incremental-repack (which also
+  writes the multi-pack-index) and commit-graph;
+- prunes unreachable objects (old temporary worktree branches) older than
+  GIT_PRUNE_EXPIRE.
+
+A run never overlaps a push: it only starts if it can take both the local
+push lock and the Redis branch lock without waiting, and is skipped
+otherwise. Each step's duration is recorded in idp_git_maintenance_seconds.
+"""
+
+import logging
+import shutil
+import threading
+import time
+from typing import Optional
+
+from app.config import settings
+from app.services.github_service import TEMP_BRANCH_PREFIX, GitHubService
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+MAINTENANCE_TASKS = ("loose-objects", "incremental-repack", "commit-graph")
+
+
+class GitMaintenance:
+    """Scheduled housekeeping for ``GitHubService.repo_path``."""
+
+    def __init__(self, service: GitHubService, push_lock: threading.Lock):
+        self.service = service
+        self.push_lock = push_lock
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._loop, name="git-maintenance", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _loop(self) -> None:
+        # Leave the first slot to pushes right after startup/failover
+        while not self._stop_event.wait(settings.GIT_MAINTENANCE_INTERVAL):
+            try:
+                self.run()
+            except Exception as e:
+                logger.error(f"Git maintenance error: {e}")
+
+    def run(self) -> bool:
+        """Run one maintenance pass; returns False if it was skipped."""
+        if not self.push_lock.acquire(blocking=False):
+            metrics.inc("idp_git_maintenance_runs_total", result="skipped")
+            return False
+        try:
+            branch = self.service.target_branch
+            with self.service._branch_lock(branch, blocking_timeout=0) as acquired:
+                if not acquired:
+                    metrics.inc("idp_git_maintenance_runs_total", result="skipped")
+                    return False
+                started = time.monotonic()
+                ok = self._run_steps()
+        finally:
+            self.push_lock.release()
+        metrics.observe(
+            "idp_git_maintenance_seconds", time.monotonic() - started, task="total"
+        )
+        metrics.inc(
+            "idp_git_maintenance_runs_total", result="ok" if ok else "failed"
+        )
+        return True
+
+    def _run_steps(self) -> bool:
+        ok = self._step("worktrees", self._prune_worktrees)
+        for task in MAINTENANCE_TASKS:
+            ok &= self._step(
+                task, lambda: self._git(["maintenance", "run", f"--task={task}"])
+            )
+        ok &= self._step(
+            "prune",
+            lambda: self._git(["prune", f"--expire={settings.GIT_PRUNE_EXPIRE}"]),
+        )
+        return ok
+
+    def _step(self, name: str, func) -> bool:
+        started = time.monotonic()
+        ok = func()
+        elapsed = time.monotonic() - started
+        metrics.observe("idp_git_maintenance_seconds", elapsed, task=name)
+        if not ok:
+            logger.warning(f"Git maintenance step '{name}' failed")
+        return ok
+
+    def _git(self, args) -> bool:
+        ok, output = self.service.git_command(args)
+        if not ok:
+            logger.warning(output)
+        return ok
+
+    def _prune_worktrees(self) -> bool:
+        """Drop worktrees and temp branches left by interrupted pushes.
+
+        Runs under the branch lock, so no push of this host is in flight.
+        """
+        leftovers = self.service.values_worktrees_dir
+        if leftovers.exists():
+            for leftover in leftovers.iterdir():
+                self._git(["worktree", "remove", "-f", str(leftover)])
+            shutil.rmtree(leftovers, ignore_errors=True)
+        ok = self._git(["worktree", "prune"])
+        # Only present if a push died before its cleanup ran
+        listed, output = self.service.git_command(
+            [
+                "for-each-ref",
+                "--format=%(refname:short)",
+                f"refs/heads/{TEMP_BRANCH_PREFIX}*",
+            ]
+        )
+        branches = output.split() if listed else []
+        if branches:
+            ok &= self._git(["branch", "-D"] + branches)
+        return ok
@@ -6,48 +6,132 @@ Enhancements:
 - Directory watcher that auto-detects new values files.
 - Target branch configurable via ENV IDP_VALUES_BRANCH (default main).
 - Safe push to main using a temporary worktree to avoid merges.
+- Pushes serialized across hosts by a Redis lock per target branch; a
+  rejected (non-fast-forward) push is rebased onto the new tip and retried
+  with jittered exponential backoff.
+- Checkout bootstrapped as a sparse, shallow, blobless clone and fetched
+  shallowly (see ``RepoCheckout``).
+- Values files found through the manifest of ``ValuesLayout`` (flat or
+  sharded); worktree pushes copy only files whose hash changed.
 """
 
+import logging
 import os
+import random
 import shutil
 import subprocess
 import threading
 import time
+import uuid
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import List
+from typing import Iterator, List, Optional, Sequence
+
+import redis
+from app.config import settings
+from app.database.redis import redis_client
+from app.services.metrics import metrics
+from app.services.process_registry import JobCancelledError, process_registry
+from app.services.repo_checkout import RepoCheckout
+from app.services.tracing import tracer
+from app.services.values_layout import MANIFEST_NAME, ValuesLayout
+from redis.exceptions import LockError
+
+VALUES_PATH = "idp/backend/website-template/values"
+# Pathspecs of everything committed from the values directory. Without
+# :(glob) magic ``*`` also matches "/", so sharded files are included.
+VALUES_PATHSPECS = [f"{VALUES_PATH}/*.yaml", f"{VALUES_PATH}/{MANIFEST_NAME}"]
+
+logger = logging.getLogger(__name__)
+
+# Temporary branches of worktree pushes are named <prefix><random suffix>
+TEMP_BRANCH_PREFIX = "_values_main_tmp-"
+# Global options that take the next argument as their value
+GIT_OPTIONS_WITH_VALUE = {"-C", "-c", "--git-dir", "--work-tree", "--namespace"}
+# Markers git prints when the remote has moved on since our fetch
+PUSH_REJECTED_MARKERS = ("non-fast-forward", "fetch first", "[rejected]")
+# Markers of a remote that could not be reached or did not answer (as
+# opposed to one that refused the change, e.g. a hook or a conflict)
+TRANSPORT_ERROR_MARKERS = (
+    "could not resolve host",
+    "could not read from remote repository",
+    "connection refused",
+    "connection reset",
+    "connection timed out",
+    "operation timed out",
+    "failed to connect",
+    "the remote end hung up unexpectedly",
+    "early eof",
+    "rpc failed",
+    "returned error: 5",
+    "ssl",
+    "git command timed out",
+)
+
+
+def is_transport_error(output: str) -> bool:
+    """True if git ``output`` says the remote was unreachable or timed out."""
+    output = output.lower()
+    return any(marker in output for marker in TRANSPORT_ERROR_MARKERS)
+
+
+def git_subcommand(cmd: Sequence[str]) -> str:
+    """The git subcommand of ``cmd``, skipping global options.
+
+    ``["-C", dir, "push", ...]`` -> ``"push"``.
+    """
+    args = iter(cmd)
+    for arg in args:
+        if arg in GIT_OPTIONS_WITH_VALUE:
+            next(args, None)
+        elif not arg.startswith("-"):
+            return arg
+    return "unknown"
 
 
 class GitHubService:
     """Service for automatic GitHub operations."""
 
-    def __init__(self, repo_path: str = "/home/sirwan/apps-repo"):
-        self.repo_path = Path(repo_path)
-        self.values_dir = (
-            self.repo_path / "idp" / "backend" / "website-template" / "values"
-        )
+    def __init__(self, repo_path: Optional[str] = None):
+        self.repo_path = Path(repo_path or settings.GIT_REPO_PATH)
+        self.checkout = RepoCheckout(self.repo_path)
+        self.values_dir = self.repo_path / VALUES_PATH
+        self.layout = ValuesLayout(self.values_dir)
         self._watcher_thread: threading.Thread | None = None
         self._stop_event = threading.Event()
         self._known_files: set[str] = set()
         # Branch to push to (default main, override with ENV IDP_VALUES_BRANCH)
         self.target_branch = os.getenv("IDP_VALUES_BRANCH", "main")
 
+    @property
+    def values_worktrees_dir(self) -> Path:
+        """Parent of the per-push worktrees of ``_push_values_to_main_worktree``."""
+        return self.repo_path / ".git" / "_values_worktrees"
+
     def set_target_branch(self, branch: str) -> None:
         """Explicitly set the target branch for pushes."""
         self.target_branch = branch
-        print(f"[GitHubService] Target branch set to: {branch}")
+        logger.info(f"Target branch set to: {branch}")
 
-    def git_command(self, cmd: List[str]) -> tuple[bool, str]:
+    def git_command(
+        self, cmd: List[str], timeout: Optional[float] = None
+    ) -> tuple[bool, str]:
         """Execute git command and return success status and output."""
         try:
-            result = subprocess.run(
-                ["git"] + cmd,
-                cwd=self.repo_path,
-                capture_output=True,
-                text=True,
-                check=True,
-            )
+            # Runs in its own process group so job cancellation can kill it
+            with tracer.span(f"git {git_subcommand(cmd)}"):
+                result = process_registry.run(
+                    ["git"] + cmd,
+                    cwd=self.repo_path,
+                    check=True,
+                    timeout=timeout,
+                )
             return True, result.stdout
+        except JobCancelledError:
+            raise
+        except subprocess.TimeoutExpired:
+            return False, f"Git command timed out after {timeout:.0f}s"
         except subprocess.CalledProcessError as e:
             return False, f"Git command failed: {e.stderr}"
         except Exception as e:
@@ -70,8 +154,9 @@ class GitHubService:
 
     def add_values_files(self) -> tuple[bool, str]:
         """Add all values files in the website-template directory."""
-        values_pattern = "idp/backend/website-template/values/*.yaml"
-        success, output = self.git_command(["add", values_pattern])
+        # Build the manifest of a pre-manifest directory before staging it
+        self.layout.manifest()
+        success, output = self.git_command(["add", "--"] + VALUES_PATHSPECS)
         return success, output
 
     def commit_values(
@@ -87,6 +172,11 @@ class GitHubService:
             f"Generated by: Website IDP Backend"
         )
 
+        # Nothing staged (e.g. retrying after a failed push): not an error
+        no_changes, _ = self.git_command(["diff", "--cached", "--quiet"])
+        if no_changes:
+            return True, "Nothing to commit"
+
         success, output = self.git_command(["commit", "-m", commit_message])
         return success, output
 
@@ -99,35 +189,153 @@ class GitHubService:
     def push_to_remote(self, branch: str | None = None) -> tuple[bool, str]:
         """Push current branch to remote."""
         target = branch or self.target_branch
-        return self.git_command(["push", "origin", target])
+        return self._push_with_retry(self.repo_path, target, values_only=False)
+
+    # --- Cross-host serialization and optimistic push ---
+    @contextmanager
+    def _branch_lock(
+        self, branch: str, blocking_timeout: float | None = None
+    ) -> Iterator[Optional[bool]]:
+        """Hold the Redis lock that serializes writers to ``branch``.
+
+        Yields True once acquired, False if ``blocking_timeout`` ran out
+        (callers must not write) and None if Redis is unreachable, in which
+        case writers proceed and rely on rebase-retry and per-push names.
+        """
+        if blocking_timeout is None:
+            blocking_timeout = settings.GIT_LOCK_WAIT_TIMEOUT
+        lock = redis_client.lock(
+            f"idp:git-lock:{branch}",
+            timeout=settings.GIT_LOCK_TIMEOUT,
+            blocking_timeout=blocking_timeout,
+        )
+        started = time.monotonic()
+        try:
+            with tracer.span("git lock wait", branch=branch):
+                acquired = lock.acquire()
+        except redis.RedisError as e:
+            # Rebase-retry still protects us, just with more contention
+            logger.warning(f"Branch lock unavailable, continuing: {e}")
+            acquired = None
+        metrics.observe(
+            "idp_git_lock_wait_seconds", time.monotonic() - started, branch=branch
+        )
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                try:
+                    lock.release()
+                except (LockError, redis.RedisError):
+                    pass
+
+    def _push_with_retry(
+        self, worktree: Path, branch: str, values_only: bool = True
+    ) -> tuple[bool, str]:
+        """Push HEAD to ``branch``, rebasing and retrying when rejected.
+
+        With ``values_only`` the last commit (the values commit) is replayed
+        onto the fetched tip with ``rebase --onto``; otherwise the whole
+        local branch is rebased. ``-X theirs`` keeps our side of a conflict,
+        which for the manifest would drop the other writer's entries, so
+        the manifest is regenerated from the rebased files afterwards.
+        """
+        attempts = settings.GIT_PUSH_MAX_ATTEMPTS
+        output = ""
+        for attempt in range(1, attempts + 1):
+            ok, output = self.git_command(
+                ["-C", str(worktree), "push", "origin", f"HEAD:{branch}"],
+                timeout=settings.GIT_REMOTE_TIMEOUT,
+            )
+            if ok:
+                metrics.observe("idp_git_push_retries", attempt - 1, branch=branch)
+                return True, output
+            if not any(marker in output for marker in PUSH_REJECTED_MARKERS):
+                break
+            metrics.inc("idp_git_push_rejections_total", branch=branch)
+            if attempt == attempts:
+                break
+
+            fetch_ok, fetch_out = self.git_command(
+                ["-C", str(worktree)] + self.checkout.fetch_args(branch),
+                timeout=settings.GIT_REMOTE_TIMEOUT,
+            )
+            if not fetch_ok:
+                output = fetch_out
+                break
+            rebase = ["-C", str(worktree), "rebase", "-X", "theirs"]
+            if values_only:
+                rebase += ["--onto", f"origin/{branch}", "HEAD~1"]
+            else:
+                rebase += [f"origin/{branch}"]
+            rebase_ok, rebase_out = self.git_command(rebase)
+            if not rebase_ok:
+                self.git_command(["-C", str(worktree), "rebase", "--abort"])
+                output = rebase_out
+                break
+            manifest_ok, manifest_out = self._regenerate_manifest(worktree)
+            if not manifest_ok:
+                output = manifest_out
+                break
+
+            delay = min(
+                settings.GIT_PUSH_BACKOFF_MAX,
+                settings.GIT_PUSH_BACKOFF_BASE * 2 ** (attempt - 1),
+            )
+            time.sleep(delay * random.uniform(0.5, 1.5))
+
+        metrics.inc("idp_git_push_failures_total", branch=branch)
+        return False, output
+
+    def _regenerate_manifest(self, worktree: Path) -> tuple[bool, str]:
+        """Amend HEAD with a manifest matching the values files it contains."""
+        values_dir = worktree / VALUES_PATH
+        if not ValuesLayout(values_dir, self.layout.sharded).rebuild_manifest():
+            return True, "Manifest up to date"
+        add_ok, add_out = self.git_command(
+            ["-C", str(worktree), "add", "--", str(values_dir / MANIFEST_NAME)]
+        )
+        if not add_ok:
+            return False, f"Failed to stage regenerated manifest: {add_out}"
+        return self.git_command(
+            ["-C", str(worktree), "commit", "--amend", "--no-edit", "--quiet"]
+        )
 
     # --- Safe push to main using worktree ---
-    def _push_values_to_main_worktree(self, website_id: str) -> tuple[bool, str]:
+    def _push_values_to_main_worktree(
+        self,
+        website_id: str,
+        removed: Sequence[str] = (),
+        force: Sequence[str] = (),
+    ) -> tuple[bool, str]:
         """Push only values files to main branch using a temporary worktree.
 
         This avoids merging the entire developer branch history into main.
+        Values of the ``removed`` website IDs are deleted from main; those
+        of the ``force`` IDs are copied even if both manifests agree.
         """
-        temp_dir = self.repo_path / ".git" / "_values_worktree"
-        # Clean up any previous failed attempt
-        if temp_dir.exists():
-            try:
-                shutil.rmtree(temp_dir)
-            except Exception:
-                pass
+        # Unique per push, so concurrent pushes never share a worktree or
+        # branch (GitMaintenance prunes leftovers of interrupted ones)
+        suffix = uuid.uuid4().hex[:12]
+        temp_dir = self.values_worktrees_dir / suffix
+        temp_branch = f"{TEMP_BRANCH_PREFIX}{suffix}"
 
         # Ensure we have latest main
-        fetch_ok, _ = self.git_command(["fetch", "origin", "main"])
+        fetch_ok, fetch_out = self.git_command(
+            self.checkout.fetch_args("main"), timeout=settings.GIT_REMOTE_TIMEOUT
+        )
         if not fetch_ok:
-            return False, "Failed to fetch origin/main"
+            return False, f"Failed to fetch origin/main: {fetch_out}"
 
-        # Add worktree tracking origin/main (detached) with temp branch
+        # Add worktree tracking origin/main (detached) with temp branch.
+        # It inherits the sparse cone, so only values files are checked out.
         add_ok, add_out = self.git_command(
             [
                 "worktree",
                 "add",
                 str(temp_dir),
                 "-b",
-                "_values_main_tmp",
+                temp_branch,
                 "origin/main",
             ]
         )
@@ -135,22 +343,12 @@ class GitHubService:
             return False, f"Failed to add worktree: {add_out}"
 
         try:
-            # Copy values files into worktree
-            target_values_dir = (
-                temp_dir / "idp" / "backend" / "website-template" / "values"
-            )
-            target_values_dir.mkdir(parents=True, exist_ok=True)
-            for yf in self.values_dir.glob("values-*.yaml"):
-                shutil.copy2(yf, target_values_dir / yf.name)
+            # Copy only the values files whose content differs from main
+            self._copy_changed_values(temp_dir / VALUES_PATH, removed, force)
 
             # Stage only values files
             add_values_ok, add_values_out = self.git_command(
-                [
-                    "-C",
-                    str(temp_dir),
-                    "add",
-                    "idp/backend/website-template/values/values-*.yaml",
-                ]
+                ["-C", str(temp_dir), "add", "--"] + VALUES_PATHSPECS
             )
             if not add_values_ok:
                 return False, f"Worktree add failed: {add_values_out}"
@@ -186,16 +384,8 @@ class GitHubService:
             if not commit_ok:
                 return False, f"Worktree commit failed: {commit_out}"
 
-            # Push to main
-            push_ok, push_out = self.git_command(
-                [
-                    "-C",
-                    str(temp_dir),
-                    "push",
-                    "origin",
-                    "HEAD:main",
-                ]
-            )
+            # Push to main, rebasing the values commit if main moved on
+            push_ok, push_out = self._push_with_retry(temp_dir, "main")
             if not push_ok:
                 return False, f"Worktree push failed: {push_out}"
             return True, "Pushed values to main via worktree"
@@ -203,11 +393,176 @@ class GitHubService:
             # Remove worktree (force to avoid lingering)
             self.git_command(["worktree", "remove", "-f", str(temp_dir)])
             # Delete temp branch ref if created
-            self.git_command(["branch", "-D", "_values_main_tmp"])  # cleanup
+            self.git_command(["branch", "-D", temp_branch])  # cleanup
+
+    def _copy_changed_values(
+        self,
+        target_values_dir: Path,
+        removed: Sequence[str] = (),
+        force: Sequence[str] = (),
+    ) -> int:
+        """Bring ``target_values_dir`` up to date using both manifests.
+
+        ``force`` IDs are copied regardless: their file on the branch can
+        differ from what its manifest entry claims (e.g. edited by hand).
+        Returns the number of files copied or removed.
+        """
+        local = self.layout.manifest()
+        remote = ValuesLayout.read_manifest(target_values_dir)
+        merged = dict(remote)
+        force = set(force)
+        copied = 0
+        for website_id, entry in local.items():
+            current = remote.get(website_id)
+            if current == entry and website_id not in force:
+                continue
+            target = target_values_dir / entry["path"]
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(self.values_dir / entry["path"], target)
+            if current and current["path"] != entry["path"]:
+                # Layout migrated locally: move the file on main too
+                (target_values_dir / current["path"]).unlink(missing_ok=True)
+            merged[website_id] = entry
+            copied += 1
+        for website_id in removed:
+            # Callers delete the local file first (see ValuesPipeline)
+            current = merged.pop(website_id, None)
+            # main may predate the manifest: try the flat name too
+            candidates = [f"values-{website_id}.yaml"]
+            if current:
+                candidates.append(current["path"])
+            found = current is not None
+            for rel in candidates:
+                path = target_values_dir / rel
+                if path.exists():
+                    path.unlink()
+                    found = True
+            copied += found
+        if copied:
+            ValuesLayout.save_manifest(
+                target_values_dir, merged, self.layout.sharded
+            )
+        return copied
+
+    # --- Committed values (read-only) ---
+    def committed_values_index(self, ref: str | None = None) -> dict[str, str]:
+        """``{website_id: blob hash}`` of the values files at ``ref``.
 
-    def auto_push_values(self, website_id: str, action: str = "created") -> dict:
+        Defaults to the last fetched ``origin/<target branch>``.
+        """
+        ref = ref or f"origin/{self.target_branch}"
+        ok, output = self.git_command(
+            ["ls-tree", "-r", "--full-tree", ref, "--", VALUES_PATH]
+        )
+        if not ok:
+            raise RuntimeError(f"Failed to list {ref}: {output}")
+        index = {}
+        for line in output.splitlines():
+            # "<mode> blob <sha>\t<path>"
+            meta, _, path = line.partition("\t")
+            name = Path(path).name
+            if not (name.startswith("values-") and name.endswith(".yaml")):
+                continue
+            website_id = name.removeprefix("values-").removesuffix(".yaml")
+            index[website_id] = meta.split()[2]
+        return index
+
+    def _prefetch_blobs(self, blob_ids: Sequence[str], ref: str) -> None:
+        """Download the wanted blobs a blobless clone lacks, in one fetch.
+
+        ``cat-file`` would otherwise fetch each missing blob on its own, a
+        remote round trip per file. Failures are left to ``cat-file``.
+        """
+        try:
+            listing = process_registry.run(
+                [
+                    "git",
+                    "rev-list",
+                    "--objects",
+                    "--missing=print",
+                    "--no-object-names",
+                    f"{ref}:{VALUES_PATH}",
+                ],
+                cwd=self.repo_path,
+                check=True,
+            )
+            wanted = set(blob_ids)
+            missing = [
+                line[1:]
+                for line in listing.stdout.splitlines()
+                if line.startswith("?") and line[1:] in wanted
+            ]
+            if not missing:
+                return
+            # What git's own lazy fetch runs, for all blobs at once
+            with tracer.span("git fetch blobs", blobs=len(missing)):
+                process_registry.run(
+                    [
+                        "git",
+                        "-c",
+                        "fetch.negotiationAlgorithm=noop",
+                        "fetch",
+                        "origin",
+                        "--no-tags",
+                        "--no-write-fetch-head",
+                        "--recurse-submodules=no",
+                        "--filter=blob:none",
+                        "--stdin",
+                    ],
+                    cwd=self.repo_path,
+                    check=True,
+                    timeout=settings.GIT_REMOTE_TIMEOUT,
+                    input="".join(f"{blob_id}\n" for blob_id in missing),
+                )
+            metrics.inc("idp_git_blobs_prefetched_total", len(missing))
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+            stderr = getattr(e, "stderr", "") or str(e)
+            logger.warning(f"Blob prefetch failed, fetching lazily: {stderr}")
+
+    def read_blobs(
+        self, blob_ids: Sequence[str], ref: Optional[str] = None
+    ) -> dict[str, str]:
+        """Contents of many blobs through one ``git cat-file --batch``.
+
+        ``blob_ids`` come from the values tree at ``ref`` (default: the last
+        fetched ``origin/<target branch>``); missing ones are fetched first.
+        """
+        if not blob_ids:
+            return {}
+        self._prefetch_blobs(blob_ids, ref or f"origin/{self.target_branch}")
+        result = process_registry.run(
+            ["git", "cat-file", "--batch"],
+            cwd=self.repo_path,
+            check=True,
+            input="".join(f"{blob_id}\n" for blob_id in blob_ids).encode(),
+            text=False,
+        )
+        # Each entry: "<sha> blob <size>\n<content>\n"
+        data = result.stdout
+        contents = {}
+        pos = 0
+        while pos < len(data):
+            end = data.index(b"\n", pos)
+            header = data[pos:end].decode().split()
+            pos = end + 1
+            if len(header) < 3 or header[1] == "missing":
+                continue
+            size = int(header[2])
+            contents[header[0]] = data[pos : pos + size].decode()
+            pos += size + 1
+        return contents
+
+    def auto_push_values(
+        self,
+        website_id: str,
+        action: str = "created",
+        removed: Sequence[str] = (),
+        force: Sequence[str] = (),
+    ) -> dict:
         """
         Automatically commit and push new values files.
+        ``removed`` lists website IDs whose values files were deleted;
+        ``force`` lists IDs to copy to main even if the manifests agree.
         Returns status information about the operation.
         """
         result = {
@@ -218,6 +573,36 @@ class GitHubService:
             "message": "",
         }
 
+        # Steps 1-4 hold the branch lock: other processes commit to this
+        # checkout too (teardown) and push to the same branch
+        with tracer.span("values push", branch=self.target_branch), self._branch_lock(
+            self.target_branch
+        ) as acquired:
+            if acquired is False:
+                result["message"] = (
+                    f"Timed out waiting for the lock on {self.target_branch}"
+                )
+                return result
+            if not self._commit_and_push(result, website_id, action, removed, force):
+                return result
+
+        # Success!
+        result["success"] = True
+        result["message"] = (
+            f"Successfully pushed {action} values for {website_id} to GitHub"
+        )
+
+        return result
+
+    def _commit_and_push(
+        self,
+        result: dict,
+        website_id: str,
+        action: str,
+        removed: Sequence[str],
+        force: Sequence[str],
+    ) -> bool:
+        """Steps of ``auto_push_values``, recorded in ``result``."""
         # Step 1: Check git status
         status_success, changed_files = self.check_git_status()
         result["steps"]["check_status"] = {
@@ -227,7 +612,7 @@ class GitHubService:
 
         if not status_success:
             result["message"] = "Failed to check git status"
-            return result
+            return False
 
         # Step 2: Add values files
         add_success, add_output = self.add_values_files()
@@ -238,7 +623,7 @@ class GitHubService:
 
         if not add_success:
             result["message"] = f"Failed to add values files: {add_output}"
-            return result
+            return False
 
         # Step 3: Commit changes
         commit_success, commit_output = self.commit_values(website_id, action)
@@ -249,30 +634,27 @@ class GitHubService:
 
         if not commit_success:
             result["message"] = f"Failed to commit changes: {commit_output}"
-            return result
+            return False
 
         # Step 4: Push to target branch (special handling if target is main)
         current_branch = self.get_current_branch()
         if self.target_branch == "main" and current_branch != "main":
-            push_success, push_output = self._push_values_to_main_worktree(website_id)
+            push_success, push_output = self._push_values_to_main_worktree(
+                website_id, removed, force
+            )
         else:
             push_success, push_output = self.push_to_remote()
         result["steps"]["push"] = {
             "success": push_success,
             "output": push_output,
+            # Unreachable remote (retry later) vs. a refused change (don't)
+            "transport_error": not push_success and is_transport_error(push_output),
         }
 
         if not push_success:
             result["message"] = f"Failed to push to remote: {push_output}"
-            return result
-
-        # Success!
-        result["success"] = True
-        result["message"] = (
-            f"Successfully pushed {action} values for {website_id} to GitHub"
-        )
-
-        return result
+            return False
+        return True
 
     def setup_git_config(self) -> tuple[bool, str]:
         """Setup basic git configuration if not already set."""
@@ -291,13 +673,11 @@ class GitHubService:
 
     # --- Directory Watcher Logic ---
     def _scan_values_dir(self) -> list[str]:
-        """Return list of current values yaml files."""
-        if not self.values_dir.exists():
-            return []
-        return [f.name for f in self.values_dir.glob("values-*.yaml") if f.is_file()]
+        """Return website IDs that have a values file, from the manifest."""
+        return list(self.layout.manifest())
 
     def _detect_new_files(self) -> list[str]:
-        """Detect newly created values files since last scan."""
+        """Detect website IDs with a values file added since last scan."""
         current = set(self._scan_values_dir())
         new_files = [f for f in current if f not in self._known_files]
         self._known_files = current
@@ -305,36 +685,33 @@ class GitHubService:
 
     def _watch_loop(self, interval: float = 2.0):
         """Poll directory for new values files and auto push them."""
-        print("[GitHubService] Watcher started for values directory")
+        logger.info("Watcher started for values directory")
         # Initialize known files on start
         self._known_files = set(self._scan_values_dir())
         while not self._stop_event.is_set():
             try:
                 new_files = self._detect_new_files()
                 if new_files:
-                    for filename in new_files:
-                        website_id = filename.removeprefix("values-").removesuffix(
-                            ".yaml"
-                        )
-                        print(
-                            "[GitHubService] Detected new values file '"
-                            f"{filename}' pushing to repo..."
+                    for website_id in new_files:
+                        logger.info(
+                            f"Detected new values for '{website_id}', "
+                            "pushing to repo..."
                         )
                         push_result = self.auto_push_values(website_id, "created")
                         if push_result.get("success"):
-                            print(
-                                "[GitHubService] Auto-push success for '"
-                                f"{website_id}': {push_result.get('message')}"
+                            logger.info(
+                                f"Auto-push success for '{website_id}': "
+                                f"{push_result.get('message')}"
                             )
                         else:
-                            print(
-                                "[GitHubService] Auto-push failed for '"
-                                f"{website_id}': {push_result.get('message')}"
+                            logger.warning(
+                                f"Auto-push failed for '{website_id}': "
+                                f"{push_result.get('message')}"
                             )
             except Exception as e:
-                print(f"[GitHubService] Watcher error: {e}")
+                logger.error(f"Watcher error: {e}")
             time.sleep(interval)
-        print("[GitHubService] Watcher stopped")
+        logger.info("Watcher stopped")
 
     def start_watcher(self):
         """Start the background watcher thread if not already running."""
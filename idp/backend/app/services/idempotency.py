@@ -0,0 +1,178 @@
+"""
+Idempotency keys for job-creating endpoints.
+
+A request carrying an ``Idempotency-Key`` header runs at most once per key
+within IDEMPOTENCY_TTL_SECONDS:
+- The first request claims the key in Redis (SET NX) and stores the
+  resulting JobResponse when it finishes. The claim is only a lease of
+  IDEMPOTENCY_WAIT_TIMEOUT, so a replica that dies mid-request blocks
+  retries for that long, not for the whole TTL, which applies to the
+  completed record only.
+- Retries get the stored JobResponse back without running the handler.
+- Duplicates arriving while the first request is still running wait for
+  its result: in-process duplicates share an asyncio future, duplicates on
+  other replicas poll Redis until the result appears.
+- If the handler fails, the key is released so the client can retry.
+
+When Redis is unreachable the store falls back to process-local state.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+import redis
+from app.config import settings
+from app.database.redis import redis_client
+from app.models.job import JobResponse
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "idp:idempotency:"
+IN_PROGRESS = "in_progress"
+COMPLETED = "completed"
+
+
+def request_fingerprint(payload: str) -> str:
+    """Hash of the request body, used to reject key reuse for other payloads."""
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """Redis-backed record of completed and in-flight requests."""
+
+    def __init__(
+        self,
+        client: redis.Redis = redis_client,
+        ttl: Optional[int] = None,
+        lease: Optional[float] = None,
+    ):
+        self.client = client
+        self.ttl = ttl or settings.IDEMPOTENCY_TTL_SECONDS
+        self.lease = lease or settings.IDEMPOTENCY_WAIT_TIMEOUT
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # Fallback used while Redis is unavailable: key -> (expires, record)
+        self._local: Dict[str, Tuple[float, dict]] = {}
+
+    # --- Storage primitives (Redis with in-memory fallback) ---
+    def _claim(self, key: str, record: dict) -> bool:
+        try:
+            return bool(
+                self.client.set(
+                    KEY_PREFIX + key,
+                    json.dumps(record),
+                    nx=True,
+                    px=int(self.lease * 1000),
+                )
+            )
+        except redis.RedisError as e:
+            logger.warning(f"Idempotency store unavailable, using local state: {e}")
+            existing = self._get_local(key)
+            if existing is not None:
+                return False
+            self._local[key] = (time.monotonic() + self.lease, record)
+            return True
+
+    def _get(self, key: str) -> Optional[dict]:
+        try:
+            raw = self.client.get(KEY_PREFIX + key)
+        except redis.RedisError:
+            return self._get_local(key)
+        return json.loads(raw) if raw else None
+
+    def _get_local(self, key: str) -> Optional[dict]:
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._local[key]
+            return None
+        return entry[1]
+
+    def _store(self, key: str, record: dict) -> None:
+        try:
+            self.client.set(KEY_PREFIX + key, json.dumps(record), ex=self.ttl)
+        except redis.RedisError:
+            self._local[key] = (time.monotonic() + self.ttl, record)
+
+    def _release(self, key: str) -> None:
+        self._local.pop(key, None)
+        try:
+            self.client.delete(KEY_PREFIX + key)
+        except redis.RedisError:
+            pass
+
+    # --- Request handling ---
+    def _completed(self, record: dict, fingerprint: str) -> Optional[JobResponse]:
+        if record.get("fingerprint") != fingerprint:
+            raise HTTPException(
+                status_code=422,
+                detail="Idempotency-Key was already used with a different request",
+            )
+        if record.get("state") == COMPLETED:
+            return JobResponse.model_validate(record["response"])
+        return None
+
+    async def run(
+        self,
+        key: str,
+        fingerprint: str,
+        handler: Callable[[], Awaitable[JobResponse]],
+    ) -> JobResponse:
+        """Run ``handler`` once per key and return its (stored) response."""
+        # Same-process duplicate: share the in-flight execution
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+        record = {"state": IN_PROGRESS, "fingerprint": fingerprint}
+        while not self._claim(key, record):
+            existing = self._get(key)
+            if existing is not None:
+                response = self._completed(existing, fingerprint)
+                if response is not None:
+                    return response
+            # Another replica is executing it (or just released the key)
+            if time.monotonic() >= deadline:
+                raise HTTPException(
+                    status_code=409,
+                    detail="A request with this Idempotency-Key is still in progress",
+                )
+            await asyncio.sleep(0.1)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            response = await handler()
+        except Exception as e:
+            self._release(key)
+            future.set_exception(e)
+            # Avoid "exception was never retrieved" when nobody else waited
+            future.exception()
+            raise
+        except BaseException:
+            self._release(key)
+            future.cancel()
+            raise
+        else:
+            self._store(
+                key,
+                {
+                    "state": COMPLETED,
+                    "fingerprint": fingerprint,
+                    "response": response.model_dump(mode="json"),
+                },
+            )
+            future.set_result(response)
+            return response
+        finally:
+            self._inflight.pop(key, None)
+
+
+# Create singleton instance
+idempotency_store = IdempotencyStore()
@@ -0,0 +1,139 @@
+"""
+Persistence for job records shown by the jobs API.
+
+Every job (API background task or RQ job) gets a row in ``jobs``; tasks
+update its status, progress and logs as they go. Each call uses its own
+short-lived session so it is safe from worker threads and RQ work horses.
+"""
+
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from app.database import SessionLocal
+from app.database.models import Job, JobStatusEnum, JobTypeEnum
+from app.models.job import JobResponse, JobStatus
+
+TERMINAL_STATUSES = {
+    JobStatusEnum.COMPLETED,
+    JobStatusEnum.FAILED,
+    JobStatusEnum.CANCELLED,
+}
+
+
+def _to_response(job: Job) -> JobResponse:
+    return JobResponse(
+        id=str(job.id),
+        job_type=job.job_type.value,
+        status=job.status.value,
+        website_id=job.website_id,
+        progress=job.progress or 0,
+        logs=list(job.logs or []),
+        error_message=job.error_message,
+        created_at=job.created_at or datetime.utcnow(),
+        started_at=job.started_at,
+        completed_at=job.completed_at,
+    )
+
+
+class JobStore:
+    """CRUD helpers for job records."""
+
+    def create(self, job: JobResponse) -> JobResponse:
+        with SessionLocal() as db:
+            db.add(
+                Job(
+                    id=job.id,
+                    job_type=JobTypeEnum(job.job_type.value),
+                    status=JobStatusEnum(job.status.value),
+                    website_id=job.website_id,
+                    progress=job.progress,
+                    logs=list(job.logs),
+                    created_at=job.created_at,
+                )
+            )
+            db.commit()
+        return job
+
+    def get(self, job_id: str) -> Optional[JobResponse]:
+        with SessionLocal() as db:
+            job = db.get(Job, job_id)
+            return _to_response(job) if job else None
+
+    def list(
+        self,
+        status: Optional[str] = None,
+        website_id: Optional[str] = None,
+        page: int = 1,
+        size: int = 10,
+    ) -> Tuple[List[JobResponse], int]:
+        with SessionLocal() as db:
+            query = db.query(Job)
+            if status:
+                query = query.filter(Job.status == JobStatusEnum(status))
+            if website_id:
+                query = query.filter(Job.website_id == website_id)
+            total = query.count()
+            jobs = (
+                query.order_by(Job.created_at.desc())
+                .offset((page - 1) * size)
+                .limit(size)
+                .all()
+            )
+            return [_to_response(j) for j in jobs], total
+
+    def update(
+        self,
+        job_id: str,
+        status: Optional[JobStatus] = None,
+        progress: Optional[int] = None,
+        log: Optional[str] = None,
+        error_message: Optional[str] = None,
+    ) -> Optional[JobResponse]:
+        """Update a job; a cancelled job is never moved to another status."""
+        with SessionLocal() as db:
+            job = db.get(Job, job_id)
+            if job is None:
+                return None
+            if status is not None and job.status != JobStatusEnum.CANCELLED:
+                new_status = JobStatusEnum(status.value)
+                if new_status == JobStatusEnum.RUNNING and not job.started_at:
+                    job.started_at = datetime.utcnow()
+                if new_status in TERMINAL_STATUSES:
+                    job.completed_at = datetime.utcnow()
+                job.status = new_status
+            if progress is not None:
+                job.progress = progress
+            if log:
+                job.logs = list(job.logs or []) + [log]
+            if error_message is not None:
+                job.error_message = error_message
+            db.commit()
+            return _to_response(job)
+
+    def cancel(self, job_id: str) -> bool:
+        """Mark a job CANCELLED unless it already finished.
+
+        A single conditional UPDATE, so a job finishing concurrently keeps
+        its status. Returns False if the job had finished.
+        """
+        with SessionLocal() as db:
+            cancelled = (
+                db.query(Job)
+                .filter(Job.id == job_id, Job.status.notin_(TERMINAL_STATUSES))
+                .update(
+                    {
+                        Job.status: JobStatusEnum.CANCELLED,
+                        Job.completed_at: datetime.utcnow(),
+                    },
+                    synchronize_session=False,
+                )
+            )
+            db.commit()
+        return bool(cancelled)
+
+    def is_terminal(self, job: JobResponse) -> bool:
+        return JobStatusEnum(job.status.value) in TERMINAL_STATUSES
+
+
+# Create singleton instance
+job_store = JobStore()
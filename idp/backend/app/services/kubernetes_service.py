@@ -0,0 +1,216 @@
+"""
+Kubernetes service backed by the official Python client.
+
+Replaces per-operation ``kubectl`` subprocesses with a shared client:
+- One ApiClient (and urllib3 connection pool) per kubeconfig context,
+  created lazily on first use and reused for every later call.
+- Secrets are applied with server-side apply (field manager ``website-idp``).
+- Namespaces are deleted with background propagation, so the call returns
+  as soon as the API server accepts it instead of waiting for finalizers.
+- Rolling restarts patch the pod template's ``restartedAt`` annotation,
+  exactly like ``kubectl rollout restart``.
+"""
+
+import copy
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from app.config import settings
+from app.services.tracing import tracer
+from kubernetes import client, config
+from kubernetes.client.rest import ApiException
+
+logger = logging.getLogger(__name__)
+
+FIELD_MANAGER = "website-idp"
+APPLY_PATCH_CONTENT_TYPE = "application/apply-patch+yaml"
+MERGE_PATCH_CONTENT_TYPE = "application/merge-patch+json"
+RESTARTED_AT_ANNOTATION = "kubectl.kubernetes.io/restartedAt"
+
+
+class KubernetesService:
+    """Shared, connection-pooled access to the Kubernetes API."""
+
+    def __init__(
+        self,
+        kubeconfig_path: Optional[str] = None,
+        configuration: Optional[client.Configuration] = None,
+    ):
+        self.kubeconfig_path = kubeconfig_path or settings.KUBECONFIG_PATH
+        # An explicit configuration (e.g. pointing at a local fake API
+        # server) bypasses kubeconfig loading entirely.
+        self._configuration = configuration
+        self._clients: Dict[Optional[str], client.ApiClient] = {}
+        self._lock = threading.Lock()
+
+    def _load_configuration(self, context: Optional[str]) -> client.Configuration:
+        """Build a client configuration for the given kubeconfig context."""
+        if self._configuration is not None:
+            # A copy per context: the pool size below (and whatever a client
+            # mutates) must not leak into the caller's object or other contexts
+            cfg = copy.deepcopy(self._configuration)
+        else:
+            cfg = client.Configuration()
+            if self.kubeconfig_path:
+                config.load_kube_config(
+                    config_file=self.kubeconfig_path,
+                    context=context,
+                    client_configuration=cfg,
+                )
+            elif os.getenv("KUBERNETES_SERVICE_HOST"):
+                config.load_incluster_config(client_configuration=cfg)
+            else:
+                config.load_kube_config(context=context, client_configuration=cfg)
+        cfg.connection_pool_maxsize = settings.KUBERNETES_POOL_MAXSIZE
+        return cfg
+
+    def api_client(self, context: Optional[str] = None) -> client.ApiClient:
+        """Return the shared ApiClient for a context, creating it once."""
+        api = self._clients.get(context)
+        if api is not None:
+            return api
+        with self._lock:
+            api = self._clients.get(context)
+            if api is None:
+                api = client.ApiClient(self._load_configuration(context))
+                self._clients[context] = api
+        return api
+
+    @staticmethod
+    def context_for(cluster: Optional[str]) -> Optional[str]:
+        """Kubeconfig context of a cluster (None: the default context)."""
+        return settings.KUBERNETES_CONTEXTS.get(cluster) if cluster else None
+
+    def core_v1(self, context: Optional[str] = None) -> client.CoreV1Api:
+        return client.CoreV1Api(self.api_client(context))
+
+    def apps_v1(self, context: Optional[str] = None) -> client.AppsV1Api:
+        return client.AppsV1Api(self.api_client(context))
+
+    def networking_v1(self, context: Optional[str] = None) -> client.NetworkingV1Api:
+        return client.NetworkingV1Api(self.api_client(context))
+
+    def _patch(
+        self,
+        context: Optional[str],
+        path: str,
+        path_params: Dict[str, str],
+        body: Dict[str, Any],
+        content_type: str,
+        response_type: str,
+        query: Optional[Dict[str, Any]] = None,
+    ) -> Any:
+        """PATCH with an explicit Content-Type.
+
+        The generated ``patch_*`` methods of this client version always pick
+        the first patch type they support (JSON patch, which the REST layer
+        turns into a strategic merge for dict bodies) and accept no override.
+        """
+        query_params = [("fieldManager", FIELD_MANAGER)]
+        query_params.extend((query or {}).items())
+        return self.api_client(context).call_api(
+            path,
+            "PATCH",
+            path_params=path_params,
+            query_params=query_params,
+            header_params={
+                "Accept": "application/json",
+                "Content-Type": content_type,
+            },
+            body=body,
+            response_type=response_type,
+            auth_settings=["BearerToken"],
+            _return_http_data_only=True,
+            _request_timeout=settings.KUBERNETES_REQUEST_TIMEOUT,
+        )
+
+    def apply_secret(
+        self, manifest: Dict[str, Any], context: Optional[str] = None
+    ) -> None:
+        """Create or update a Secret with server-side apply."""
+        metadata = manifest["metadata"]
+        with tracer.span("k8s apply_secret", namespace=metadata["namespace"]):
+            self._patch(
+                context,
+                "/api/v1/namespaces/{namespace}/secrets/{name}",
+                {"namespace": metadata["namespace"], "name": metadata["name"]},
+                manifest,
+                APPLY_PATCH_CONTENT_TYPE,
+                "V1Secret",
+                query={"force": "true"},
+            )
+        logger.info(
+            f"Applied secret {metadata['namespace']}/{metadata['name']} "
+            "(server-side apply)"
+        )
+
+    def delete_namespace(self, name: str, context: Optional[str] = None) -> bool:
+        """Request namespace deletion without waiting for it to finish.
+
+        Returns False if the namespace did not exist.
+        """
+        try:
+            with tracer.span("k8s delete_namespace", namespace=name):
+                self.core_v1(context).delete_namespace(
+                    name=name,
+                    propagation_policy="Background",
+                    _request_timeout=settings.KUBERNETES_REQUEST_TIMEOUT,
+                )
+        except ApiException as e:
+            if e.status == 404:
+                return False
+            raise
+        logger.info(f"Namespace {name} deletion requested")
+        return True
+
+    def restart_deployments(
+        self, namespace: str, context: Optional[str] = None
+    ) -> Dict[str, int]:
+        """Start a rolling restart of every deployment in a namespace.
+
+        Returns ``{deployment name: generation}`` after the patch; the
+        restart has rolled out once that generation is observed and ready.
+        """
+        apps = self.apps_v1(context)
+        restarted_at = datetime.now(timezone.utc).isoformat()
+        body = {
+            "spec": {
+                "template": {
+                    "metadata": {
+                        "annotations": {RESTARTED_AT_ANNOTATION: restarted_at}
+                    }
+                }
+            }
+        }
+        generations = {}
+        with tracer.span("k8s restart_deployments", namespace=namespace):
+            deployments = apps.list_namespaced_deployment(
+                namespace, _request_timeout=settings.KUBERNETES_REQUEST_TIMEOUT
+            )
+            for deployment in deployments.items:
+                name = deployment.metadata.name
+                patched = self._patch(
+                    context,
+                    "/apis/apps/v1/namespaces/{namespace}/deployments/{name}",
+                    {"namespace": namespace, "name": name},
+                    body,
+                    MERGE_PATCH_CONTENT_TYPE,
+                    "V1Deployment",
+                )
+                generations[name] = patched.metadata.generation or 0
+        logger.info(f"Restarted {len(generations)} deployment(s) in {namespace}")
+        return generations
+
+    def close(self) -> None:
+        """Close all pooled connections."""
+        with self._lock:
+            for api in self._clients.values():
+                api.close()
+            self._clients.clear()
+
+
+# Create singleton instance
+kubernetes_service = KubernetesService()
@@ -0,0 +1,128 @@
+"""
+Redis lease-based leader election.
+
+A process becomes leader by creating ``idp:leader:<name>`` with SET NX PX
+and keeps the lease by renewing it every third of LEADER_LEASE_TTL. Renewal
+and release are compare-and-set Lua scripts, so a process that lost the
+lease can never extend or delete someone else's. A leader that dies stops
+renewing and a follower takes over within one TTL; a leader that shuts
+down cleanly releases the key for immediate failover.
+"""
+
+import logging
+import os
+import socket
+import threading
+import uuid
+from typing import Callable, Optional
+
+import redis
+from app.config import settings
+from app.database.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class LeaderElector:
+    """Runs callbacks when this process gains or loses leadership."""
+
+    def __init__(
+        self,
+        name: str,
+        client: redis.Redis = redis_client,
+        ttl: Optional[float] = None,
+    ):
+        self.key = f"idp:leader:{name}"
+        self.client = client
+        self.ttl = ttl or settings.LEADER_LEASE_TTL
+        self.identity = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._renew = client.register_script(RENEW_SCRIPT)
+        self._release = client.register_script(RELEASE_SCRIPT)
+        self._is_leader = False
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._on_elected: Callable[[], None] = lambda: None
+        self._on_demoted: Callable[[], None] = lambda: None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._is_leader
+
+    def current_leader(self) -> Optional[str]:
+        value = self.client.get(self.key)
+        return value.decode() if value else None
+
+    def _try_acquire(self) -> bool:
+        ttl_ms = int(self.ttl * 1000)
+        if self._is_leader:
+            return bool(self._renew(keys=[self.key], args=[self.identity, ttl_ms]))
+        return bool(self.client.set(self.key, self.identity, nx=True, px=ttl_ms))
+
+    def _set_leader(self, leader: bool) -> None:
+        if leader == self._is_leader:
+            return
+        self._is_leader = leader
+        if leader:
+            logger.info(f"Became leader for {self.key} ({self.identity})")
+            callback = self._on_elected
+        else:
+            logger.info(f"Lost leadership for {self.key} ({self.identity})")
+            callback = self._on_demoted
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f"Leadership callback failed: {e}")
+
+    def _loop(self) -> None:
+        interval = self.ttl / 3
+        while not self._stop_event.is_set():
+            try:
+                self._set_leader(self._try_acquire())
+            except redis.RedisError as e:
+                # Cannot prove we still hold the lease: step down
+                logger.warning(f"Leader election unavailable: {e}")
+                self._set_leader(False)
+            self._stop_event.wait(interval)
+
+    def start(
+        self,
+        on_elected: Callable[[], None],
+        on_demoted: Callable[[], None],
+    ) -> None:
+        """Start campaigning in a background thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._on_elected = on_elected
+        self._on_demoted = on_demoted
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._loop, name=f"leader-{self.key}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop campaigning and release the lease if held."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._is_leader:
+            try:
+                self._release(keys=[self.key], args=[self.identity])
+            except redis.RedisError:
+                pass
+            self._set_leader(False)
@@ -0,0 +1,265 @@
+"""
+Metrics registry with Prometheus text exposition, aggregated across processes.
+
+Counters, gauges and summaries (count/sum/max) keyed by name and label set.
+Collectors registered with ``add_collector`` run on every scrape, which is
+how values that are expensive to maintain continuously (queue depth/age)
+are refreshed.
+
+Counters and summaries recorded by any process (API workers, RQ workers and
+their short-lived work horses) are added to shared Redis hashes: each
+process buffers its increments and flushes them every METRICS_FLUSH_INTERVAL
+seconds, and a work horse flushes before it exits. A scrape therefore
+reports fleet-wide totals whichever process serves it (scrape one instance,
+or aggregate instances with ``max`` rather than ``sum``). Gauges describe the
+serving process and are not shared. If Redis is unreachable, the scrape
+falls back to this process's own totals.
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+import redis
+from app.config import settings
+from app.database.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+COUNTERS_KEY = "idp:metrics:counters"
+SUMMARIES_KEY = "idp:metrics:summaries"
+SUMMARY_MAX_KEY = "idp:metrics:summary-max"
+
+# KEYS: hash; ARGV: field, value
+MAX_SCRIPT = """
+local current = tonumber(redis.call('HGET', KEYS[1], ARGV[1]))
+if current == nil or tonumber(ARGV[2]) > current then
+    redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+end
+return 1
+"""
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey) -> str:
+    if not key:
+        return ""
+    inner = ",".join(
+        '{}="{}"'.format(
+            k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        )
+        for k, v in key
+    )
+    return "{" + inner + "}"
+
+
+def _field(name: str, key: LabelKey, *suffix: str) -> str:
+    return json.dumps([name, [list(pair) for pair in key], *suffix])
+
+
+def _parse_field(raw) -> Tuple[str, LabelKey, List[str]]:
+    name, pairs, *suffix = json.loads(raw)
+    return name, tuple(tuple(pair) for pair in pairs), suffix
+
+
+class MetricsRegistry:
+    """Thread-safe store of metric samples."""
+
+    def __init__(self, client: redis.Redis = redis_client):
+        self.client = client
+        self._max = client.register_script(MAX_SCRIPT)
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._summaries: Dict[str, Dict[LabelKey, List[float]]] = {}
+        self._collectors: List[Callable[[], None]] = []
+        # Increments not yet added to the shared hashes
+        self._pending_counters: Dict[Tuple[str, LabelKey], float] = {}
+        self._pending_summaries: Dict[Tuple[str, LabelKey], List[float]] = {}
+        self._flush_lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+            pending = self._pending_counters
+            pending[(name, key)] = pending.get((name, key), 0.0) + value
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        with self._lock:
+            self._gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._summaries.setdefault(name, {})
+            count, total, peak = series.get(key, [0.0, 0.0, 0.0])
+            series[key] = [count + 1, total + value, max(peak, value)]
+            count, total, peak = self._pending_summaries.get(
+                (name, key), [0.0, 0.0, 0.0]
+            )
+            self._pending_summaries[(name, key)] = [
+                count + 1,
+                total + value,
+                max(peak, value),
+            ]
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """Register a callback that refreshes gauges before each scrape."""
+        with self._lock:
+            self._collectors.append(collector)
+
+    # --- Sharing across processes ---
+    def flush(self) -> None:
+        """Add this process's buffered increments to the shared hashes."""
+        with self._flush_lock:
+            with self._lock:
+                counters, self._pending_counters = self._pending_counters, {}
+                summaries, self._pending_summaries = self._pending_summaries, {}
+            if not counters and not summaries:
+                return
+            try:
+                pipe = self.client.pipeline(transaction=False)
+                for (name, key), value in counters.items():
+                    pipe.hincrbyfloat(COUNTERS_KEY, _field(name, key), value)
+                for (name, key), (count, total, peak) in summaries.items():
+                    pipe.hincrbyfloat(SUMMARIES_KEY, _field(name, key, "count"), count)
+                    pipe.hincrbyfloat(SUMMARIES_KEY, _field(name, key, "sum"), total)
+                    self._max(
+                        keys=[SUMMARY_MAX_KEY],
+                        args=[_field(name, key), peak],
+                        client=pipe,
+                    )
+                pipe.execute()
+            except redis.RedisError:
+                # Put them back underneath anything recorded since
+                with self._lock:
+                    for item, value in counters.items():
+                        self._pending_counters[item] = (
+                            self._pending_counters.get(item, 0.0) + value
+                        )
+                    for item, (count, total, peak) in summaries.items():
+                        c, t, p = self._pending_summaries.get(item, [0.0, 0.0, 0.0])
+                        self._pending_summaries[item] = [
+                            c + count,
+                            t + total,
+                            max(p, peak),
+                        ]
+                raise
+
+    def _flush_loop(self) -> None:
+        while not self._stop_event.wait(settings.METRICS_FLUSH_INTERVAL):
+            try:
+                self.flush()
+            except redis.RedisError as e:
+                logger.warning(f"Could not share metrics: {e}")
+
+    def start_flusher(self) -> None:
+        """Flush increments periodically (long-lived processes)."""
+        if self._flusher and self._flusher.is_alive():
+            return
+        self._stop_event.clear()
+        self._flusher = threading.Thread(
+            target=self._flush_loop, name="metrics-flusher", daemon=True
+        )
+        self._flusher.start()
+
+    def _after_fork(self) -> None:
+        # A work horse reports only what it records itself
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._counters = {}
+        self._summaries = {}
+        self._pending_counters = {}
+        self._pending_summaries = {}
+        self._flusher = None
+        self._stop_event = threading.Event()
+
+    def _shared(self) -> Tuple[dict, dict]:
+        """Fleet-wide counters and summaries from Redis."""
+        self.flush()
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hgetall(COUNTERS_KEY)
+        pipe.hgetall(SUMMARIES_KEY)
+        pipe.hgetall(SUMMARY_MAX_KEY)
+        raw_counters, raw_summaries, raw_max = pipe.execute()
+        counters: Dict[str, Dict[LabelKey, float]] = {}
+        for field, value in raw_counters.items():
+            name, key, _ = _parse_field(field)
+            counters.setdefault(name, {})[key] = float(value)
+        summaries: Dict[str, Dict[LabelKey, List[float]]] = {}
+        for field, value in raw_summaries.items():
+            name, key, (part,) = _parse_field(field)
+            entry = summaries.setdefault(name, {}).setdefault(key, [0.0, 0.0, 0.0])
+            entry[0 if part == "count" else 1] = float(value)
+        for field, value in raw_max.items():
+            name, key, _ = _parse_field(field)
+            if key in summaries.get(name, {}):
+                summaries[name][key][2] = float(value)
+        return counters, summaries
+
+    # --- Exposition ---
+    def snapshot(self) -> dict:
+        """Return this process's counters and gauges as plain dicts."""
+        with self._lock:
+            return {
+                "counters": {
+                    n: {_format_labels(k): v for k, v in s.items()}
+                    for n, s in self._counters.items()
+                },
+                "gauges": {
+                    n: {_format_labels(k): v for k, v in s.items()}
+                    for n, s in self._gauges.items()
+                },
+            }
+
+    def render(self) -> str:
+        """Render all metrics in Prometheus text format."""
+        for collector in list(self._collectors):
+            try:
+                collector()
+            except Exception:
+                pass
+        try:
+            counters, summaries = self._shared()
+        except redis.RedisError as e:
+            logger.warning(f"Shared metrics unavailable, reporting local: {e}")
+            with self._lock:
+                counters = {n: dict(s) for n, s in self._counters.items()}
+                summaries = {
+                    n: {k: list(v) for k, v in s.items()}
+                    for n, s in self._summaries.items()
+                }
+        lines: List[str] = []
+        for name, series in sorted(counters.items()):
+            lines.append(f"# TYPE {name} counter")
+            for key, value in series.items():
+                lines.append(f"{name}{_format_labels(key)} {value}")
+        with self._lock:
+            for name, series in sorted(self._gauges.items()):
+                lines.append(f"# TYPE {name} gauge")
+                for key, value in series.items():
+                    lines.append(f"{name}{_format_labels(key)} {value}")
+        for name, series in sorted(summaries.items()):
+            lines.append(f"# TYPE {name} summary")
+            for key, (count, total, peak) in series.items():
+                labels = _format_labels(key)
+                lines.append(f"{name}_count{labels} {count}")
+                lines.append(f"{name}_sum{labels} {total}")
+                lines.append(f"{name}_max{labels} {peak}")
+        return "\n".join(lines) + "\n"
+
+
+# Create singleton instance
+metrics = MetricsRegistry()
+os.register_at_fork(after_in_child=metrics._after_fork)
@@ -0,0 +1,480 @@
+"""
+Streaming container logs of websites' pods.
+
+- One-shot reads (``follow=false``) stream the API server's response chunk
+  by chunk, so even a large ``tail`` never sits in memory whole. The first
+  container's log is opened before the response starts, so errors (e.g. a
+  container that has not started) still get a proper status; a later
+  container that fails ends its part of the output with an error line.
+- Followers of the same pod container share one upstream ``follow`` stream
+  read by a background thread. It carries live lines only: each viewer
+  subscribes first, then reads its own ``tail``/``since`` backlog once, and
+  skips live lines the backlog already covered (by timestamp).
+- Every viewer gets a bounded queue (POD_LOGS_QUEUE_SIZE lines). A viewer
+  that falls behind loses lines (and is told how many) instead of holding
+  up the upstream or the other viewers.
+- At most POD_LOGS_MAX_FOLLOWERS viewers follow one site at a time (per
+  API process).
+
+Upstream connections use a read timeout of POD_LOGS_IDLE_TIMEOUT: a quiet
+stream is re-opened from its last timestamp while it has viewers and shut
+down once it has none.
+"""
+
+import asyncio
+import itertools
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+from app.config import settings
+from app.services.kubernetes_service import KubernetesService, kubernetes_service
+from app.services.metrics import metrics
+from kubernetes.client.rest import ApiException
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+# (context, namespace, pod, container)
+StreamKey = Tuple[Optional[str], str, str, str]
+
+
+def split_timestamp(line: str) -> Tuple[str, str]:
+    """Split a ``timestamps=true`` log line into (RFC3339 time, message)."""
+    stamp, _, message = line.partition(" ")
+    return stamp, message
+
+
+class _Viewer:
+    """One follower's bounded queue, consumed on the event loop."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(settings.POD_LOGS_QUEUE_SIZE)
+        self.dropped = 0
+
+    def offer(self, item: Tuple[str, Optional[str]]) -> None:
+        # Runs on the loop; never blocks the upstream thread
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+
+class _Upstream:
+    """A shared ``follow`` stream of one pod container."""
+
+    def __init__(self, hub: "PodLogHub", key: StreamKey, label: str):
+        self.hub = hub
+        self.key = key
+        self.label = label
+        self.viewers: set = set()
+        self.lock = threading.Lock()
+        self.last_stamp: Optional[str] = None
+        self.ended = False
+        # Set once the follow request is open (or has failed): a backlog
+        # read after this overlaps the live lines instead of leaving a gap
+        self.opened = threading.Event()
+        self.thread = threading.Thread(
+            target=self._run, name=f"pod-logs-{key[2]}", daemon=True
+        )
+
+    def subscribe(self, viewer: _Viewer) -> None:
+        """Add a viewer; it receives every line published from now on."""
+        with self.lock:
+            if self.ended:
+                viewer.offer((self.label, None))
+            self.viewers.add(viewer)
+
+    def unsubscribe(self, viewer: _Viewer) -> bool:
+        """Remove a viewer; returns True if it was the last one."""
+        with self.lock:
+            self.viewers.discard(viewer)
+            return not self.viewers
+
+    def _publish(self, line: Optional[str]) -> None:
+        with self.lock:
+            if line is None:
+                self.ended = True
+            viewers = list(self.viewers)
+        for viewer in viewers:
+            viewer.loop.call_soon_threadsafe(viewer.offer, (self.label, line))
+
+    def _open(self):
+        context, namespace, pod, container = self.key
+        kwargs = {}
+        if self.last_stamp is None:
+            # Live lines only; viewers read their own backlog
+            kwargs["tail_lines"] = 0
+        else:
+            # Resume: ask for a little more and skip what we already have
+            elapsed = time.time() - _stamp_seconds(self.last_stamp)
+            kwargs["since_seconds"] = max(1, int(elapsed) + 2)
+        return self.hub.kube.core_v1(context).read_namespaced_pod_log(
+            pod,
+            namespace,
+            container=container,
+            follow=True,
+            timestamps=True,
+            _preload_content=False,
+            _request_timeout=(
+                settings.KUBERNETES_REQUEST_TIMEOUT,
+                settings.POD_LOGS_IDLE_TIMEOUT,
+            ),
+            **kwargs,
+        )
+
+    def _run(self) -> None:
+        metrics.inc("idp_pod_log_upstreams_total")
+        try:
+            while True:
+                try:
+                    response = self._open()
+                except ApiException as e:
+                    logger.warning(f"Cannot follow logs of {self.label}: {e.reason}")
+                    return
+                self.opened.set()
+                try:
+                    ended = self._read(response)
+                except Exception:
+                    # Read timeout on a quiet stream, or a dropped connection
+                    ended = False
+                finally:
+                    response.release_conn()
+                with self.lock:
+                    idle = not self.viewers
+                if ended or idle:
+                    return
+        except Exception as e:
+            logger.warning(f"Log stream of {self.label} failed: {e}")
+        finally:
+            self.opened.set()
+            self.hub._discard(self)
+            # Tells remaining viewers this container's stream is over
+            self._publish(None)
+
+    def _read(self, response) -> bool:
+        """Publish lines until the stream ends (True) or viewers leave."""
+        pending = b""
+        resume_after = _stamp_key(self.last_stamp) if self.last_stamp else None
+        for chunk in response.stream(4096):
+            pending += chunk
+            *lines, pending = pending.split(b"\n")
+            for raw in lines:
+                line = raw.decode("utf-8", errors="replace")
+                stamp, _ = split_timestamp(line)
+                if resume_after is not None and _stamp_key(stamp) <= resume_after:
+                    continue
+                self.last_stamp = stamp
+                self._publish(line)
+            with self.lock:
+                if not self.viewers:
+                    return False
+        if pending:
+            self._publish(pending.decode("utf-8", errors="replace"))
+        return True
+
+
+def _split_lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    """Decode a chunked log response into lines."""
+    pending = b""
+    for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for raw in lines:
+            yield raw.decode("utf-8", errors="replace")
+    if pending:
+        yield pending.decode("utf-8", errors="replace")
+
+
+def _stamp_key(stamp: str) -> str:
+    """Sortable form of an RFC3339Nano stamp (trailing zeros are trimmed)."""
+    base, dot, fraction = stamp.rstrip("Z").partition(".")
+    return f"{base}.{fraction.ljust(9, '0')}" if dot else f"{base}.000000000"
+
+
+def _stamp_seconds(stamp: str) -> float:
+    try:
+        parsed = datetime.strptime(stamp[:19], "%Y-%m-%dT%H:%M:%S")
+    except ValueError:
+        return time.time()
+    return parsed.replace(tzinfo=timezone.utc).timestamp()
+
+
+class PodLogHub:
+    """Serves pod logs, sharing upstream follow streams between viewers."""
+
+    def __init__(self, kube: KubernetesService = kubernetes_service):
+        self.kube = kube
+        self._lock = threading.Lock()
+        self._upstreams: Dict[StreamKey, _Upstream] = {}
+        self._followers: Dict[str, int] = {}
+
+    # --- Targets ---
+    def containers(
+        self,
+        namespace: str,
+        context: Optional[str] = None,
+        pod: Optional[str] = None,
+        container: Optional[str] = None,
+    ) -> List[Tuple[str, str]]:
+        """``(pod, container)`` pairs to stream, optionally narrowed down."""
+        pods = self.kube.core_v1(context).list_namespaced_pod(
+            namespace, _request_timeout=settings.KUBERNETES_REQUEST_TIMEOUT
+        )
+        targets = []
+        for item in pods.items:
+            if pod and item.metadata.name != pod:
+                continue
+            for spec in item.spec.containers:
+                if container and spec.name != container:
+                    continue
+                targets.append((item.metadata.name, spec.name))
+        return sorted(targets)
+
+    # --- Follower cap ---
+    def acquire_follower(self, website_id: str) -> bool:
+        with self._lock:
+            count = self._followers.get(website_id, 0)
+            if count >= settings.POD_LOGS_MAX_FOLLOWERS:
+                return False
+            self._followers[website_id] = count + 1
+        return True
+
+    def release_follower(self, website_id: str) -> None:
+        with self._lock:
+            count = self._followers.get(website_id, 0) - 1
+            if count > 0:
+                self._followers[website_id] = count
+            else:
+                self._followers.pop(website_id, None)
+
+    # --- One-shot ---
+    def _open_log(
+        self,
+        namespace: str,
+        pod: str,
+        container: str,
+        tail: Optional[int],
+        since_seconds: Optional[int],
+        timestamps: bool,
+        context: Optional[str],
+    ):
+        return self.kube.core_v1(context).read_namespaced_pod_log(
+            pod,
+            namespace,
+            container=container,
+            tail_lines=tail,
+            since_seconds=since_seconds,
+            timestamps=timestamps,
+            _preload_content=False,
+            _request_timeout=settings.KUBERNETES_REQUEST_TIMEOUT,
+        )
+
+    def read(
+        self,
+        namespace: str,
+        targets: List[Tuple[str, str]],
+        tail: Optional[int],
+        since_seconds: Optional[int],
+        timestamps: bool,
+        context: Optional[str] = None,
+    ) -> Iterator[str]:
+        """Return an iterator over each container's log lines in turn.
+
+        Blocks until the first container's log is open and its first chunk
+        read, so an ApiException for it is raised here, before a response
+        has been started.
+        """
+        pod, container = targets[0]
+        response = self._open_log(
+            namespace, pod, container, tail, since_seconds, timestamps, context
+        )
+        try:
+            chunks = response.stream(4096)
+            first = next(chunks, b"")
+        except BaseException:
+            response.release_conn()
+            raise
+        return self._read_all(
+            namespace,
+            targets,
+            tail,
+            since_seconds,
+            timestamps,
+            context,
+            (response, itertools.chain([first], chunks)),
+        )
+
+    def _read_all(
+        self,
+        namespace: str,
+        targets: List[Tuple[str, str]],
+        tail: Optional[int],
+        since_seconds: Optional[int],
+        timestamps: bool,
+        context: Optional[str],
+        opened: Optional[Tuple[Any, Iterator[bytes]]],
+    ) -> Iterator[str]:
+        """Yield each container's lines; ``opened`` is the first one's."""
+        for pod, container in targets:
+            prefix = f"[{pod}/{container}] " if len(targets) > 1 else ""
+            if opened is not None:
+                (response, chunks), opened = opened, None
+            else:
+                try:
+                    response = self._open_log(
+                        namespace,
+                        pod,
+                        container,
+                        tail,
+                        since_seconds,
+                        timestamps,
+                        context,
+                    )
+                except ApiException as e:
+                    yield f"{prefix}error: cannot read logs: {e.reason}"
+                    continue
+                chunks = response.stream(4096)
+            try:
+                for line in _split_lines(chunks):
+                    yield prefix + line
+            except Exception as e:
+                # Too late for an error status: the response has started
+                yield f"{prefix}error: log stream interrupted: {e}"
+            finally:
+                response.release_conn()
+
+    # --- Follow ---
+    def _backlog(
+        self,
+        namespace: str,
+        upstreams: List[_Upstream],
+        tail: Optional[int],
+        since_seconds: Optional[int],
+        context: Optional[str],
+    ) -> Dict[str, List[str]]:
+        """Each container's backlog (with timestamps), read after it is live.
+
+        Also waits for upstreams when there is no backlog to read, so that
+        "live" starts from a known point.
+        """
+        backlog: Dict[str, List[str]] = {}
+        for upstream in upstreams:
+            _, _, pod, container = upstream.key
+            upstream.opened.wait(settings.KUBERNETES_REQUEST_TIMEOUT)
+            if not tail:
+                continue
+            try:
+                response = self._open_log(
+                    namespace, pod, container, tail, since_seconds, True, context
+                )
+            except ApiException as e:
+                logger.warning(
+                    f"Cannot read log backlog of {upstream.label}: {e.reason}"
+                )
+                continue
+            try:
+                backlog[upstream.label] = list(_split_lines(response.stream(4096)))
+            finally:
+                response.release_conn()
+        return backlog
+
+    async def follow(
+        self,
+        namespace: str,
+        targets: List[Tuple[str, str]],
+        tail: Optional[int],
+        since_seconds: Optional[int],
+        timestamps: bool,
+        context: Optional[str] = None,
+    ) -> AsyncIterator[Optional[str]]:
+        """Yield backlog, then live lines; ``None`` is a heartbeat tick.
+
+        Ends once every followed container's stream has ended.
+        """
+        viewer = _Viewer(asyncio.get_running_loop())
+        subscribed: List[_Upstream] = []
+        # label -> stamp key of the last backlog line; live lines up to it
+        # are already shown
+        shown_until: Dict[str, str] = {}
+        try:
+            for pod, container in targets:
+                upstream = self._upstream(
+                    (context, namespace, pod, container), f"{pod}/{container}"
+                )
+                upstream.subscribe(viewer)
+                subscribed.append(upstream)
+
+            if tail is None:
+                tail = settings.POD_LOGS_MAX_TAIL
+            backlog = await run_in_threadpool(
+                self._backlog, namespace, subscribed, tail, since_seconds, context
+            )
+            for label, lines in backlog.items():
+                if lines:
+                    shown_until[label] = _stamp_key(split_timestamp(lines[-1])[0])
+                for line in lines:
+                    yield self._format(line, label, len(targets), timestamps)
+
+            open_streams = len(targets)
+            while open_streams:
+                try:
+                    label, line = await asyncio.wait_for(
+                        viewer.queue.get(), settings.POD_LOGS_HEARTBEAT
+                    )
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if viewer.dropped:
+                    metrics.inc("idp_pod_log_lines_dropped_total", viewer.dropped)
+                    yield f"... {viewer.dropped} line(s) dropped (client too slow)"
+                    viewer.dropped = 0
+                if line is None:
+                    open_streams -= 1
+                    continue
+                until = shown_until.get(label)
+                if until is not None:
+                    if _stamp_key(split_timestamp(line)[0]) <= until:
+                        continue
+                    del shown_until[label]
+                yield self._format(line, label, len(targets), timestamps)
+        finally:
+            for upstream in subscribed:
+                if upstream.unsubscribe(viewer):
+                    # Its thread exits at the next line or idle timeout
+                    self._discard(upstream)
+
+    def _upstream(self, key: StreamKey, label: str) -> _Upstream:
+        with self._lock:
+            upstream = self._upstreams.get(key)
+            if upstream is None or upstream.ended:
+                upstream = self._upstreams[key] = _Upstream(self, key, label)
+                upstream.thread.start()
+            return upstream
+
+    def _discard(self, upstream: _Upstream) -> None:
+        with self._lock:
+            if self._upstreams.get(upstream.key) is upstream:
+                del self._upstreams[upstream.key]
+
+    @staticmethod
+    def _format(line: str, label: str, streams: int, timestamps: bool) -> str:
+        if not timestamps:
+            line = split_timestamp(line)[1]
+        return f"[{label}] {line}" if streams > 1 else line
+
+
+# Create singleton instance
+pod_log_hub = PodLogHub()
@@ -0,0 +1,214 @@
+"""
+Cancellable subprocesses for git/kubectl calls made on behalf of a job.
+
+- ``job_context(job_id)`` marks the code running inside it as working for a
+  job (a context variable, so it follows asyncio tasks and threads started
+  with ``contextvars.copy_context``).
+- ``run()`` starts every child in its own session/process group, records the
+  group in memory and in Redis (``idp:job-procs:<job_id>``, tagged with the
+  hostname), and refuses to start anything for a job that was cancelled.
+- ``request_cancel(job_id)`` sets a Redis flag and publishes on
+  ``idp:job-cancel``; the listener thread in every API and worker process
+  kills the job's process groups that live on its host.
+"""
+
+import contextvars
+import logging
+import os
+import signal
+import socket
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Set
+
+import redis
+from app.database.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+CANCEL_CHANNEL = "idp:job-cancel"
+CANCELLED_PREFIX = "idp:job-cancelled:"
+PROCS_PREFIX = "idp:job-procs:"
+CANCEL_FLAG_TTL = 24 * 60 * 60
+KILL_GRACE_SECONDS = 5.0
+
+current_job_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "current_job_id", default=None
+)
+
+
+class JobCancelledError(Exception):
+    """Raised when work is attempted for a job that has been cancelled."""
+
+
+class ProcessRegistry:
+    """Tracks child process groups per job and kills them on cancellation."""
+
+    def __init__(self, client: redis.Redis = redis_client):
+        self.client = client
+        self.hostname = socket.gethostname()
+        self._lock = threading.Lock()
+        self._groups: Dict[str, Set[int]] = {}
+        self._cancelled: Set[str] = set()
+        self._listener: Optional[threading.Thread] = None
+
+    # --- Job context ---
+    @contextmanager
+    def job_context(self, job_id: str) -> Iterator[None]:
+        token = current_job_id.set(job_id)
+        try:
+            yield
+        finally:
+            current_job_id.reset(token)
+
+    def is_cancelled(self, job_id: Optional[str] = None) -> bool:
+        job_id = job_id or current_job_id.get()
+        if not job_id:
+            return False
+        if job_id in self._cancelled:
+            return True
+        try:
+            return bool(self.client.exists(CANCELLED_PREFIX + job_id))
+        except redis.RedisError:
+            return False
+
+    def raise_if_cancelled(self, job_id: Optional[str] = None) -> None:
+        job_id = job_id or current_job_id.get()
+        if self.is_cancelled(job_id):
+            raise JobCancelledError(f"Job {job_id} was cancelled")
+
+    # --- Subprocesses ---
+    def _register(self, job_id: str, pgid: int) -> None:
+        with self._lock:
+            self._groups.setdefault(job_id, set()).add(pgid)
+        try:
+            key = PROCS_PREFIX + job_id
+            self.client.sadd(key, f"{self.hostname}:{pgid}")
+            self.client.expire(key, CANCEL_FLAG_TTL)
+        except redis.RedisError:
+            pass
+
+    def _unregister(self, job_id: str, pgid: int) -> None:
+        with self._lock:
+            self._groups.get(job_id, set()).discard(pgid)
+        try:
+            self.client.srem(PROCS_PREFIX + job_id, f"{self.hostname}:{pgid}")
+        except redis.RedisError:
+            pass
+
+    def run(
+        self,
+        cmd: List[str],
+        cwd=None,
+        check: bool = False,
+        timeout: Optional[float] = None,
+        input: Optional[str | bytes] = None,
+        text: bool = True,
+    ) -> subprocess.CompletedProcess:
+        """Like ``subprocess.run(capture_output=True, text=True)``, cancellable.
+
+        Pass ``text=False`` for raw bytes output (``input`` must be bytes).
+        """
+        job_id = current_job_id.get()
+        if job_id:
+            self.raise_if_cancelled(job_id)
+        process = subprocess.Popen(
+            cmd,
+            cwd=cwd,
+            stdin=subprocess.PIPE if input is not None else None,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=text,
+            start_new_session=True,
+        )
+        if job_id:
+            self._register(job_id, process.pid)
+        try:
+            stdout, stderr = process.communicate(input=input, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self._kill_group(process.pid)
+            stdout, stderr = process.communicate()
+            raise
+        finally:
+            if job_id:
+                self._unregister(job_id, process.pid)
+        if job_id and process.returncode < 0 and self.is_cancelled(job_id):
+            raise JobCancelledError(f"Job {job_id} was cancelled")
+        result = subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+        if check:
+            result.check_returncode()
+        return result
+
+    # --- Cancellation ---
+    def _kill_group(self, pgid: int) -> None:
+        try:
+            os.killpg(pgid, signal.SIGTERM)
+        except ProcessLookupError:
+            return
+        deadline = time.monotonic() + KILL_GRACE_SECONDS
+        while time.monotonic() < deadline:
+            try:
+                os.killpg(pgid, 0)
+            except ProcessLookupError:
+                return
+            time.sleep(0.1)
+        try:
+            os.killpg(pgid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    def kill_job_processes(self, job_id: str) -> int:
+        """Kill every process group of ``job_id`` that runs on this host."""
+        with self._lock:
+            self._cancelled.add(job_id)
+            groups = set(self._groups.get(job_id, set()))
+        try:
+            for member in self.client.smembers(PROCS_PREFIX + job_id):
+                host, _, pgid = member.decode().rpartition(":")
+                if host == self.hostname:
+                    groups.add(int(pgid))
+        except redis.RedisError:
+            pass
+        for pgid in groups:
+            self._kill_group(pgid)
+        if groups:
+            logger.info(f"Killed {len(groups)} process group(s) for job {job_id}")
+        return len(groups)
+
+    def request_cancel(self, job_id: str) -> None:
+        """Flag a job as cancelled and tell every process to kill its children."""
+        self.client.set(CANCELLED_PREFIX + job_id, "1", ex=CANCEL_FLAG_TTL)
+        self.client.publish(CANCEL_CHANNEL, job_id)
+        # Handle local children right away in case no listener is running
+        self.kill_job_processes(job_id)
+
+    def _listen(self) -> None:
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(CANCEL_CHANNEL)
+                for message in pubsub.listen():
+                    job_id = message["data"]
+                    if isinstance(job_id, bytes):
+                        job_id = job_id.decode()
+                    threading.Thread(
+                        target=self.kill_job_processes, args=(job_id,), daemon=True
+                    ).start()
+            except Exception as e:
+                logger.warning(f"Cancel listener error: {e}")
+                time.sleep(5)
+
+    def start_listener(self) -> None:
+        """Start the cancellation listener thread for this process."""
+        if self._listener and self._listener.is_alive():
+            return
+        self._listener = threading.Thread(
+            target=self._listen, name="job-cancel-listener", daemon=True
+        )
+        self._listener.start()
+
+
+# Create singleton instance
+process_registry = ProcessRegistry()
@@ -0,0 +1,198 @@
+"""
+On-demand per-request profiling.
+
+``ProfilingMiddleware`` is only installed when PROFILING_ENABLED is set, so
+it costs nothing otherwise. When installed, it profiles a request with
+cProfile if either:
+- the request sends ``X-Profile: 1`` together with a valid
+  ``X-Admin-Token`` (PROFILING_ADMIN_TOKEN), or
+- it is picked by PROFILING_SAMPLE_RATE.
+
+One request is profiled at a time; others pass through untouched. The
+profile is written in pstats format (open with ``python -m pstats``,
+snakeviz, or convert for speedscope) to PROFILING_DIR. Only the newest
+PROFILING_MAX_FILES are kept. Profiled responses carry ``X-Profile-Id``,
+the name to download from ``/api/v1/profiles/<name>``.
+
+Limits of profiling on the event loop:
+- cProfile records the thread it runs on, not the request. While a request
+  is profiled, every other coroutine the loop runs (other requests,
+  background tasks) is recorded into the same profile. The log line of
+  each profile says how many other requests overlapped it; treat a profile
+  with overlaps as a view of the whole process, or take profiles when the
+  instance is quiet.
+- Time spent in sync routes or ``run_in_threadpool`` shows up as the await
+  that waited for it.
+- Profiling stops after PROFILING_MAX_SECONDS even if the request goes on
+  (e.g. a followed log stream), and the profile is saved as it stands.
+"""
+
+import asyncio
+import cProfile
+import hmac
+import logging
+import random
+import re
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_NAME = re.compile(r"^[\w.-]+\.prof$")
+
+
+def admin_token_valid(token: Optional[str]) -> bool:
+    expected = settings.PROFILING_ADMIN_TOKEN
+    if not expected or not token:
+        return False
+    return hmac.compare_digest(token.encode(), expected.encode())
+
+
+class ProfileStore:
+    """Bounded directory of saved profiles."""
+
+    def __init__(self, directory: Optional[str] = None, max_files: int = 0):
+        self.directory = Path(directory or settings.PROFILING_DIR)
+        self.max_files = max_files or settings.PROFILING_MAX_FILES
+        self._lock = threading.Lock()
+
+    def new_name(self, method: str, path: str) -> str:
+        slug = re.sub(r"[^\w-]+", "_", path.strip("/")) or "root"
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+        return f"{stamp}-{method.lower()}-{slug[:60]}.prof"
+
+    def save(self, profiler: cProfile.Profile, name: str) -> None:
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(str(self.directory / name))
+            files = sorted(self.directory.glob("*.prof"))
+            for old in files[: max(0, len(files) - self.max_files)]:
+                old.unlink(missing_ok=True)
+
+    def list(self) -> List[dict]:
+        if not self.directory.exists():
+            return []
+        profiles = []
+        for path in sorted(self.directory.glob("*.prof"), reverse=True):
+            stat = path.stat()
+            profiles.append(
+                {
+                    "name": path.name,
+                    "size": stat.st_size,
+                    "created_at": datetime.utcfromtimestamp(stat.st_mtime),
+                }
+            )
+        return profiles
+
+    def path(self, name: str) -> Optional[Path]:
+        """File of profile ``name``, or None (also for unsafe names)."""
+        if not PROFILE_NAME.match(name):
+            return None
+        path = self.directory / name
+        return path if path.is_file() else None
+
+
+class _Session:
+    """A running profile of one request."""
+
+    def __init__(self, name: str, overlapping: int):
+        self.name = name
+        self.profiler = cProfile.Profile()
+        self.started = time.perf_counter()
+        self.overlapping = overlapping
+        self.stopped = False
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles selected requests with cProfile."""
+
+    def __init__(self, app, store: Optional["ProfileStore"] = None):
+        self.app = app
+        self.store = store or profile_store
+        # cProfile cannot nest: profile one request at a time
+        self._busy = threading.Lock()
+        # Requests in flight on this loop, to report profile overlaps
+        self._in_flight = 0
+        self._session: Optional[_Session] = None
+
+    def _wanted(self, scope) -> bool:
+        headers = dict(scope.get("headers") or [])
+        if headers.get(b"x-profile") == b"1":
+            token = headers.get(b"x-admin-token", b"").decode("latin-1")
+            return admin_token_valid(token)
+        rate = settings.PROFILING_SAMPLE_RATE
+        return rate > 0 and random.random() < rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        self._in_flight += 1
+        try:
+            if self._session is not None:
+                self._session.overlapping += 1
+            if self._wanted(scope) and self._busy.acquire(blocking=False):
+                await self._profile(scope, receive, send)
+            else:
+                await self.app(scope, receive, send)
+        finally:
+            self._in_flight -= 1
+
+    async def _profile(self, scope, receive, send):
+        session = self._session = _Session(
+            self.store.new_name(scope["method"], scope["path"]),
+            overlapping=self._in_flight - 1,
+        )
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers") or [])
+                headers.append((b"x-profile-id", session.name.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        # Runs on the loop thread, like enable(): cProfile is per thread
+        cutoff = asyncio.get_running_loop().call_later(
+            settings.PROFILING_MAX_SECONDS, self._finish, scope, session, True
+        )
+        try:
+            session.profiler.enable()
+            await self.app(scope, receive, send_with_id)
+        finally:
+            cutoff.cancel()
+            self._finish(scope, session, False)
+
+    def _finish(self, scope, session: _Session, truncated: bool) -> None:
+        if session.stopped:
+            return
+        session.profiler.disable()
+        session.stopped = True
+        self._session = None
+        self._busy.release()
+        elapsed = time.perf_counter() - session.started
+        notes = []
+        if truncated:
+            notes.append(f"stopped after {settings.PROFILING_MAX_SECONDS:g}s")
+        if session.overlapping:
+            notes.append(
+                f"{session.overlapping} other request(s) overlapped and are "
+                "included"
+            )
+        suffix = f" [{'; '.join(notes)}]" if notes else ""
+        try:
+            self.store.save(session.profiler, session.name)
+            logger.info(
+                f"Profiled {scope['method']} {scope['path']} "
+                f"({elapsed * 1000:.1f} ms) -> {session.name}{suffix}"
+            )
+        except OSError as e:
+            logger.warning(f"Failed to save profile {session.name}: {e}")
+
+
+# Create singleton instance
+profile_store = ProfileStore()
@@ -0,0 +1,106 @@
+"""
+Shared outbox of values changes waiting to be pushed.
+
+Entries live in one Redis hash keyed by website ID, so API processes, RQ
+workers and replicas all queue into the outbox the leader drains.
+Repeated changes for the same website collapse into a single entry that
+keeps the strongest pending action: a later "updated" or "reconciled"
+change never replaces a queued "created" (whose drain resumes
+provisioning) or "deleted". Entries carry the rendered values file, so
+the leader can push it without sharing the values directory.
+"""
+
+import json
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+import redis
+from app.database.redis import redis_client
+from app.services.metrics import metrics
+
+OUTBOX_KEY = "idp:push-outbox"
+
+# The higher rank survives a collapse; on a tie the later change wins
+ACTION_RANK = {"updated": 0, "reconciled": 1, "created": 2, "deleted": 2}
+
+
+class PushOutbox:
+    """Pending values pushes, keyed by website ID."""
+
+    def __init__(self, client: redis.Redis = redis_client, key: str = OUTBOX_KEY):
+        self.client = client
+        self.key = key
+
+    def add(
+        self,
+        website_id: str,
+        action: str,
+        namespace: Optional[str] = None,
+        content: Optional[str] = None,
+        job_id: Optional[str] = None,
+    ) -> None:
+        entry = {
+            "website_id": website_id,
+            "action": action,
+            "namespace": namespace,
+            "content": content,
+            "job_id": job_id,
+            "queued_at": datetime.utcnow().isoformat(),
+        }
+
+        def merge(pipe) -> None:
+            raw = pipe.hget(self.key, website_id)
+            if raw is not None:
+                held = json.loads(raw)
+                if ACTION_RANK.get(held["action"], 0) > ACTION_RANK.get(action, 0):
+                    for field in ("action", "namespace", "job_id"):
+                        entry[field] = held.get(field)
+                if entry["content"] is None:
+                    entry["content"] = held.get("content")
+            pipe.multi()
+            pipe.hset(self.key, website_id, json.dumps(entry))
+
+        self.client.transaction(merge, self.key)
+        metrics.set_gauge("idp_push_outbox_depth", self.client.hlen(self.key))
+
+    def get(self, website_ids: Iterable[str]) -> List[dict]:
+        """The pending entries for ``website_ids``."""
+        website_ids = list(website_ids)
+        if not website_ids:
+            return []
+        raws = self.client.hmget(self.key, website_ids)
+        return [json.loads(raw) for raw in raws if raw is not None]
+
+    def pending(self) -> List[dict]:
+        entries = self.client.hgetall(self.key)
+        return [json.loads(entries[k]) for k in sorted(entries)]
+
+    def remove(self, entries: List[dict]) -> List[dict]:
+        """Remove drained entries, keeping any that were re-queued since.
+
+        Returns the entries that were removed.
+        """
+        if not entries:
+            return []
+
+        def drop(pipe) -> List[dict]:
+            ids = [e["website_id"] for e in entries]
+            current = pipe.hmget(self.key, ids)
+            drained = [
+                entry
+                for entry, raw in zip(entries, current)
+                if raw is not None
+                and json.loads(raw).get("queued_at") == entry.get("queued_at")
+            ]
+            pipe.multi()
+            if drained:
+                pipe.hdel(self.key, *[e["website_id"] for e in drained])
+            return drained
+
+        drained = self.client.transaction(drop, self.key, value_from_callable=True)
+        metrics.set_gauge("idp_push_outbox_depth", self.client.hlen(self.key))
+        return drained
+
+
+# Create singleton instance
+push_outbox = PushOutbox()
@@ -0,0 +1,263 @@
+"""
+Three-way reconciliation of websites: database vs values files vs git.
+
+Each source is indexed in a single pass:
+- database: one query over ``websites``, rendering each row's values file;
+- values directory: one read of the ``ValuesLayout`` manifest (files are
+  only opened when their hash does not match the rendered content);
+- git: one shallow fetch plus one ``git ls-tree`` of the values path on
+  the target branch, giving each file's blob hash.
+
+The plan is the minimal set of:
+- renders: rows whose values file is missing or differs in substance;
+- pushes: sites whose file (after renders) differs from the branch blob;
+- deletions: files, local or on the branch, with no live row behind them;
+- status fixes: rows claiming a state the files contradict.
+
+``apply`` executes a plan in batches of RECONCILE_BATCH_SIZE sites, one
+manifest update and one values push per batch. A site's status fix is only
+recorded once its batch is pushed or queued, so a failed batch leaves its
+sites as they were. The task runs in an RQ worker whose values directory
+may not be the leader's: ``ValuesPipeline`` forwards the rendered files
+with each push.
+"""
+
+import hashlib
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+import yaml
+from app.config import settings
+from app.database import SessionLocal
+from app.database.models import Website, WebsiteStatusEnum
+from app.services.github_service import GitHubService, github_service
+from app.services.metrics import metrics
+from app.services.status_buffer import status_buffer
+from app.services.values_layout import content_hash
+from app.services.values_pipeline import values_pipeline
+
+logger = logging.getLogger(__name__)
+
+# States that mean "values should be deployed": re-pushing moves them back
+# to CREATING so the deployment watcher can confirm the rollout
+REPROVISION_FROM = {
+    WebsiteStatusEnum.PENDING,
+    WebsiteStatusEnum.QUEUED,
+    WebsiteStatusEnum.RUNNING,
+    WebsiteStatusEnum.FAILED,
+}
+
+
+def git_blob_hash(data: bytes) -> str:
+    """Object ID git assigns to a blob with this content."""
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+@dataclass
+class _Row:
+    status: Optional[WebsiteStatusEnum]
+    namespace: Optional[str]
+    content: str
+    values: dict
+
+
+@dataclass
+class ReconcilePlan:
+    """What ``Reconciler.apply`` would change."""
+
+    renders: Dict[str, str] = field(default_factory=dict)  # id -> content
+    pushes: List[str] = field(default_factory=list)
+    deletions: List[str] = field(default_factory=list)
+    status_fixes: Dict[str, WebsiteStatusEnum] = field(default_factory=dict)
+    namespaces: Dict[str, Optional[str]] = field(default_factory=dict)
+
+    @property
+    def empty(self) -> bool:
+        return not (self.renders or self.pushes or self.deletions or self.status_fixes)
+
+    def to_dict(self) -> dict:
+        return {
+            "renders": sorted(self.renders),
+            "pushes": sorted(self.pushes),
+            "deletions": sorted(self.deletions),
+            "status_fixes": {
+                website_id: status.value
+                for website_id, status in sorted(self.status_fixes.items())
+            },
+            "summary": {
+                "renders": len(self.renders),
+                "pushes": len(self.pushes),
+                "deletions": len(self.deletions),
+                "status_fixes": len(self.status_fixes),
+            },
+        }
+
+
+class Reconciler:
+    """Computes and applies ``ReconcilePlan``s."""
+
+    def __init__(self, service: GitHubService = github_service):
+        self.service = service
+
+    # --- Indexes ---
+    def _db_index(self) -> Dict[str, _Row]:
+        with SessionLocal() as db:
+            return {
+                str(w.website_id): _Row(
+                    status=w.status,
+                    namespace=w.namespace,
+                    content=w.to_values_file(),
+                    values=w.to_helm_values(),
+                )
+                for w in db.query(Website).all()
+            }
+
+    def _git_index(self) -> Dict[str, str]:
+        """``{website_id: blob hash}`` of values files on the target branch."""
+        branch = self.service.target_branch
+        ok, output = self.service.git_command(self.service.checkout.fetch_args(branch))
+        if not ok:
+            raise RuntimeError(f"Failed to fetch origin/{branch}: {output}")
+        return self.service.committed_values_index(f"origin/{branch}")
+
+    def _local_blob(self, website_id: str, entry: dict, row: _Row) -> Optional[str]:
+        """Blob hash of the local file, or None if it must be re-rendered."""
+        expected = row.content.encode()
+        if entry["sha256"] == content_hash(expected):
+            return git_blob_hash(expected)
+        try:
+            data = (self.service.values_dir / entry["path"]).read_bytes()
+        except OSError:
+            return None
+        try:
+            same = yaml.safe_load(data) == row.values
+        except yaml.YAMLError:
+            same = False
+        # Header-only differences (e.g. timestamp format) are not drift
+        return git_blob_hash(data) if same else None
+
+    # --- Plan ---
+    def plan(self) -> ReconcilePlan:
+        rows = self._db_index()
+        local = self.service.layout.manifest()
+        remote = self._git_index()
+
+        plan = ReconcilePlan()
+        for website_id in sorted(set(rows) | set(local) | set(remote)):
+            row = rows.get(website_id)
+            live = row is not None and row.status != WebsiteStatusEnum.DELETING
+            if not live:
+                if website_id in local or website_id in remote:
+                    plan.deletions.append(website_id)
+                continue
+
+            entry = local.get(website_id)
+            blob = self._local_blob(website_id, entry, row) if entry else None
+            if blob is None:
+                plan.renders[website_id] = row.content
+                blob = git_blob_hash(row.content.encode())
+            if remote.get(website_id) != blob:
+                plan.pushes.append(website_id)
+                plan.namespaces[website_id] = row.namespace
+                if row.status in REPROVISION_FROM:
+                    plan.status_fixes[website_id] = WebsiteStatusEnum.CREATING
+            elif row.status in (WebsiteStatusEnum.PENDING, WebsiteStatusEnum.QUEUED):
+                # Values are already live on the branch
+                plan.status_fixes[website_id] = WebsiteStatusEnum.CREATING
+                plan.namespaces[website_id] = row.namespace
+
+        for key, items in plan.to_dict()["summary"].items():
+            metrics.set_gauge("idp_reconcile_planned", items, action=key)
+        return plan
+
+    # --- Apply ---
+    def apply(
+        self,
+        plan: ReconcilePlan,
+        force: bool = False,
+        progress: Optional[Callable[[int, int], None]] = None,
+    ) -> dict:
+        """Execute ``plan``; returns counts of what was done.
+
+        Refuses to delete more than RECONCILE_MAX_DELETIONS sites unless
+        ``force`` is set, so an empty or wrong database cannot wipe the
+        branch.
+        """
+        if len(plan.deletions) > settings.RECONCILE_MAX_DELETIONS and not force:
+            raise ValueError(
+                f"Plan deletes {len(plan.deletions)} sites (limit "
+                f"{settings.RECONCILE_MAX_DELETIONS}); re-run with force"
+            )
+
+        # Sites already live on the branch only need their status fixed
+        planned = set(plan.pushes)
+        for website_id, status in plan.status_fixes.items():
+            if website_id not in planned:
+                self._fix_status(website_id, status, plan)
+
+        work = sorted(set(plan.renders) | set(plan.pushes) | set(plan.deletions))
+        size = settings.RECONCILE_BATCH_SIZE
+        done = {"rendered": 0, "pushed": 0, "deleted": 0, "queued": 0}
+        deletions = set(plan.deletions)
+        for start in range(0, len(work), size):
+            batch = work[start : start + size]
+            renders = {i: plan.renders[i] for i in batch if i in plan.renders}
+            removed = [i for i in batch if i in deletions]
+            if renders:
+                self.service.layout.write_many(renders)
+            self.service.layout.remove_many(removed)
+
+            # The manifests may agree while the branch blob differs: force
+            # the planned pushes instead of trusting them
+            pushes = [i for i in batch if i not in deletions]
+            result = values_pipeline.push(
+                f"reconcile batch {start // size + 1}",
+                "reconciled",
+                removed=removed,
+                force=pushes,
+            )
+            fixes = {
+                i: plan.status_fixes[i]
+                for i in pushes
+                if i in planned and i in plan.status_fixes
+            }
+            if result.get("queued"):
+                done["queued"] += len(batch)
+                for website_id, status in fixes.items():
+                    if status == WebsiteStatusEnum.CREATING:
+                        # The outbox drain resumes provisioning once pushed
+                        values_pipeline.outbox.add(
+                            website_id, "created", plan.namespaces.get(website_id)
+                        )
+                        status = WebsiteStatusEnum.QUEUED
+                    status_buffer.record(website_id, status=status)
+            elif not result["success"]:
+                raise RuntimeError(f"Reconcile push failed: {result['message']}")
+            else:
+                done["pushed"] += len(pushes)
+                values_pipeline.mark_deleted(removed)
+                for website_id, status in fixes.items():
+                    self._fix_status(website_id, status, plan)
+            done["rendered"] += len(renders)
+            done["deleted"] += len(removed)
+            if progress:
+                progress(min(start + size, len(work)), len(work))
+
+        status_buffer.flush()
+        done["status_fixes"] = len(plan.status_fixes)
+        metrics.inc("idp_reconcile_runs_total")
+        return done
+
+    @staticmethod
+    def _fix_status(
+        website_id: str, status: WebsiteStatusEnum, plan: ReconcilePlan
+    ) -> None:
+        """Record a fix for a site whose values are on the branch."""
+        status_buffer.record(website_id, status=status)
+        if status == WebsiteStatusEnum.CREATING:
+            values_pipeline.mark_pushed(website_id, plan.namespaces.get(website_id))
+
+
+# Create singleton instance
+reconciler = Reconciler()
@@ -0,0 +1,148 @@
+"""
+Bootstrap and upkeep of the local apps-repo checkout.
+
+The repo gains one commit per website, so a full clone grows without bound.
+A checkout managed here is instead:
+- a blobless partial clone (``--filter=blob:none``): file contents are only
+  downloaded for paths that are actually checked out;
+- sparse (cone mode), limited to the values directory and ``apps/``;
+- shallow: fetches of the branch are limited to GIT_FETCH_DEPTH commits.
+
+Managed clones are marked with ``idp.managed=true`` in their git config. An
+existing full clone (e.g. a developer's working copy) is left alone unless
+GIT_SPARSE_CONVERT_EXISTING is set, since going sparse hides its other files.
+"""
+
+import fcntl
+import logging
+import subprocess
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from app.config import settings
+from app.services.metrics import metrics
+from app.services.process_registry import JobCancelledError, process_registry
+
+logger = logging.getLogger(__name__)
+
+SPARSE_PATHS = ("idp/backend/website-template/values", "apps")
+MANAGED_KEY = "idp.managed"
+
+
+class RepoCheckout:
+    """A sparse, shallow, blobless clone of GIT_REPO_URL at ``path``."""
+
+    def __init__(
+        self,
+        path: str | Path,
+        url: Optional[str] = None,
+        branch: str = "main",
+        sparse_paths: Tuple[str, ...] = SPARSE_PATHS,
+        depth: Optional[int] = None,
+    ):
+        self.path = Path(path)
+        self.url = url or settings.GIT_REPO_URL
+        self.branch = branch
+        self.sparse_paths = sparse_paths
+        self.depth = settings.GIT_FETCH_DEPTH if depth is None else depth
+        self._managed: Optional[bool] = None
+
+    def _git(self, args: List[str], cwd: Optional[Path] = None) -> str:
+        result = process_registry.run(
+            ["git"] + args, cwd=cwd or self.path, check=True
+        )
+        return result.stdout
+
+    @property
+    def managed(self) -> bool:
+        """True if the checkout was bootstrapped (or converted) by us."""
+        if self._managed is None:
+            try:
+                value = self._git(["config", "--get", MANAGED_KEY]).strip()
+                self._managed = value == "true"
+            except (subprocess.CalledProcessError, OSError):
+                self._managed = False
+        return self._managed
+
+    def fetch_args(self, branch: Optional[str] = None) -> List[str]:
+        """git arguments to fetch ``branch``, shallow for managed clones."""
+        args = ["fetch"]
+        if self.managed and self.depth > 0:
+            args += ["--depth", str(self.depth)]
+        return args + ["origin", branch or self.branch]
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Serialize ensure() across processes sharing the checkout."""
+        # Beside the repo, which may not exist yet
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        lock_path = self.path.parent / f".{self.path.name}.checkout.lock"
+        with open(lock_path, "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def ensure(self) -> bool:
+        """Clone the repo if missing, or convert it when configured to.
+
+        Returns True if the checkout is sparse/shallow-managed afterwards.
+        """
+        started = time.monotonic()
+        try:
+            with self._locked():
+                # Another process may have cloned/converted while we waited
+                self._managed = None
+                if not (self.path / ".git").exists():
+                    self._clone()
+                elif not self.managed and settings.GIT_SPARSE_CONVERT_EXISTING:
+                    self._convert()
+                elif self.managed:
+                    # Keep the cone in sync with SPARSE_PATHS across upgrades
+                    self._git(
+                        ["sparse-checkout", "set", "--cone", *self.sparse_paths]
+                    )
+        except JobCancelledError:
+            raise
+        except (subprocess.CalledProcessError, OSError) as e:
+            stderr = getattr(e, "stderr", "") or str(e)
+            logger.error(f"Failed to prepare checkout at {self.path}: {stderr}")
+            return False
+        metrics.observe(
+            "idp_git_checkout_prepare_seconds", time.monotonic() - started
+        )
+        return self.managed
+
+    def _clone(self) -> None:
+        logger.info(f"Cloning {self.url} ({self.branch}) into {self.path}")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        clone = [
+            "clone",
+            "--filter=blob:none",
+            "--sparse",
+            "--single-branch",
+            "--branch",
+            self.branch,
+        ]
+        if self.depth > 0:
+            clone += ["--depth", str(self.depth)]
+        self._git(clone + [self.url, str(self.path)], cwd=self.path.parent)
+        self._git(["sparse-checkout", "set", "--cone", *self.sparse_paths])
+        self._mark_managed()
+
+    def _convert(self) -> None:
+        logger.info(f"Converting {self.path} to a sparse partial clone")
+        # Later fetches only bring in trees and commits; blobs come on demand
+        self._git(["config", "remote.origin.promisor", "true"])
+        self._git(["config", "remote.origin.partialclonefilter", "blob:none"])
+        self._git(["sparse-checkout", "set", "--cone", *self.sparse_paths])
+        self._mark_managed()
+        if self.depth > 0:
+            self._git(self.fetch_args())
+
+    def _mark_managed(self) -> None:
+        self._git(["config", MANAGED_KEY, "true"])
+        self._managed = True
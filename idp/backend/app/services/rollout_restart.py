@@ -0,0 +1,157 @@
+"""
+Rolling restarts of websites in controlled waves.
+
+Targets are grouped by cluster and namespace; each namespace is restarted
+by patching its deployments' ``restartedAt`` annotation through the
+Kubernetes API (no kubectl processes). Clusters are restarted side by side,
+with two limits:
+- RESTART_PARALLELISM: patch calls in flight at once, across all clusters;
+- RESTART_MAX_SURGE: namespaces per cluster whose rollout is in progress.
+  A namespace counts until the shared deployment watch sees the restarted
+  generation ready, so a fleet-wide restart never has more than this many
+  sites per cluster cycling pods. 0 does not wait for rollouts.
+"""
+
+import contextvars
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from app.config import settings
+from app.services.deployment_watcher import DeploymentWatcher, deployment_watcher
+from app.services.kubernetes_service import KubernetesService, kubernetes_service
+from app.services.metrics import metrics
+from app.services.process_registry import JobCancelledError, process_registry
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RestartTarget:
+    website_id: str
+    cluster: str
+    namespace: str
+
+
+class RolloutRestarter:
+    """Restarts namespaces in per-cluster waves."""
+
+    def __init__(
+        self,
+        kube: KubernetesService = kubernetes_service,
+        watcher: DeploymentWatcher = deployment_watcher,
+    ):
+        self.kube = kube
+        self.watcher = watcher
+
+    def restart(
+        self,
+        targets: List[RestartTarget],
+        parallelism: Optional[int] = None,
+        max_surge: Optional[int] = None,
+        progress: Optional[Callable[[int, int], None]] = None,
+    ) -> Dict[str, dict]:
+        """Restart every target; returns a result per website ID.
+
+        Each result has ``status`` "restarted", "skipped" (no deployments)
+        or "failed", plus a ``message``.
+        """
+        parallelism = parallelism or settings.RESTART_PARALLELISM
+        if max_surge is None:
+            max_surge = settings.RESTART_MAX_SURGE
+        patch_slots = threading.Semaphore(parallelism)
+
+        waves: Dict[str, Dict[str, List[str]]] = {}
+        for target in targets:
+            namespaces = waves.setdefault(target.cluster, {})
+            namespaces.setdefault(target.namespace, []).append(target.website_id)
+
+        results: Dict[str, dict] = {}
+        executors = []
+        futures: Dict[Future, List[str]] = {}
+        try:
+            for cluster, namespaces in sorted(waves.items()):
+                executor = ThreadPoolExecutor(
+                    max_surge or parallelism, thread_name_prefix=f"restart-{cluster}"
+                )
+                executors.append(executor)
+                for namespace, website_ids in sorted(namespaces.items()):
+                    # Each worker thread keeps the job's context (cancellation,
+                    # log and trace IDs)
+                    future = executor.submit(
+                        contextvars.copy_context().run,
+                        self._restart_namespace,
+                        cluster,
+                        namespace,
+                        website_ids[0],
+                        patch_slots,
+                        bool(max_surge),
+                    )
+                    futures[future] = website_ids
+
+            done = 0
+            for future in as_completed(futures):
+                # Leaving cancels every namespace not patched yet
+                process_registry.raise_if_cancelled()
+                website_ids = futures[future]
+                result = future.result()
+                metrics.inc(
+                    "idp_restarts_total", len(website_ids), result=result["status"]
+                )
+                for website_id in website_ids:
+                    results[website_id] = result
+                done += len(website_ids)
+                if progress:
+                    progress(done, len(targets))
+        finally:
+            for executor in executors:
+                executor.shutdown(cancel_futures=True)
+        return results
+
+    def _restart_namespace(
+        self,
+        cluster: str,
+        namespace: str,
+        website_id: str,
+        patch_slots: threading.Semaphore,
+        wait: bool,
+    ) -> dict:
+        process_registry.raise_if_cancelled()
+        context = self.kube.context_for(cluster)
+        try:
+            with patch_slots:
+                # Slots can take a while to free up during a large restart
+                process_registry.raise_if_cancelled()
+                generations = self.kube.restart_deployments(namespace, context)
+        except JobCancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Restart of {cluster}/{namespace} failed: {e}")
+            return {"status": "failed", "message": str(e)}
+        if not generations:
+            return {"status": "skipped", "message": "No deployments"}
+        if not wait:
+            return {"status": "restarted", "message": "Restart triggered"}
+
+        # Watched on the cluster that was patched; the site's status and
+        # deployed_at are left alone (a restart is not a deployment)
+        rollout = self.watcher.wait(
+            namespace,
+            website_id,
+            context=context,
+            generations=generations,
+            record_status=False,
+        )
+        process_registry.raise_if_cancelled()
+        if not rollout.ready:
+            return {
+                "status": "failed",
+                "message": f"Rollout not ready: {rollout.reason or 'timed out'}",
+            }
+        return {"status": "restarted", "message": "Rolled out"}
+
+
+# Create singleton instance
+rollout_restarter = RolloutRestarter()
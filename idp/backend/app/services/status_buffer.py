@@ -0,0 +1,151 @@
+"""
+Write-behind buffer for website status transitions.
+
+Provisioning code records transitions (status, deployed_at, ingress_url, ...)
+instead of committing each one. A background thread flushes the buffer every
+STATUS_FLUSH_INTERVAL seconds, or as soon as STATUS_FLUSH_BATCH_SIZE websites
+are pending, as one executemany UPDATE per column set.
+
+Ordering: within one process, transitions for the same website are merged
+in arrival order (the latest value of each column wins) and flushes are
+serialized, so an older state can never overwrite a newer one. There is no
+ordering across processes: each buffer commits on its own schedule, so
+when the RQ work horse (CREATING, QUEUED, FAILED), the leader (outbox
+drain, deployment watcher) and an API process record transitions for the
+same site, the last flush wins. The work horse flushes at the end of every
+job, normally well before the leader's outbox drain or deployment watcher
+records the next transition, which keeps provisioning in order in practice.
+
+``flush()`` is synchronous and runs at shutdown. Forked children start with
+an empty buffer; the parent writes what it recorded.
+"""
+
+import atexit
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.database import engine
+from app.database.models import Website
+from app.services.website_cache import website_cache
+from sqlalchemy import bindparam, update
+
+logger = logging.getLogger(__name__)
+
+
+class StatusUpdateBuffer:
+    """Collects website column updates and writes them in batches."""
+
+    def __init__(
+        self,
+        flush_interval: Optional[float] = None,
+        batch_size: Optional[int] = None,
+    ):
+        self.flush_interval = flush_interval or settings.STATUS_FLUSH_INTERVAL
+        self.batch_size = batch_size or settings.STATUS_FLUSH_BATCH_SIZE
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    def record(self, website_id: str, **values: Any) -> None:
+        """Queue column updates for a website (keyed by ``website_id``)."""
+        with self._lock:
+            self._pending.setdefault(website_id, {}).update(values)
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self.flush()
+        else:
+            self.start()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self) -> int:
+        """Write all pending updates now; returns the number of websites."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+            try:
+                self._write(pending)
+            except Exception:
+                # Put the batch back underneath anything recorded since
+                with self._lock:
+                    for website_id, values in pending.items():
+                        self._pending[website_id] = {
+                            **values,
+                            **self._pending.get(website_id, {}),
+                        }
+                raise
+            return len(pending)
+
+    def _write(self, pending: Dict[str, Dict[str, Any]]) -> None:
+        # One executemany per distinct set of columns being updated
+        groups: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        for website_id, values in pending.items():
+            columns = tuple(sorted(values))
+            row = {f"b_{c}": v for c, v in values.items()}
+            row["b_website_id"] = website_id
+            groups.setdefault(columns, []).append(row)
+
+        table = Website.__table__
+        with engine.begin() as conn:
+            for columns, rows in groups.items():
+                stmt = (
+                    update(table)
+                    .where(table.c.website_id == bindparam("b_website_id"))
+                    .values({c: bindparam(f"b_{c}") for c in columns})
+                )
+                conn.execute(stmt, rows)
+        # Core UPDATEs bypass the session events that invalidate ORM changes
+        website_cache.invalidate(pending)
+        logger.info(f"Flushed status updates for {len(pending)} website(s)")
+
+    def _flush_loop(self) -> None:
+        while not self._stop_event.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Failed to flush status updates: {e}")
+
+    def start(self) -> None:
+        """Start the background flusher if not already running."""
+        if self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(
+                target=self._flush_loop, name="status-buffer-flusher", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the flusher and synchronously write what is left."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush()
+
+    def _after_fork(self) -> None:
+        # The flusher thread does not survive fork and its locks may have
+        # been held; the parent still owns and writes its pending updates
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = {}
+        self._thread = None
+        self._stop_event = threading.Event()
+
+
+# Create singleton instance
+status_buffer = StatusUpdateBuffer()
+atexit.register(status_buffer.stop)
+os.register_at_fork(after_in_child=status_buffer._after_fork)
@@ -0,0 +1,301 @@
+"""
+Lightweight tracing for provisioning.
+
+``tracer.span(name, **attributes)`` times a block as a span. Spans nest
+through a context variable and share a trace ID. Context crosses process
+boundaries as a small dict (``tracer.inject()`` / ``parent=``), which is
+carried in RQ job meta, in forwarded values-push requests and in
+background task arguments.
+
+Finished spans are handed to a background exporter thread, so request and
+job code never waits on export I/O:
+- TRACING_EXPORTER=file appends OTLP/JSON ``resourceSpans`` documents, one
+  per line, to TRACING_FILE (readable offline, replayable to a collector);
+- TRACING_EXPORTER=otlp POSTs the same documents to TRACING_OTLP_ENDPOINT
+  (an OTLP/HTTP ``/v1/traces`` URL);
+- TRACING_EXPORTER=none only keeps job breakdowns.
+
+Spans started under ``process_registry.job_context`` are also stored per
+job in Redis (``idp:job-spans:<job_id>``, TRACING_JOB_TTL) for
+``GET /api/v1/jobs/{id}/trace``.
+"""
+
+import json
+import logging
+import os
+import queue
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+import httpx
+import redis
+from app.config import settings
+from app.database.redis import redis_client
+from app.services.process_registry import current_job_id
+
+logger = logging.getLogger(__name__)
+
+JOB_SPANS_PREFIX = "idp:job-spans:"
+SERVICE_NAME = "website-idp-backend"
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_ns: int
+    end_ns: int = 0
+    job_id: Optional[str] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,  # INTERNAL
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [
+                {"key": key, "value": {"stringValue": str(value)}}
+                for key, value in self.attributes.items()
+            ],
+            "status": {"code": 2, "message": self.error} if self.error else {},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+_current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """Creates spans and exports them from a background thread."""
+
+    def __init__(self):
+        self._queue: "queue.SimpleQueue[Optional[Span]]" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._http: Optional[httpx.Client] = None
+
+    # --- Context ---
+    def inject(self) -> Optional[Dict[str, str]]:
+        """Serializable context of the current span, for another process."""
+        span = _current.get()
+        if span is None:
+            return None
+        return {"trace_id": span.trace_id, "span_id": span.span_id}
+
+    def _new_span(
+        self, name: str, parent: Optional[Dict[str, str]], attributes: dict
+    ) -> Span:
+        current = _current.get()
+        if parent:
+            trace_id, parent_id = parent["trace_id"], parent["span_id"]
+        elif current is not None:
+            trace_id, parent_id = current.trace_id, current.span_id
+        else:
+            trace_id, parent_id = secrets.token_hex(16), None
+        return Span(
+            name=name,
+            trace_id=trace_id,
+            span_id=secrets.token_hex(8),
+            parent_id=parent_id,
+            start_ns=time.time_ns(),
+            job_id=current_job_id.get(),
+            attributes=attributes,
+        )
+
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        parent: Optional[Dict[str, str]] = None,
+        **attributes: Any,
+    ) -> Iterator[Span]:
+        """Time the block as a span (child of ``parent`` or the current span)."""
+        span = self._new_span(name, parent, attributes)
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current.reset(token)
+            self.finish(span)
+
+    def record(
+        self,
+        name: str,
+        start_ns: int,
+        end_ns: int,
+        parent: Optional[Dict[str, str]] = None,
+        **attributes: Any,
+    ) -> None:
+        """Export an already-measured interval (e.g. queue wait) as a span."""
+        span = self._new_span(name, parent, attributes)
+        span.start_ns, span.end_ns = start_ns, end_ns
+        self.finish(span)
+
+    def finish(self, span: Span) -> None:
+        if not span.end_ns:
+            span.end_ns = time.time_ns()
+        if not settings.TRACING_ENABLED:
+            return
+        self._ensure_thread()
+        self._queue.put(span)
+
+    # --- Export ---
+    def _ensure_thread(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._export_loop, name="trace-exporter", daemon=True
+            )
+            self._thread.start()
+
+    def _export_loop(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            # Drain whatever else is ready into the same batch
+            while len(batch) < 512:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            spans = [span for span in batch if span is not None]
+            if spans:
+                try:
+                    self._export(spans)
+                except Exception as e:
+                    logger.warning(f"Trace export failed: {e}")
+            if stop:
+                return
+
+    def _export(self, spans: List[Span]) -> None:
+        self._store_job_spans(spans)
+        exporter = settings.TRACING_EXPORTER
+        if exporter == "none":
+            return
+        document = {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {
+                                "key": "service.name",
+                                "value": {"stringValue": SERVICE_NAME},
+                            },
+                            {
+                                "key": "process.pid",
+                                "value": {"stringValue": str(os.getpid())},
+                            },
+                        ]
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "app.services.tracing"},
+                            "spans": [span.to_otlp() for span in spans],
+                        }
+                    ],
+                }
+            ]
+        }
+        if exporter == "file":
+            with open(settings.TRACING_FILE, "a") as f:
+                f.write(json.dumps(document) + "\n")
+        elif exporter == "otlp":
+            if self._http is None:
+                self._http = httpx.Client(timeout=10.0)
+            self._http.post(settings.TRACING_OTLP_ENDPOINT, json=document)
+
+    def _store_job_spans(self, spans: List[Span]) -> None:
+        by_job: Dict[str, List[str]] = {}
+        for span in spans:
+            if span.job_id:
+                item = json.dumps(span.to_dict())
+                by_job.setdefault(span.job_id, []).append(item)
+        if not by_job:
+            return
+        try:
+            pipe = redis_client.pipeline()
+            for job_id, items in by_job.items():
+                key = JOB_SPANS_PREFIX + job_id
+                pipe.rpush(key, *items)
+                pipe.expire(key, settings.TRACING_JOB_TTL)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Could not store job spans: {e}")
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Export everything queued so far (call before the process exits)."""
+        if not (self._thread and self._thread.is_alive()):
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _after_fork(self) -> None:
+        # The exporter thread does not survive fork; restart lazily
+        self._thread = None
+        self._http = None
+
+    # --- Read back ---
+    def job_trace(self, job_id: str) -> Optional[dict]:
+        """Spans and per-stage latency breakdown of a job."""
+        raw = redis_client.lrange(JOB_SPANS_PREFIX + job_id, 0, -1)
+        if not raw:
+            return None
+        spans = sorted(
+            (json.loads(item) for item in raw), key=lambda span: span["start_ns"]
+        )
+        breakdown: Dict[str, float] = {}
+        for span in spans:
+            breakdown[span["name"]] = round(
+                breakdown.get(span["name"], 0.0) + span["duration_ms"], 3
+            )
+        # Spans whose parent is outside the job (the API request, or none)
+        ids = {span["span_id"] for span in spans}
+        roots = [span for span in spans if span["parent_id"] not in ids]
+        return {
+            "job_id": job_id,
+            "trace_ids": sorted({span["trace_id"] for span in spans}),
+            "total_ms": round(sum(span["duration_ms"] for span in roots), 3),
+            "breakdown_ms": breakdown,
+            "spans": spans,
+        }
+
+
+# Create singleton instance
+tracer = Tracer()
+os.register_at_fork(after_in_child=tracer._after_fork)
@@ -0,0 +1,272 @@
+"""
+Layout and manifest of the Helm values directory.
+
+Values files live either flat (``values/values-<id>.yaml``) or, with
+VALUES_SHARDED, under a hash-prefix shard
+(``values/<sha1(id)[:VALUES_SHARD_WIDTH]>/values-<id>.yaml``) so no single
+directory holds the whole fleet.
+
+``values/manifest.json`` maps each website ID to its file path (relative to
+the values directory) and the sha256 of its content. It is updated on every
+write that changes a file, so scans and worktree copies read one file
+instead of listing the directory, and can tell which sites actually
+changed. Parsed manifests are cached per process and only re-read when the
+file's inode, mtime or size changes (every save replaces the file).
+
+Convert an existing directory (and build its manifest) with:
+
+    python -m app.services.values_layout migrate [--sharded|--flat]
+"""
+
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+# (inode, mtime_ns, size) of a manifest file
+StatKey = Tuple[int, int, int]
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class ValuesLayout:
+    """Reads and writes values files through the manifest."""
+
+    def __init__(self, values_dir: Path, sharded: Optional[bool] = None):
+        self.values_dir = Path(values_dir)
+        self.sharded = settings.VALUES_SHARDED if sharded is None else sharded
+        self.manifest_path = self.values_dir / MANIFEST_NAME
+        self._cache: Optional[Tuple[StatKey, Dict[str, dict]]] = None
+
+    # --- Paths ---
+    def relative_path(self, website_id: str) -> str:
+        filename = f"values-{website_id}.yaml"
+        if not self.sharded:
+            return filename
+        digest = hashlib.sha1(website_id.encode()).hexdigest()
+        return f"{digest[: settings.VALUES_SHARD_WIDTH]}/{filename}"
+
+    def path_for(self, website_id: str) -> Path:
+        """Current file of ``website_id``, or where a new one would go."""
+        entry = self.manifest().get(website_id)
+        rel = entry["path"] if entry else self.relative_path(website_id)
+        return self.values_dir / rel
+
+    # --- Manifest ---
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Serialize manifest updates across processes sharing the dir."""
+        self.values_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.values_dir / ".manifest.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def manifest(self) -> Dict[str, dict]:
+        """``{website_id: {"path": ..., "sha256": ...}}`` for every site."""
+        if not self.manifest_path.exists():
+            if not self.values_dir.exists():
+                return {}
+            # Pre-manifest directory: index it once
+            with self._locked():
+                self._save(self._load())
+        return self._read_cached()
+
+    def _load(self) -> Dict[str, dict]:
+        """Manifest contents; caller holds the lock."""
+        if self.manifest_path.exists():
+            return self._read_cached()
+        return self._rebuild()
+
+    def _stat_key(self) -> Optional[StatKey]:
+        try:
+            st = self.manifest_path.stat()
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _read_cached(self) -> Dict[str, dict]:
+        """Manifest contents, parsed again only if the file changed.
+
+        Returns a new dict; its entries are shared with the cache and must
+        be replaced rather than modified.
+        """
+        key = self._stat_key()
+        if key is None:
+            return {}
+        cached = self._cache
+        if cached is None or cached[0] != key:
+            # Stat before reading: a concurrent replace leaves the key stale,
+            # so the next call reads again
+            cached = self._cache = (key, self.read_manifest(self.values_dir))
+        return dict(cached[1])
+
+    @staticmethod
+    def read_manifest(values_dir: Path) -> Dict[str, dict]:
+        """Manifest of any values directory (e.g. a worktree checkout)."""
+        try:
+            with open(Path(values_dir) / MANIFEST_NAME) as f:
+                return json.load(f).get("sites", {})
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, sites: Dict[str, dict]) -> None:
+        self.save_manifest(self.values_dir, sites, self.sharded)
+        key = self._stat_key()
+        self._cache = (key, dict(sites)) if key is not None else None
+
+    @staticmethod
+    def save_manifest(
+        values_dir: Path, sites: Dict[str, dict], sharded: bool
+    ) -> None:
+        data = {
+            "version": MANIFEST_VERSION,
+            "layout": "sharded" if sharded else "flat",
+            "sites": dict(sorted(sites.items())),
+        }
+        path = Path(values_dir) / MANIFEST_NAME
+        encoded = (json.dumps(data, indent=2) + "\n").encode()
+        try:
+            if path.read_bytes() == encoded:
+                # Unchanged: keep its mtime (git status, caches)
+                return
+        except OSError:
+            pass
+        _atomic_write(path, encoded)
+
+    def _rebuild(self) -> Dict[str, dict]:
+        """Index whatever values files exist, flat or sharded."""
+        sites = {}
+        for path in self.values_dir.rglob("values-*.yaml"):
+            website_id = path.name.removeprefix("values-").removesuffix(".yaml")
+            sites[website_id] = {
+                "path": path.relative_to(self.values_dir).as_posix(),
+                "sha256": content_hash(path.read_bytes()),
+            }
+        return sites
+
+    def rebuild_manifest(self) -> bool:
+        """Rewrite the manifest from the values files on disk.
+
+        Returns True if it changed, e.g. after git merged two writers' files
+        but resolved the manifest to one side.
+        """
+        with self._locked():
+            sites = self._rebuild()
+            if sites == self.read_manifest(self.values_dir):
+                return False
+            self._save(sites)
+        return True
+
+    # --- Writes ---
+    def write(self, website_id: str, content: str) -> Path:
+        """Write a site's values file and record it in the manifest."""
+        return self.write_many({website_id: content})[website_id]
+
+    def write_many(self, files: Dict[str, str]) -> Dict[str, Path]:
+        """Write several values files with a single manifest update."""
+        paths = {}
+        changed = False
+        with self._locked():
+            sites = self._load()
+            for website_id, content in files.items():
+                data = content.encode()
+                rel = self.relative_path(website_id)
+                path = self.values_dir / rel
+                paths[website_id] = path
+                entry = {"path": rel, "sha256": content_hash(data)}
+                old = sites.get(website_id)
+                if old == entry and path.exists():
+                    continue
+                _atomic_write(path, data)
+                if old and old["path"] != rel:
+                    (self.values_dir / old["path"]).unlink(missing_ok=True)
+                sites[website_id] = entry
+                changed = True
+            if changed or not self.manifest_path.exists():
+                self._save(sites)
+        return paths
+
+    def remove(self, website_id: str) -> bool:
+        """Delete a site's values file; returns False if it had none."""
+        return bool(self.remove_many([website_id]))
+
+    def remove_many(self, website_ids: Iterable[str]) -> List[str]:
+        """Delete several values files; returns the IDs that had one."""
+        removed = []
+        with self._locked():
+            sites = self._load()
+            for website_id in website_ids:
+                entry = sites.pop(website_id, None)
+                if entry is None:
+                    continue
+                (self.values_dir / entry["path"]).unlink(missing_ok=True)
+                removed.append(website_id)
+            if removed:
+                self._save(sites)
+        return removed
+
+    # --- Migration ---
+    def migrate(self) -> int:
+        """Move every values file to this layout and rewrite the manifest.
+
+        Returns the number of files moved.
+        """
+        moved = 0
+        with self._locked():
+            sites = self._rebuild()
+            for website_id, entry in sites.items():
+                rel = self.relative_path(website_id)
+                if entry["path"] != rel:
+                    target = self.values_dir / rel
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    os.replace(self.values_dir / entry["path"], target)
+                    entry["path"] = rel
+                    moved += 1
+            self._save(sites)
+            # Drop shard directories left empty by a sharded -> flat move
+            for shard in self.values_dir.iterdir():
+                if shard.is_dir() and not any(shard.iterdir()):
+                    shard.rmdir()
+        logger.info(f"Migrated {moved} values file(s) in {self.values_dir}")
+        return moved
+
+
+if __name__ == "__main__":
+    from app.services.github_service import github_service
+
+    if len(sys.argv) < 2 or sys.argv[1] != "migrate":
+        print(f"usage: python -m {__spec__.name} migrate [--sharded|--flat]")
+        sys.exit(2)
+    sharded = None
+    if "--sharded" in sys.argv:
+        sharded = True
+    elif "--flat" in sys.argv:
+        sharded = False
+    layout = ValuesLayout(github_service.values_dir, sharded=sharded)
+    print(f"Moved {layout.migrate()} file(s) into {layout.values_dir}")
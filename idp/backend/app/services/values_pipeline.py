@@ -0,0 +1,466 @@
+"""
+Single-writer pipeline for pushing values files to git.
+
+Only the elected leader (see ``LeaderElector``) runs the values directory
+watcher and executes pushes. Every other API worker or replica forwards its
+push requests to the leader through a Redis list and waits for the reply,
+so scaling the API out does not multiply git contention.
+
+Replicas and RQ workers need not share the values directory: a forwarded
+request carries the rendered files, which the leader writes into its own
+values directory before pushing. Removals travel in the request as well:
+the leader deletes the files before pushing, so a removal is never
+mistaken for a site that still exists. A follower that times out waiting
+for the reply cannot tell whether the leader will still push, so it
+reports the push as ``pending`` rather than failed.
+With LEADER_ELECTION_ENABLED=false every process pushes locally, as before.
+
+When the git remote is down, a circuit breaker stops push attempts after
+GIT_BREAKER_FAILURE_THRESHOLD failures. Changes are then recorded in the
+shared ``PushOutbox`` (Redis) and reported as queued without touching git,
+and a drain thread on the leader pushes the whole backlog in one commit
+once a probe push succeeds. A push that reaches the branch settles any
+queued entry for the same website, so the drain never writes back an
+older render. Only transport errors and timeouts count as failures;
+a push the remote refused (rebase conflict, hook rejection) is returned to
+the caller and neither queued nor retried.
+
+The leader also runs ``GitMaintenance`` between pushes.
+"""
+
+import json
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+import redis
+from app.config import settings
+from app.database import SessionLocal
+from app.database.models import Website, WebsiteStatusEnum
+from app.database.redis import redis_client
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.deployment_watcher import deployment_watcher
+from app.models.job import JobStatus
+from app.services.git_maintenance import GitMaintenance
+from app.services.github_service import GitHubService, github_service
+from app.services.job_store import job_store
+from app.services.leader_election import LeaderElector
+from app.services.metrics import metrics
+from app.services.push_outbox import PushOutbox, push_outbox
+from app.services.status_buffer import status_buffer
+from app.services.tracing import tracer
+from app.services.website_cache import website_cache
+
+logger = logging.getLogger(__name__)
+
+REQUESTS_KEY = "idp:values-push:requests"
+REPLY_PREFIX = "idp:values-push:reply:"
+
+
+class ValuesPushQueued(Exception):
+    """The values change was stored in the outbox instead of being pushed."""
+
+
+class ValuesPipeline:
+    """Routes values pushes to the single leader process."""
+
+    def __init__(
+        self,
+        service: GitHubService = github_service,
+        client: redis.Redis = redis_client,
+        outbox: PushOutbox = push_outbox,
+    ):
+        self.service = service
+        self.client = client
+        self.outbox = outbox
+        self.breaker = CircuitBreaker(
+            "git-remote",
+            failure_threshold=settings.GIT_BREAKER_FAILURE_THRESHOLD,
+            reset_timeout=settings.GIT_BREAKER_RESET_TIMEOUT,
+        )
+        self.elector = LeaderElector("values-pipeline", client)
+        self._threads: List[threading.Thread] = []
+        self._stop_event = threading.Event()
+        # Serializes local pushes with forwarded ones on the leader
+        self._push_lock = threading.Lock()
+        self.maintenance = GitMaintenance(service, self._push_lock)
+
+    @property
+    def is_leader(self) -> bool:
+        return not settings.LEADER_ELECTION_ENABLED or self.elector.is_leader
+
+    # --- Lifecycle ---
+    def start(self) -> None:
+        if not settings.LEADER_ELECTION_ENABLED:
+            self._on_elected()
+            return
+        self.elector.start(self._on_elected, self._on_demoted)
+
+    def stop(self) -> None:
+        if settings.LEADER_ELECTION_ENABLED:
+            self.elector.stop()
+        else:
+            self._on_demoted()
+
+    def _on_elected(self) -> None:
+        self.service.start_watcher()
+        # Each leadership term gets its own stop event, so threads from a
+        # previous term stay stopped
+        self._stop_event = threading.Event()
+        loops = [("values-outbox-drain", self._drain_loop)]
+        if settings.LEADER_ELECTION_ENABLED:
+            loops.append(("values-push-consumer", self._consume_requests))
+        self._threads = [
+            threading.Thread(
+                target=loop, args=(self._stop_event,), name=name, daemon=True
+            )
+            for name, loop in loops
+        ]
+        for thread in self._threads:
+            thread.start()
+        if settings.GIT_MAINTENANCE_ENABLED:
+            self.maintenance.start()
+
+    def _on_demoted(self) -> None:
+        self._stop_event.set()
+        for thread in self._threads:
+            # A drain may be mid-push; the threads are daemons
+            thread.join(timeout=5)
+        self._threads = []
+        self.service.stop_watcher()
+        self.maintenance.stop()
+
+    # --- Push routing ---
+    def push(
+        self,
+        website_id: str,
+        action: str = "created",
+        namespace: Optional[str] = None,
+        removed: Sequence[str] = (),
+        force: Sequence[str] = (),
+        job_id: Optional[str] = None,
+    ) -> dict:
+        """Push values for a website, on this process or via the leader.
+
+        ``removed`` lists website IDs whose values files were deleted and
+        must be removed from the branch in the same commit. ``force`` lists
+        IDs whose files are pushed even if the manifests say the branch has
+        them (drift found by the reconciler). The result has ``queued=True``
+        when the change went to the outbox, and ``pending=True`` when the
+        leader did not answer in time and may still push it. A queued
+        "created" change completes job ``job_id`` once the outbox drains.
+        """
+        removed = list(removed)
+        force = list(force)
+        with tracer.span(
+            "values_pipeline.push", website_id=website_id, leader=self.is_leader
+        ):
+            args = (website_id, action, namespace, removed, force)
+            if self.is_leader:
+                return self._push_local(*args, job_id=job_id)
+            try:
+                return self._forward(*args, job_id=job_id)
+            except redis.RedisError as e:
+                logger.warning(f"Cannot reach leader ({e}), pushing locally")
+                return self._push_local(*args, job_id=job_id)
+
+    def _push_local(
+        self,
+        website_id: str,
+        action: str,
+        namespace: Optional[str] = None,
+        removed: Sequence[str] = (),
+        force: Sequence[str] = (),
+        files: Optional[Dict[str, str]] = None,
+        job_id: Optional[str] = None,
+    ) -> dict:
+        if not self.breaker.allow():
+            # Fail fast during an outage: no fetch/push timeouts to sit through
+            return self._queue(
+                website_id,
+                action,
+                namespace,
+                removed,
+                force,
+                job_id,
+                "Git remote unavailable",
+            )
+        try:
+            # Entries this push makes obsolete, if it reaches the branch
+            settled = self.outbox.get([website_id, *force])
+        except redis.RedisError:
+            settled = []
+        with self._push_lock:
+            if files:
+                # Rendered by a follower; a no-op if the directory is shared
+                self.service.layout.write_many(files)
+            if removed:
+                # Forwarded or queued removals: the files may still be here
+                self.service.layout.remove_many(removed)
+            result = self.service.auto_push_values(
+                website_id, action, removed, force
+            )
+        push_step = result["steps"].get("push")
+        if push_step is None:
+            # Failed before talking to the remote: says nothing about it
+            return result
+        if not push_step.get("transport_error"):
+            # The remote answered; a rejected change is the caller's to fix
+            self.breaker.record_success()
+            if result["success"] and settled:
+                self._settle(settled)
+            return result
+        self.breaker.record_failure()
+        return self._queue(
+            website_id, action, namespace, removed, force, job_id, result["message"]
+        )
+
+    def _queue(
+        self,
+        website_id: str,
+        action: str,
+        namespace: Optional[str],
+        removed: Sequence[str],
+        force: Sequence[str],
+        job_id: Optional[str],
+        reason: str,
+    ) -> dict:
+        files = self._rendered([website_id, *force])
+        try:
+            if website_id in files:
+                self.outbox.add(
+                    website_id, action, namespace, files[website_id], job_id
+                )
+            for removed_id in removed:
+                self.outbox.add(removed_id, "deleted")
+            for forced_id in force:
+                self.outbox.add(forced_id, "reconciled", content=files.get(forced_id))
+        except redis.RedisError as e:
+            return {
+                "success": False,
+                "website_id": website_id,
+                "action": action,
+                "steps": {},
+                "message": f"{reason}; could not queue change: {e}",
+            }
+        return {
+            "success": False,
+            "queued": True,
+            "website_id": website_id,
+            "action": action,
+            "steps": {},
+            "message": f"{reason}; change queued for push",
+        }
+
+    def _forward(
+        self,
+        website_id: str,
+        action: str,
+        namespace: Optional[str],
+        removed: List[str],
+        force: List[str],
+        job_id: Optional[str] = None,
+    ) -> dict:
+        request_id = uuid.uuid4().hex
+        files = self._rendered([website_id, *force])
+        self.client.rpush(
+            REQUESTS_KEY,
+            json.dumps(
+                {
+                    "id": request_id,
+                    "website_id": website_id,
+                    "action": action,
+                    "namespace": namespace,
+                    "removed": removed,
+                    "force": force,
+                    "files": files,
+                    "job_id": job_id,
+                    "trace": tracer.inject(),
+                    # The leader drops the request once nobody waits for it
+                    "deadline": time.time() + settings.PUSH_FORWARD_TIMEOUT,
+                }
+            ),
+        )
+        reply = self.client.blpop(
+            [REPLY_PREFIX + request_id], timeout=int(settings.PUSH_FORWARD_TIMEOUT)
+        )
+        if reply is None:
+            # The leader may have taken the request just before its deadline
+            return {
+                "success": False,
+                "pending": True,
+                "website_id": website_id,
+                "action": action,
+                "steps": {},
+                "message": "Leader did not answer in time; the push may still run",
+            }
+        return json.loads(reply[1])
+
+    def _rendered(self, website_ids: Sequence[str]) -> Dict[str, str]:
+        """Contents of this process's values files for ``website_ids``."""
+        layout = self.service.layout
+        manifest = layout.manifest()
+        files = {}
+        for website_id in website_ids:
+            entry = manifest.get(website_id)
+            if entry is None:
+                # e.g. a commit label rather than a website ID
+                continue
+            try:
+                files[website_id] = (layout.values_dir / entry["path"]).read_text()
+            except FileNotFoundError:
+                continue
+        return files
+
+    # --- Outbox drain ---
+    def drain_outbox(self) -> int:
+        """Push every queued change in a single commit; returns the count."""
+        entries = self.outbox.pending()
+        if not entries or not self.breaker.allow():
+            return 0
+        label = f"{len(entries)} queued website(s)"
+        removed = [e["website_id"] for e in entries if e["action"] == "deleted"]
+        force = [e["website_id"] for e in entries if e["action"] == "reconciled"]
+        files = {
+            e["website_id"]: e["content"]
+            for e in entries
+            if e["action"] != "deleted" and e.get("content") is not None
+        }
+        with self._push_lock:
+            if files:
+                # Queued renders may come from processes with their own dirs
+                self.service.layout.write_many(files)
+            if removed:
+                self.service.layout.remove_many(removed)
+            result = self.service.auto_push_values(label, "synced", removed, force)
+        push_step = result["steps"].get("push")
+        if push_step is not None:
+            if push_step.get("transport_error"):
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+        if not result["success"]:
+            logger.warning(f"Outbox drain failed: {result['message']}")
+            return 0
+        # Entries re-queued during the push stay for the next drain
+        for entry in self.outbox.remove(entries):
+            self._after_push(entry)
+        self.mark_deleted(removed)
+        logger.info(f"Drained {len(entries)} queued values change(s)")
+        return len(entries)
+
+    def _settle(self, entries: List[dict]) -> None:
+        """Drop queued entries whose change a direct push just delivered."""
+        try:
+            for entry in self.outbox.remove(entries):
+                self._after_push(entry)
+        except redis.RedisError as e:
+            # The drain pushes them again, which is a no-op
+            logger.warning(f"Could not settle queued values changes: {e}")
+
+    def _after_push(self, entry: dict) -> None:
+        """Resume provisioning for a website whose values were queued."""
+        if entry["action"] != "created":
+            return
+        self.mark_pushed(entry["website_id"], entry.get("namespace"))
+        if entry.get("job_id"):
+            job_store.update(
+                entry["job_id"],
+                status=JobStatus.COMPLETED,
+                progress=100,
+                log="Queued Helm values pushed",
+            )
+
+    @staticmethod
+    def mark_pushed(website_id: str, namespace: Optional[str]) -> None:
+        """Move a site whose values just reached the branch towards RUNNING."""
+        if settings.DEPLOYMENT_VERIFY_ENABLED and namespace:
+            deployment_watcher.track(namespace, website_id)
+        else:
+            status_buffer.record(
+                website_id,
+                status=WebsiteStatusEnum.RUNNING,
+                deployed_at=datetime.utcnow(),
+            )
+
+    @staticmethod
+    def mark_deleted(website_ids: Sequence[str]) -> int:
+        """Drop the rows of DELETING sites whose values left the branch."""
+        if not website_ids:
+            return 0
+        with SessionLocal() as db:
+            deleted = (
+                db.query(Website)
+                .filter(
+                    Website.website_id.in_(list(website_ids)),
+                    Website.status == WebsiteStatusEnum.DELETING,
+                )
+                .delete(synchronize_session=False)
+            )
+            db.commit()
+        if deleted:
+            website_cache.invalidate(website_ids)
+            metrics.inc("idp_websites_deleted_total", deleted)
+            logger.info(f"Deleted {deleted} website record(s)")
+        return deleted
+
+    def _drain_loop(self, stop: threading.Event) -> None:
+        while not stop.is_set():
+            try:
+                self.drain_outbox()
+            except Exception as e:
+                logger.error(f"Outbox drain error: {e}")
+            stop.wait(settings.PUSH_OUTBOX_DRAIN_INTERVAL)
+
+    def _consume_requests(self, stop: threading.Event) -> None:
+        """Leader loop: execute forwarded push requests and reply."""
+        while not stop.is_set():
+            try:
+                item = self.client.blpop([REQUESTS_KEY], timeout=1)
+                if item is None:
+                    continue
+                request = json.loads(item[1])
+                if request.get("deadline", float("inf")) < time.time():
+                    # The caller has given up and reported the push as failed
+                    logger.warning(
+                        f"Dropping stale push request for {request['website_id']}"
+                    )
+                    metrics.inc("idp_values_push_stale_requests_total")
+                    continue
+                try:
+                    # Continues the follower's trace
+                    with tracer.span(
+                        "values_pipeline.leader_push", parent=request.get("trace")
+                    ):
+                        result = self._push_local(
+                            request["website_id"],
+                            request["action"],
+                            request.get("namespace"),
+                            request.get("removed", []),
+                            request.get("force", []),
+                            request.get("files"),
+                            request.get("job_id"),
+                        )
+                except Exception as e:
+                    result = {
+                        "success": False,
+                        "website_id": request["website_id"],
+                        "action": request["action"],
+                        "steps": {},
+                        "message": f"Leader push error: {e}",
+                    }
+                reply_key = REPLY_PREFIX + request["id"]
+                pipe = self.client.pipeline()
+                pipe.rpush(reply_key, json.dumps(result, default=str))
+                pipe.expire(reply_key, int(settings.PUSH_FORWARD_TIMEOUT) + 60)
+                pipe.execute()
+            except redis.RedisError as e:
+                logger.warning(f"Push request consumer error: {e}")
+                stop.wait(1)
+
+
+# Create singleton instance
+values_pipeline = ValuesPipeline()
@@ -0,0 +1,190 @@
+"""
+Dry-run rendering of Helm values against what is committed.
+
+Renders values with the current code (``Website.to_values_file``) entirely
+in memory and diffs them, key by key, against the file on
+``origin/<target branch>``, fetched first. Nothing is written, committed or
+pushed. Results name the commit they were compared against (``source``); if
+the fetch fails, that is the last fetched commit and ``fetched`` is false.
+
+The fleet preview loads every row with one query and every committed file
+with one ``git cat-file --batch``. It then renders and diffs in chunks on a
+process pool, yielding results as chunks complete.
+"""
+
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import yaml
+from app.config import settings
+from app.database import SessionLocal
+from app.database.models import Website
+from app.services.github_service import GitHubService, github_service
+
+logger = logging.getLogger(__name__)
+
+# Plain column values are what crosses the process boundary
+_COLUMNS = [column.name for column in Website.__table__.columns]
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def diff_values(old: Any, new: Any, path: str = "") -> List[dict]:
+    """Structured diff of two parsed YAML documents.
+
+    Dicts are compared key by key; any other differing value (including
+    lists) is reported whole at its dotted path.
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        changes = []
+        for key in sorted(set(old) | set(new), key=str):
+            child = f"{path}.{key}" if path else str(key)
+            if key not in old:
+                changes.append({"path": child, "op": "added", "new": new[key]})
+            elif key not in new:
+                changes.append({"path": child, "op": "removed", "old": old[key]})
+            else:
+                changes.extend(diff_values(old[key], new[key], child))
+        return changes
+    if old == new:
+        return []
+    return [{"path": path, "op": "changed", "old": old, "new": new}]
+
+
+def preview_row(columns: Dict[str, Any], committed: Optional[str]) -> dict:
+    """Render one website from its column values and diff it."""
+    website = Website(**columns)
+    rendered = website.to_values_file()
+    new = yaml.safe_load(rendered)
+    old = yaml.safe_load(committed) if committed is not None else None
+    changes = diff_values(old or {}, new)
+    return {
+        "website_id": columns["website_id"],
+        "committed": committed is not None,
+        "changed": bool(changes),
+        "changes": changes,
+    }
+
+
+def _preview_chunk(rows: List[Tuple[Dict[str, Any], Optional[str]]]) -> List[dict]:
+    results = []
+    for columns, committed in rows:
+        try:
+            results.append(preview_row(columns, committed))
+        except Exception as e:
+            results.append({"website_id": columns["website_id"], "error": str(e)})
+    return results
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn: never fork the API process with its threads and sockets
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.PREVIEW_PROCESSES,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+class ValuesPreview:
+    """Renders values in memory and diffs them against the branch."""
+
+    def __init__(self, service: GitHubService = github_service):
+        self.service = service
+
+    def _columns(self, website: Website) -> Dict[str, Any]:
+        return {name: getattr(website, name) for name in _COLUMNS}
+
+    def _source(self) -> Dict[str, Any]:
+        """Fetch the target branch and resolve the commit to compare with."""
+        branch = self.service.target_branch
+        ref = f"origin/{branch}"
+        fetched, output = self.service.git_command(
+            self.service.checkout.fetch_args(branch),
+            timeout=settings.GIT_REMOTE_TIMEOUT,
+        )
+        if not fetched:
+            logger.warning(f"Previewing against the last fetched {ref}: {output}")
+        ok, commit = self.service.git_command(["rev-parse", ref])
+        if not ok:
+            raise RuntimeError(f"Failed to resolve {ref}: {commit}")
+        return {"ref": ref, "commit": commit.strip(), "fetched": fetched}
+
+    def _committed(
+        self, website_ids: List[str]
+    ) -> Tuple[Dict[str, str], Dict[str, Any]]:
+        """Committed values of ``website_ids`` and the commit they are from."""
+        source = self._source()
+        commit = source["commit"]
+        index = self.service.committed_values_index(commit)
+        wanted = {i: index[i] for i in website_ids if i in index}
+        blobs = self.service.read_blobs(sorted(set(wanted.values())), commit)
+        committed = {
+            website_id: blobs[blob_id]
+            for website_id, blob_id in wanted.items()
+            if blob_id in blobs
+        }
+        return committed, source
+
+    def preview(self, website: Website) -> dict:
+        website_id = str(website.website_id)
+        committed, source = self._committed([website_id])
+        result = preview_row(self._columns(website), committed.get(website_id))
+        return {**result, "source": source}
+
+    def preview_fleet(self, only_changed: bool = True) -> Iterator[dict]:
+        """Load every row and committed file, then return a result stream.
+
+        Loading happens before the first result so git/database errors
+        surface before a response starts streaming.
+        """
+        with SessionLocal() as db:
+            rows = [self._columns(w) for w in db.query(Website).all()]
+        committed, source = self._committed(
+            [str(row["website_id"]) for row in rows]
+        )
+        pairs = [(row, committed.get(str(row["website_id"]))) for row in rows]
+        return self._stream(pairs, only_changed, source)
+
+    def _stream(
+        self,
+        pairs: List[Tuple[Dict[str, Any], Optional[str]]],
+        only_changed: bool,
+        source: Dict[str, Any],
+    ) -> Iterator[dict]:
+        """Yield one result per website, then a summary record."""
+        size = settings.PREVIEW_CHUNK_SIZE
+        chunks = [pairs[i : i + size] for i in range(0, len(pairs), size)]
+        summary = {
+            "total": len(pairs),
+            "changed": 0,
+            "uncommitted": 0,
+            "errors": 0,
+            "source": source,
+        }
+        futures = [_get_pool().submit(_preview_chunk, chunk) for chunk in chunks]
+        for future in as_completed(futures):
+            for result in future.result():
+                if "error" in result:
+                    summary["errors"] += 1
+                else:
+                    summary["changed"] += result["changed"]
+                    summary["uncommitted"] += not result["committed"]
+                    if only_changed and not result["changed"]:
+                        continue
+                yield result
+        yield {"summary": summary}
+
+
+# Create singleton instance
+values_preview = ValuesPreview()
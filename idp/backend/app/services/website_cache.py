@@ -0,0 +1,242 @@
+"""
+Read-through cache of website lookups (``GET /api/v1/websites/{id}``).
+
+- Each API process keeps an LRU of WEBSITE_CACHE_SIZE serialized websites,
+  in front of Redis (``idp:website:<id>``, WEBSITE_CACHE_TTL) in front of
+  the database.
+- Every change to a ``Website`` row invalidates it: ORM inserts, updates
+  and deletes through session events (published after commit), bulk
+  writes (status buffer, row cleanup after teardown) explicitly. An
+  invalidation bumps the site's version in Redis, drops its Redis entry
+  and publishes on ``idp:website-invalidate``, where the listener thread
+  of every API process evicts it from the LRU.
+- Entries carry the version they were read under, so a lookup racing with
+  a change can never put the old row back: a stale Redis entry no longer
+  matches the current version, and a local fill is dropped if any
+  invalidation arrived meanwhile.
+- The LRU is only used while the listener is subscribed; entries also
+  expire after WEBSITE_CACHE_LOCAL_TTL in case messages were lost.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+
+import redis
+from app.config import settings
+from app.database import SessionLocal
+from app.database.models import Website
+from app.database.redis import redis_client
+from app.models.website import WebsiteResponse
+from app.services.metrics import metrics
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = "idp:website:"
+VERSION_PREFIX = "idp:website-version:"
+INVALIDATE_CHANNEL = "idp:website-invalidate"
+# Session.info key of website IDs changed in the current transaction
+CHANGED_KEY = "idp_changed_websites"
+
+
+def website_response(website: Website) -> WebsiteResponse:
+    """API representation of a website row."""
+    return WebsiteResponse(
+        id=str(website.id),
+        website_id=str(website.website_id),
+        domain=str(website.domain),
+        resource_plan=website.resource_plan.value,
+        website_type=website.website_type.value,
+        status=website.status.value,
+        created_at=website.created_at,
+        # Rows are only stamped on their first update
+        updated_at=website.updated_at or website.created_at,
+        deployed_at=website.deployed_at,
+    )
+
+
+class WebsiteCache:
+    """Two-level (process LRU, Redis) cache of serialized websites."""
+
+    def __init__(self, client: redis.Redis = redis_client):
+        self.client = client
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        # Bumped by every local eviction; fills started before it are dropped
+        self._generation = 0
+        self._subscribed = False
+        self._listener: Optional[threading.Thread] = None
+
+    # --- Lookup ---
+    def get(self, website_id: str) -> Optional[dict]:
+        """The website as a ``WebsiteResponse`` dict, or None if unknown."""
+        started = time.perf_counter()
+        with self._lock:
+            entry = self._entries.get(website_id) if self._subscribed else None
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(website_id)
+                data = entry[1]
+            else:
+                data = None
+            generation = self._generation
+        if data is not None:
+            layer = "local"
+        else:
+            layer, data = self._load(website_id)
+            if data is not None:
+                self._store(website_id, data, generation)
+        metrics.inc("idp_website_cache_lookups_total", result=layer)
+        metrics.observe(
+            "idp_website_cache_lookup_seconds",
+            time.perf_counter() - started,
+            result=layer,
+        )
+        return data
+
+    def _load(self, website_id: str) -> Tuple[str, Optional[dict]]:
+        """Read from Redis, falling back to (and refilling from) the DB."""
+        key = CACHE_PREFIX + website_id
+        try:
+            raw, version = self.client.mget(key, VERSION_PREFIX + website_id)
+        except redis.RedisError as e:
+            logger.warning(f"Website cache unavailable: {e}")
+            return "miss", self._query(website_id)
+        version = int(version or 0)
+        if raw:
+            cached = json.loads(raw)
+            if cached["version"] == version:
+                return "redis", cached["website"]
+        data = self._query(website_id)
+        if data is not None:
+            try:
+                self.client.set(
+                    key,
+                    json.dumps({"version": version, "website": data}),
+                    ex=settings.WEBSITE_CACHE_TTL,
+                )
+            except redis.RedisError as e:
+                logger.warning(f"Could not cache website {website_id}: {e}")
+        return "miss", data
+
+    @staticmethod
+    def _query(website_id: str) -> Optional[dict]:
+        with SessionLocal() as db:
+            website = db.query(Website).filter(Website.website_id == website_id).first()
+            if website is None:
+                return None
+            return website_response(website).model_dump(mode="json")
+
+    def _store(self, website_id: str, data: dict, generation: int) -> None:
+        expires = time.monotonic() + settings.WEBSITE_CACHE_LOCAL_TTL
+        with self._lock:
+            if not self._subscribed or generation != self._generation:
+                return
+            self._entries[website_id] = (expires, data)
+            self._entries.move_to_end(website_id)
+            while len(self._entries) > settings.WEBSITE_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    # --- Invalidation ---
+    def invalidate(self, website_ids: Iterable[str]) -> None:
+        """Drop the sites from every cache level in every process."""
+        website_ids = sorted(set(website_ids))
+        if not website_ids:
+            return
+        self._evict(website_ids)
+        # Versions outlive cached entries, so an entry written by a lookup
+        # that raced with this change can never match again
+        version_ttl = 2 * settings.WEBSITE_CACHE_TTL
+        try:
+            pipe = self.client.pipeline()
+            for website_id in website_ids:
+                pipe.incr(VERSION_PREFIX + website_id)
+                pipe.expire(VERSION_PREFIX + website_id, version_ttl)
+                pipe.delete(CACHE_PREFIX + website_id)
+            pipe.publish(INVALIDATE_CHANNEL, json.dumps(website_ids))
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Could not invalidate {len(website_ids)} website(s): {e}")
+        metrics.inc("idp_website_cache_invalidations_total", len(website_ids))
+
+    def _evict(self, website_ids: Iterable[str]) -> None:
+        with self._lock:
+            self._generation += 1
+            for website_id in website_ids:
+                self._entries.pop(website_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def _listen(self) -> None:
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(INVALIDATE_CHANNEL)
+                # Anything cached before now may have missed a message
+                with self._lock:
+                    self._subscribed = True
+                self.clear()
+                for message in pubsub.listen():
+                    self._evict(json.loads(message["data"]))
+            except Exception as e:
+                logger.warning(f"Website cache listener error: {e}")
+                with self._lock:
+                    self._subscribed = False
+                self.clear()
+                time.sleep(5)
+
+    def start_listener(self) -> None:
+        """Subscribe to invalidations; enables the in-process LRU."""
+        if self._listener and self._listener.is_alive():
+            return
+        self._listener = threading.Thread(
+            target=self._listen, name="website-cache-listener", daemon=True
+        )
+        self._listener.start()
+
+    def _after_fork(self) -> None:
+        # The listener does not survive fork; without it the LRU is unsafe
+        self._lock = threading.Lock()
+        self._listener = None
+        self._subscribed = False
+        self._entries = OrderedDict()
+
+    def collect_metrics(self) -> None:
+        with self._lock:
+            size = len(self._entries)
+        metrics.set_gauge("idp_website_cache_entries", size)
+
+
+# Create singleton instance
+website_cache = WebsiteCache()
+os.register_at_fork(after_in_child=website_cache._after_fork)
+metrics.add_collector(website_cache.collect_metrics)
+
+
+@event.listens_for(Website, "after_insert")
+@event.listens_for(Website, "after_update")
+@event.listens_for(Website, "after_delete")
+def _track_change(mapper, connection, target: Website) -> None:
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(CHANGED_KEY, set()).add(target.website_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session: Session) -> None:
+    website_ids = session.info.pop(CHANGED_KEY, None)
+    if website_ids:
+        website_cache.invalidate(website_ids)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_rolled_back(session: Session, previous_transaction) -> None:
+    session.info.pop(CHANGED_KEY, None)
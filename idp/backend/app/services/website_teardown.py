@@ -0,0 +1,239 @@
+"""
+Batched, asynchronous website teardown.
+
+A teardown (single site or bulk) runs in a worker job:
+1. values files (and legacy ``apps/<id>`` directories) are removed and
+   pushed in group commits: every job adds its sites to a shared Redis set
+   and whichever job holds the removal lock commits everything pending, so
+   concurrent deletes share one commit (at most DELETE_BATCH_SIZE sites);
+2. namespace deletions are requested with background propagation, a few in
+   parallel, without waiting for finalizers;
+3. the sites' rows (status DELETING) are dropped. When the push went to the
+   outbox instead, the outbox drain drops them once it reaches the branch.
+
+Values are removed before the namespace so ArgoCD stops syncing the site
+instead of recreating what is being deleted.
+"""
+
+import contextvars
+import json
+import logging
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import redis
+from app.config import settings
+from app.database.redis import redis_client
+from app.services.github_service import GitHubService, github_service
+from app.services.kubernetes_service import kubernetes_service
+from app.services.metrics import metrics
+from app.services.process_registry import process_registry
+from app.services.tracing import tracer
+from app.services.values_pipeline import values_pipeline
+from redis.exceptions import LockError
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = "idp:teardown:pending"
+LOCK_KEY = "idp:teardown:lock"
+RESULT_PREFIX = "idp:teardown:result:"
+RESULT_TTL = 60 * 60
+
+
+class WebsiteTeardown:
+    """Removes websites' files, namespaces and rows."""
+
+    def __init__(
+        self,
+        service: GitHubService = github_service,
+        client: redis.Redis = redis_client,
+    ):
+        self.service = service
+        self.client = client
+
+    # --- Files (group commit) ---
+    def remove_files(self, website_ids: List[str]) -> Dict[str, dict]:
+        """Remove and push the sites' files; returns a result per site.
+
+        Each result has ``status`` "pushed", "queued" or "failed".
+        """
+        if not website_ids:
+            return {}
+        self.client.sadd(PENDING_KEY, *website_ids)
+        results: Dict[str, dict] = {}
+        while len(results) < len(website_ids):
+            lock = self.client.lock(
+                LOCK_KEY,
+                timeout=settings.GIT_LOCK_TIMEOUT,
+                blocking_timeout=settings.GIT_LOCK_WAIT_TIMEOUT,
+            )
+            if not lock.acquire():
+                raise TimeoutError("Timed out waiting for the teardown commit lock")
+            try:
+                # Sites committed by whoever held the lock before us
+                for website_id in website_ids:
+                    if website_id in results:
+                        continue
+                    if not self.client.sismember(PENDING_KEY, website_id):
+                        raw = self.client.get(RESULT_PREFIX + website_id)
+                        results[website_id] = (
+                            json.loads(raw)
+                            if raw
+                            else {"status": "failed", "message": "Result expired"}
+                        )
+                mine = [i for i in website_ids if i not in results]
+                if not mine:
+                    break
+                # Ours first, then whatever other jobs queued meanwhile
+                others = {
+                    i.decode() if isinstance(i, bytes) else i
+                    for i in self.client.smembers(PENDING_KEY)
+                } - set(mine)
+                batch = (mine + sorted(others))[: settings.DELETE_BATCH_SIZE]
+                batch_results = self._commit_batch(batch)
+                pipe = self.client.pipeline()
+                for website_id, result in batch_results.items():
+                    pipe.set(
+                        RESULT_PREFIX + website_id, json.dumps(result), ex=RESULT_TTL
+                    )
+                pipe.srem(PENDING_KEY, *batch)
+                pipe.execute()
+                for website_id in mine:
+                    if website_id in batch_results:
+                        results[website_id] = batch_results[website_id]
+            finally:
+                try:
+                    lock.release()
+                except LockError:
+                    pass
+        return results
+
+    def _commit_batch(self, website_ids: List[str]) -> Dict[str, dict]:
+        with tracer.span("teardown.commit", sites=len(website_ids)):
+            self._remove_apps_dirs(website_ids)
+            self.service.layout.remove_many(website_ids)
+            label = (
+                website_ids[0]
+                if len(website_ids) == 1
+                else f"{len(website_ids)} website(s)"
+            )
+            # Files already gone still go in ``removed`` so the branch is
+            # cleaned up even if an earlier attempt only got halfway
+            result = values_pipeline.push(label, "deleted", removed=website_ids)
+        if result.get("queued"):
+            outcome = {"status": "queued", "message": result["message"]}
+        elif result["success"]:
+            outcome = {"status": "pushed", "message": result["message"]}
+        else:
+            outcome = {"status": "failed", "message": result["message"]}
+        metrics.inc("idp_teardown_commits_total", result=outcome["status"])
+        logger.info(
+            f"Teardown commit for {len(website_ids)} site(s): {outcome['status']}"
+        )
+        return {website_id: outcome for website_id in website_ids}
+
+    def _remove_apps_dirs(self, website_ids: List[str]) -> None:
+        """Remove legacy ``apps/<id>`` directories in one commit."""
+        repo_path = Path(settings.GIT_REPO_PATH)
+        paths = []
+        for website_id in website_ids:
+            website_dir = repo_path / "apps" / website_id
+            if website_dir.exists():
+                shutil.rmtree(website_dir)
+                paths.append(f"apps/{website_id}")
+        if not paths:
+            return
+        with self.service._branch_lock("main") as acquired:
+            if acquired is False:
+                raise RuntimeError("Timed out waiting for the lock on main")
+            process_registry.run(
+                ["git", "add", "-A", "--"] + paths, cwd=repo_path, check=True
+            )
+            process_registry.run(
+                [
+                    "git",
+                    "commit",
+                    "-m",
+                    f"Remove website configuration for {len(paths)} site(s)",
+                    "--",
+                ]
+                + paths,
+                cwd=repo_path,
+                check=True,
+            )
+            process_registry.run(
+                ["git", "push", "origin", "main"], cwd=repo_path, check=True
+            )
+
+    # --- Namespaces ---
+    def delete_namespaces(self, namespaces: Dict[str, str]) -> Dict[str, str]:
+        """Request namespace deletions; returns error messages by site."""
+        errors: Dict[str, str] = {}
+
+        def delete(website_id: str) -> None:
+            process_registry.raise_if_cancelled()
+            try:
+                kubernetes_service.delete_namespace(namespaces[website_id])
+            except Exception as e:
+                errors[website_id] = str(e)
+
+        with tracer.span("teardown.namespaces", sites=len(namespaces)):
+            with ThreadPoolExecutor(settings.DELETE_PARALLELISM) as executor:
+                # Each thread keeps the job's context, so a cancelled job
+                # stops requesting deletions
+                futures = [
+                    executor.submit(contextvars.copy_context().run, delete, i)
+                    for i in namespaces
+                ]
+                try:
+                    for future in futures:
+                        future.result()
+                finally:
+                    for future in futures:
+                        future.cancel()
+        return errors
+
+    # --- Whole teardown ---
+    def teardown(
+        self,
+        namespaces: Dict[str, str],
+        progress: Optional[Callable[[int, int], None]] = None,
+    ) -> dict:
+        """Tear down ``{website_id: namespace}``; returns a summary.
+
+        Sites that fail either step stay DELETING (a failed push also
+        keeps the namespace), so the delete can simply be retried.
+        """
+        website_ids = sorted(namespaces)
+        size = settings.DELETE_BATCH_SIZE
+        summary: Dict[str, list] = {"deleted": [], "queued": [], "failed": []}
+        errors: Dict[str, str] = {}
+        for start in range(0, len(website_ids), size):
+            process_registry.raise_if_cancelled()
+            chunk = website_ids[start : start + size]
+            results = self.remove_files(chunk)
+            # Values are gone; stop before touching namespaces if cancelled
+            process_registry.raise_if_cancelled()
+            removed = {}
+            for website_id in chunk:
+                result = results[website_id]
+                if result["status"] == "failed":
+                    errors[website_id] = result["message"]
+                else:
+                    removed[website_id] = namespaces[website_id]
+            errors.update(self.delete_namespaces(removed))
+            done = [i for i in removed if i not in errors]
+            pushed = [i for i in done if results[i]["status"] == "pushed"]
+            values_pipeline.mark_deleted(pushed)
+            summary["deleted"].extend(pushed)
+            summary["queued"].extend(i for i in done if i not in pushed)
+            if progress:
+                progress(min(start + size, len(website_ids)), len(website_ids))
+        summary["failed"] = sorted(errors)
+        return {**summary, "errors": errors}
+
+
+# Create singleton instance
+website_teardown = WebsiteTeardown()
@@ -0,0 +1,176 @@
+"""
+Supervisor that runs a pool of RQ worker processes.
+
+- Keeps between WORKER_MIN_PROCESSES and WORKER_MAX_PROCESSES workers.
+- Adds workers when the backlog per worker or the oldest job's age grows,
+  retires one at a time after the queues have been empty for a while.
+- Restarts workers that exit unexpectedly.
+- On SIGTERM/SIGINT, asks every worker for a warm shutdown (finish the
+  current job) and waits up to WORKER_DRAIN_TIMEOUT before killing them.
+
+Run with ``python -m app.supervisor``.
+"""
+
+import logging
+import math
+import multiprocessing
+import os
+import signal
+import time
+from datetime import datetime
+from typing import List, Tuple
+
+from app.config import settings
+from app.logging_config import setup_logging
+from app.services.metrics import metrics
+from app.services.repo_checkout import RepoCheckout
+from app.worker import QUEUES, start_worker
+
+logger = logging.getLogger(__name__)
+
+
+def queue_pressure() -> Tuple[int, float]:
+    """Return (total queued jobs, age in seconds of the oldest queued job)."""
+    now = datetime.utcnow()
+    depth = 0
+    oldest = 0.0
+    for queue in QUEUES:
+        depth += queue.count
+        job_ids = queue.get_job_ids(0, 1)
+        if job_ids:
+            job = queue.fetch_job(job_ids[0])
+            if job is not None and job.enqueued_at:
+                oldest = max(oldest, (now - job.enqueued_at).total_seconds())
+    return depth, oldest
+
+
+def run_worker() -> None:
+    """Worker process entry point."""
+    # A forked child inherits the supervisor's handlers, which would turn
+    # SIGTERM into a no-op until RQ installs its own warm-shutdown handlers
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    start_worker()
+
+
+class WorkerSupervisor:
+    """Scales and restarts RQ worker processes."""
+
+    def __init__(
+        self,
+        min_processes: int = settings.WORKER_MIN_PROCESSES,
+        max_processes: int = settings.WORKER_MAX_PROCESSES,
+    ):
+        self.min_processes = max(1, min_processes)
+        self.max_processes = max(self.min_processes, max_processes)
+        self.processes: List[multiprocessing.Process] = []
+        self.retiring: List[multiprocessing.Process] = []
+        self._stopping = False
+        self._idle_since: float | None = None
+
+    # --- Process management ---
+    def _spawn(self) -> None:
+        process = multiprocessing.Process(target=run_worker, daemon=False)
+        process.start()
+        self.processes.append(process)
+        logger.info(f"Started worker pid={process.pid} ({len(self.processes)} total)")
+
+    def _retire_one(self) -> None:
+        # Newest first: older workers keep their warm connections
+        process = self.processes.pop()
+        self.retiring.append(process)
+        if process.pid:
+            os.kill(process.pid, signal.SIGTERM)
+        logger.info(f"Retiring worker pid={process.pid}")
+
+    def _reap(self) -> None:
+        for process in list(self.processes):
+            if not process.is_alive():
+                process.join(0)
+                self.processes.remove(process)
+                metrics.inc("idp_worker_restarts_total")
+                logger.warning(
+                    f"Worker pid={process.pid} exited with code "
+                    f"{process.exitcode}, restarting"
+                )
+                if not self._stopping:
+                    self._spawn()
+        self.retiring = [p for p in self.retiring if p.is_alive()]
+
+    # --- Scaling ---
+    def desired_processes(self, depth: int, oldest_age: float) -> int:
+        current = len(self.processes)
+        desired = current
+        if (
+            depth > current * settings.WORKER_SCALE_UP_QUEUE_DEPTH
+            or oldest_age > settings.WORKER_SCALE_UP_JOB_AGE
+        ):
+            desired = max(
+                current + 1,
+                math.ceil(depth / settings.WORKER_SCALE_UP_QUEUE_DEPTH),
+            )
+            self._idle_since = None
+        elif depth == 0:
+            now = time.monotonic()
+            if self._idle_since is None:
+                self._idle_since = now
+            elif now - self._idle_since >= settings.WORKER_SCALE_DOWN_IDLE_SECONDS:
+                desired = current - 1
+                self._idle_since = now
+        else:
+            self._idle_since = None
+        return min(self.max_processes, max(self.min_processes, desired))
+
+    def _scale(self) -> None:
+        try:
+            depth, oldest_age = queue_pressure()
+        except Exception as e:
+            logger.warning(f"Failed to read queue depth: {e}")
+            return
+        desired = self.desired_processes(depth, oldest_age)
+        while len(self.processes) < desired:
+            self._spawn()
+        while len(self.processes) > desired:
+            self._retire_one()
+        metrics.set_gauge("idp_worker_processes", len(self.processes))
+
+    # --- Lifecycle ---
+    def _handle_stop(self, signum, frame) -> None:
+        logger.info(f"Received signal {signum}, draining workers")
+        self._stopping = True
+
+    def drain(self) -> None:
+        """Warm-shutdown all workers, killing any still busy at the deadline."""
+        workers = self.processes + self.retiring
+        for process in workers:
+            if process.is_alive() and process.pid:
+                os.kill(process.pid, signal.SIGTERM)
+        deadline = time.monotonic() + settings.WORKER_DRAIN_TIMEOUT
+        for process in workers:
+            process.join(max(0.0, deadline - time.monotonic()))
+        for process in workers:
+            if process.is_alive():
+                logger.warning(f"Killing worker pid={process.pid} after drain timeout")
+                process.kill()
+                process.join()
+        self.processes = []
+        self.retiring = []
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        # Clone/convert once here rather than racing in every new worker
+        RepoCheckout(settings.GIT_REPO_PATH).ensure()
+        for _ in range(self.min_processes):
+            self._spawn()
+        while not self._stopping:
+            self._reap()
+            if not self._stopping:
+                self._scale()
+            time.sleep(settings.WORKER_SCALE_INTERVAL)
+        self.drain()
+
+
+if __name__ == "__main__":
+    setup_logging()
+    WorkerSupervisor().run()
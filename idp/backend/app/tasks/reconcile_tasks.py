@@ -0,0 +1,45 @@
+import logging
+
+from app.models.job import JobStatus
+from app.services.job_store import job_store
+from app.services.process_registry import JobCancelledError
+from app.services.reconciler import reconciler
+from app.services.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+
+def reconcile_values_task(job_id: str, force: bool = False):
+    """Background task to reconcile the database, values files and git."""
+    logger.info(f"Starting values reconciliation for job {job_id}")
+
+    try:
+        job_store.update(job_id, status=JobStatus.RUNNING)
+
+        with tracer.span("task.reconcile_plan"):
+            plan = reconciler.plan()
+        summary = plan.to_dict()["summary"]
+        job_store.update(job_id, progress=10, log=f"Plan: {summary}")
+        if plan.empty:
+            job_store.update(
+                job_id, status=JobStatus.COMPLETED, progress=100, log="In sync"
+            )
+            return
+
+        def report(done: int, total: int):
+            job_store.update(job_id, progress=10 + int(90 * done / total))
+
+        with tracer.span("task.reconcile_apply"):
+            result = reconciler.apply(plan, force=force, progress=report)
+        logger.info(f"Reconciliation finished: {result}")
+        job_store.update(
+            job_id, status=JobStatus.COMPLETED, progress=100, log=f"Applied: {result}"
+        )
+
+    except JobCancelledError:
+        logger.info(f"Reconciliation job {job_id} cancelled")
+        raise
+    except Exception as e:
+        logger.error(f"Failed to reconcile values: {str(e)}")
+        job_store.update(job_id, status=JobStatus.FAILED, error_message=str(e))
+        raise
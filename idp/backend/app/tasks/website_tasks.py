@@ -1,44 +1,164 @@
 import logging
-import subprocess
+from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 
 import yaml
 from app.config import settings
+from app.database import SessionLocal
+from app.database.models import Website, WebsiteStatusEnum
+from app.models.job import JobStatus
+from app.services.admission import admission_controller
+from app.services.argocd_service import argocd_service
+from app.services.deployment_watcher import deployment_watcher
+from app.services.github_service import github_service
+from app.services.job_store import job_store
+from app.services.kubernetes_service import kubernetes_service
+from app.services.process_registry import JobCancelledError, process_registry
+from app.services.rollout_restart import RestartTarget, rollout_restarter
+from app.services.status_buffer import status_buffer
+from app.services.tracing import tracer
+from app.services.values_pipeline import ValuesPushQueued, values_pipeline
+from app.services.website_teardown import website_teardown
 
 logger = logging.getLogger(__name__)
 
 
+def create_helm_values_file(website: Website, job_id: Optional[str] = None) -> str:
+    """Create Helm values.yaml file for website deployment.
+
+    If the push is queued, draining the outbox completes job ``job_id``.
+    """
+    # Written as values-{website_id}.yaml (sharded if enabled) + manifest
+    with tracer.span("values.render"):
+        values_path = str(
+            github_service.layout.write(
+                str(website.website_id), website.to_values_file()
+            )
+        )
+
+    logger.info(f"Generated Helm values file: {values_path}")
+
+    # Automatically push to GitHub
+    github_result = values_pipeline.push(
+        str(website.website_id), "created", str(website.namespace), job_id=job_id
+    )
+    if github_result.get("queued"):
+        raise ValuesPushQueued(github_result["message"])
+    if not github_result["success"]:
+        # Surface the failure so the site is not reported as deployed
+        raise RuntimeError(f"GitHub push failed: {github_result['message']}")
+    logger.info(f"Successfully pushed to GitHub: {github_result['message']}")
+
+    return values_path
+
+
+def provision_website_task(
+    job_id: str,
+    website_pk: int,
+    tenant: str,
+    cluster: str,
+    slot_id: Optional[str] = None,
+):
+    """Background task to render and push a new website's values.
+
+    Returns the tenant's admission slot (see ``AdmissionController``) when
+    done, however it ends.
+    """
+    try:
+        with SessionLocal() as db:
+            website = db.query(Website).filter(Website.id == website_pk).first()
+            if website is not None:
+                _provision_website(job_id, website)
+    finally:
+        admission_controller.release(tenant, cluster, slot_id)
+
+
+def _provision_website(job_id: str, website: Website):
+    # Status transitions go through the write-behind buffer, which batches
+    # them with other jobs' transitions into a single UPDATE per flush.
+    key = str(website.website_id)
+    with tracer.span("website.create", website_id=key) as span:
+        try:
+            process_registry.raise_if_cancelled()
+            job_store.update(job_id, status=JobStatus.RUNNING, progress=10)
+            status_buffer.record(
+                key,
+                status=WebsiteStatusEnum.CREATING,
+                ingress_url=f"https://{website.domain}",
+            )
+            create_helm_values_file(website, job_id)
+            process_registry.raise_if_cancelled()
+            if settings.DEPLOYMENT_VERIFY_ENABLED:
+                # RUNNING/deployed_at are set by the shared deployment watcher
+                # once the namespace's deployments and ingress are ready.
+                deployment_watcher.track(str(website.namespace), key)
+            else:
+                status_buffer.record(
+                    key,
+                    status=WebsiteStatusEnum.RUNNING,
+                    deployed_at=datetime.utcnow(),
+                )
+            job_store.update(
+                job_id,
+                status=JobStatus.COMPLETED,
+                progress=100,
+                log="Helm values generated and pushed",
+            )
+        except ValuesPushQueued as queued:
+            # Provisioning resumes, and the job completes, when the outbox
+            # is drained
+            status_buffer.record(key, status=WebsiteStatusEnum.QUEUED)
+            job_store.update(job_id, progress=50, log=str(queued))
+        except JobCancelledError:
+            status_buffer.record(key, status=WebsiteStatusEnum.FAILED)
+            logger.info(f"Website creation job {job_id} cancelled")
+            raise
+        except Exception as exc:
+            span.error = str(exc)
+            status_buffer.record(key, status=WebsiteStatusEnum.FAILED)
+            job_store.update(job_id, status=JobStatus.FAILED, error_message=str(exc))
+            logger.error(f"Error processing website creation: {exc}")
+            raise
+
+
 def create_website_task(job_id: str, website_config: Dict[str, Any]):
     """Background task to create a website."""
     logger.info(f"Starting website creation task for job {job_id}")
 
     try:
         # Update job status to running
-        # TODO: Update job in database
+        job_store.update(job_id, status=JobStatus.RUNNING)
 
         # Step 1: Generate website files
         logger.info("Generating website configuration files...")
-        _generate_website_files(website_config)
+        with tracer.span("task.generate_files"):
+            _generate_website_files(website_config)
 
         # Step 2: Apply Kubernetes secrets
         logger.info("Applying Kubernetes secrets...")
-        _apply_kubernetes_secrets(website_config)
+        with tracer.span("task.apply_secrets"):
+            _apply_kubernetes_secrets(website_config)
 
         # Step 3: Wait for ArgoCD sync (or trigger manual sync)
         logger.info("Triggering ArgoCD sync...")
-        _trigger_argocd_sync(website_config["website_id"])
+        with tracer.span("task.argocd_sync"):
+            _trigger_argocd_sync(website_config["website_id"])
 
         # Step 4: Verify deployment
         logger.info("Verifying deployment...")
-        _verify_deployment(website_config["website_id"])
+        with tracer.span("task.verify_deployment"):
+            _verify_deployment(website_config["website_id"])
 
         logger.info(f"Website {website_config['website_id']} created successfully")
-        # TODO: Update job status to completed
+        job_store.update(job_id, status=JobStatus.COMPLETED, progress=100)
 
+    except JobCancelledError:
+        logger.info(f"Website creation job {job_id} cancelled")
+        raise
     except Exception as e:
         logger.error(f"Failed to create website: {str(e)}")
-        # TODO: Update job status to failed
+        job_store.update(job_id, status=JobStatus.FAILED, error_message=str(e))
         raise
 
 
@@ -272,8 +392,11 @@ def _apply_kubernetes_secrets(config: Dict[str, Any]):
     website_id = config["website_id"]
     secrets_file = Path(settings.GIT_REPO_PATH) / "apps" / website_id / "secrets.yaml"
 
-    # Apply secrets using kubectl
-    subprocess.run(["kubectl", "apply", "-f", str(secrets_file)], check=True)
+    with open(secrets_file) as f:
+        manifest = yaml.safe_load(f)
+
+    # Apply secrets through the pooled Kubernetes client
+    kubernetes_service.apply_secret(manifest)
 
 
 def _commit_and_push_changes(website_id: str):
@@ -281,80 +404,173 @@ def _commit_and_push_changes(website_id: str):
     repo_path = Path(settings.GIT_REPO_PATH)
 
     # Add files
-    subprocess.run(["git", "add", f"apps/{website_id}/"], cwd=repo_path, check=True)
+    process_registry.run(
+        ["git", "add", f"apps/{website_id}/"], cwd=repo_path, check=True
+    )
 
     # Commit
-    subprocess.run(
+    process_registry.run(
         ["git", "commit", "-m", f"Add website configuration for {website_id}"],
         cwd=repo_path,
         check=True,
     )
 
     # Push
-    subprocess.run(["git", "push", "origin", "main"], cwd=repo_path, check=True)
+    process_registry.run(["git", "push", "origin", "main"], cwd=repo_path, check=True)
 
 
 def _trigger_argocd_sync(website_id: str):
     """Trigger ArgoCD application sync."""
-    # TODO: Implement ArgoCD CLI or API call
-    pass
+    if not argocd_service.enabled:
+        logger.info("ARGOCD_SERVER_URL not set, relying on automated sync")
+        return
+    argocd_service.sync_application(argocd_service.application_name(website_id))
 
 
-def _verify_deployment(website_id: str):
+def _verify_deployment(website_id: str, namespace: Optional[str] = None):
     """Verify that the deployment was successful."""
-    # TODO: Check if pods are running, ingress is ready, etc.
-    pass
+    if not settings.DEPLOYMENT_VERIFY_ENABLED:
+        return
+    # Wait on the shared watch instead of polling the API from this job
+    rollout = deployment_watcher.wait(
+        namespace=namespace or website_id, website_id=website_id
+    )
+    if not rollout.ready:
+        raise RuntimeError(
+            f"Deployment of {website_id} not ready: {rollout.reason or 'timed out'}"
+        )
 
 
-def delete_website_task(job_id: str, website_id: str):
-    """Background task to delete a website."""
-    logger.info(f"Starting website deletion task for job {job_id}")
+def sync_website_task(job_id: str, website_id: str, namespace: str):
+    """Background task to roll out updated values for a website."""
+    logger.info(f"Starting website sync task for job {job_id}")
 
     try:
-        # Update job status to running
-        # TODO: Update job in database
+        job_store.update(job_id, status=JobStatus.RUNNING)
 
-        # Step 1: Delete Kubernetes resources
-        logger.info("Deleting Kubernetes resources...")
-        _delete_kubernetes_resources(website_id)
+        logger.info("Triggering ArgoCD sync...")
+        with tracer.span("task.argocd_sync"):
+            _trigger_argocd_sync(website_id)
+        job_store.update(job_id, progress=50, log="ArgoCD sync triggered")
 
-        # Step 2: Remove website files from Git
-        logger.info("Removing website files...")
-        _remove_website_files(website_id)
+        logger.info("Verifying deployment...")
+        with tracer.span("task.verify_deployment"):
+            _verify_deployment(website_id, namespace)
 
-        logger.info(f"Website {website_id} deleted successfully")
-        # TODO: Update job status to completed
+        logger.info(f"Website {website_id} synced successfully")
+        job_store.update(job_id, status=JobStatus.COMPLETED, progress=100)
 
+    except JobCancelledError:
+        logger.info(f"Website sync job {job_id} cancelled")
+        raise
     except Exception as e:
-        logger.error(f"Failed to delete website: {str(e)}")
-        # TODO: Update job status to failed
+        logger.error(f"Failed to sync website: {str(e)}")
+        job_store.update(job_id, status=JobStatus.FAILED, error_message=str(e))
         raise
 
 
-def _delete_kubernetes_resources(website_id: str):
-    """Delete Kubernetes resources for a website."""
-    # Delete namespace (this will delete all resources in it)
-    subprocess.run(
-        ["kubectl", "delete", "namespace", website_id, "--ignore-not-found=true"],
-        check=True,
-    )
+def restart_websites_task(
+    job_id: str,
+    targets: List[Dict[str, str]],
+    parallelism: Optional[int] = None,
+    max_surge: Optional[int] = None,
+):
+    """Background task to restart websites in per-cluster waves.
+
+    ``targets`` holds ``website_id``/``cluster``/``namespace`` dicts.
+    """
+    logger.info(f"Starting restart of {len(targets)} website(s) for job {job_id}")
 
+    try:
+        job_store.update(job_id, status=JobStatus.RUNNING)
+
+        def report(done: int, total: int):
+            job_store.update(job_id, progress=int(100 * done / total))
+
+        with tracer.span("task.restart", sites=len(targets)):
+            results = rollout_restarter.restart(
+                [RestartTarget(**target) for target in targets],
+                parallelism=parallelism,
+                max_surge=max_surge,
+                progress=report,
+            )
+        failed: Dict[str, str] = {}
+        counts: Dict[str, int] = {}
+        for website_id, result in results.items():
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+            if result["status"] == "failed":
+                failed[website_id] = result["message"]
+        summary = ", ".join(f"{n} {status}" for status, n in sorted(counts.items()))
+        logger.info(f"Restart finished: {summary}")
+        if failed:
+            job_store.update(
+                job_id,
+                status=JobStatus.FAILED,
+                error_message="; ".join(
+                    f"{website_id}: {error}"
+                    for website_id, error in sorted(failed.items())
+                ),
+                log=summary,
+            )
+        else:
+            job_store.update(
+                job_id, status=JobStatus.COMPLETED, progress=100, log=summary
+            )
+
+    except JobCancelledError:
+        logger.info(f"Website restart job {job_id} cancelled")
+        raise
+    except Exception as e:
+        logger.error(f"Failed to restart website(s): {str(e)}")
+        job_store.update(job_id, status=JobStatus.FAILED, error_message=str(e))
+        raise
 
-def _remove_website_files(website_id: str):
-    """Remove website files from Git repository."""
-    import shutil
 
-    repo_path = Path(settings.GIT_REPO_PATH)
-    website_dir = repo_path / "apps" / website_id
+def delete_website_task(job_id: str, website_id: str, namespace: str):
+    """Background task to delete a website."""
+    logger.info(f"Starting website deletion task for job {job_id}")
+    _teardown(job_id, {website_id: namespace})
 
-    if website_dir.exists():
-        shutil.rmtree(website_dir)
 
-        # Commit and push changes
-        subprocess.run(["git", "add", "-A"], cwd=repo_path, check=True)
-        subprocess.run(
-            ["git", "commit", "-m", f"Remove website configuration for {website_id}"],
-            cwd=repo_path,
-            check=True,
+def bulk_delete_websites_task(job_id: str, namespaces: Dict[str, str]):
+    """Background task to delete many websites (``{website_id: namespace}``)."""
+    logger.info(f"Starting bulk deletion of {len(namespaces)} website(s)")
+    _teardown(job_id, namespaces)
+
+
+def _teardown(job_id: str, namespaces: Dict[str, str]):
+    try:
+        job_store.update(job_id, status=JobStatus.RUNNING)
+
+        def report(done: int, total: int):
+            job_store.update(job_id, progress=int(100 * done / total))
+
+        with tracer.span("task.teardown", sites=len(namespaces)):
+            result = website_teardown.teardown(namespaces, progress=report)
+        summary = (
+            f"{len(result['deleted'])} deleted, {len(result['queued'])} waiting "
+            f"for the values push, {len(result['failed'])} failed"
         )
-        subprocess.run(["git", "push", "origin", "main"], cwd=repo_path, check=True)
+        logger.info(f"Teardown finished: {summary}")
+        if result["failed"]:
+            job_store.update(
+                job_id,
+                status=JobStatus.FAILED,
+                error_message="; ".join(
+                    f"{website_id}: {error}"
+                    for website_id, error in sorted(result["errors"].items())
+                ),
+                log=summary,
+            )
+        else:
+            job_store.update(
+                job_id, status=JobStatus.COMPLETED, progress=100, log=summary
+            )
+
+    except JobCancelledError:
+        logger.info(f"Website deletion job {job_id} cancelled")
+        raise
+    except Exception as e:
+        logger.error(f"Failed to delete website(s): {str(e)}")
+        job_store.update(job_id, status=JobStatus.FAILED, error_message=str(e))
+        raise
@@ -1,19 +1,174 @@
-import redis
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Optional
+
 from app.config import settings
+from app.database.redis import redis_client
+from app.logging_config import log_context, request_id, setup_logging, shutdown_logging
+from app.services.cluster_slots import cluster_slots
+from app.services.deployment_watcher import deployment_watcher
+from app.services.metrics import metrics
+from app.services.process_registry import process_registry
+from app.services.repo_checkout import RepoCheckout
+from app.services.status_buffer import status_buffer
+from app.services.tracing import tracer
 from rq import Queue, Worker
+from rq.exceptions import InvalidJobOperation
+from rq.job import Job
 
-# Redis connection
-redis_client = redis.from_url(settings.REDIS_URL)
+logger = logging.getLogger(__name__)
 
-# Create queues
+# Create queues. Website work is split into priority lanes; a worker always
+# drains earlier lanes first (e.g. interactive restarts before bulk creates).
+interactive_queue = Queue("website-interactive", connection=redis_client)
 website_queue = Queue("website", connection=redis_client)
+bulk_queue = Queue("website-bulk", connection=redis_client)
 terraform_queue = Queue("terraform", connection=redis_client)
 
+LANES = {
+    "interactive": interactive_queue,
+    "default": website_queue,
+    "bulk": bulk_queue,
+}
+QUEUES = [interactive_queue, website_queue, bulk_queue, terraform_queue]
+
+
+def enqueue_website_job(
+    lane: str,
+    func: Callable,
+    *args: Any,
+    cluster: Optional[str] = None,
+    website_id: Optional[str] = None,
+    **kwargs: Any,
+) -> Job:
+    """Enqueue a website job on a priority lane, tagged with its cluster.
+
+    The current request ID and ``website_id`` travel in the job meta so the
+    job's log lines carry them too, as does the current trace context so
+    the job's spans join the request's trace.
+    """
+    queue = LANES[lane]
+    meta = {
+        "lane": lane,
+        "cluster": cluster,
+        "request_id": request_id.get(),
+        "website_id": website_id,
+        "trace": tracer.inject(),
+    }
+    return queue.enqueue(func, *args, meta=meta, **kwargs)
+
+
+class ClusterAwareWorker(Worker):
+    """RQ worker that enforces per-cluster concurrency limits.
+
+    A job whose cluster is at its limit is pushed back to the scheduled
+    registry instead of occupying this worker, so one slow cluster cannot
+    starve jobs for the others; it re-enters the front of its lane. Jobs
+    cancelled in the meantime are dropped before taking a slot.
+    """
+
+    def execute_job(self, job: Job, queue: Queue):
+        cluster = job.meta.get("cluster")
+        lane = job.meta.get("lane", queue.name)
+        if process_registry.is_cancelled(job.id):
+            # Cancelled while deferred or between dequeue and here
+            try:
+                job.cancel()
+            except InvalidJobOperation:
+                pass  # the cancel request already did it
+            return
+        token = None
+        if cluster:
+            token = cluster_slots.acquire(cluster)
+            if token is None:
+                metrics.inc("idp_cluster_slot_deferrals_total", cluster=cluster)
+                # Back to the front of its lane, not behind jobs queued since
+                job.enqueue_at_front = True
+                queue.schedule_job(
+                    job,
+                    datetime.utcnow()
+                    + timedelta(seconds=settings.CLUSTER_SLOT_RETRY_SECONDS),
+                )
+                return
+        wait = 0.0
+        if job.enqueued_at:
+            wait = (datetime.utcnow() - job.enqueued_at).total_seconds()
+            metrics.observe("idp_queue_wait_seconds", wait, lane=lane)
+        trace = job.meta.get("trace")
+        try:
+            # Inherited by the forked work horse, so git subprocesses started
+            # by the job are registered for cancellation under its id.
+            with process_registry.job_context(job.id), log_context(
+                request_id=job.meta.get("request_id"),
+                website_id=job.meta.get("website_id"),
+            ):
+                started = time.time_ns()
+                queued = started - int(wait * 1e9)
+                tracer.record("queue.wait", queued, started, trace, lane=lane)
+                with tracer.span("rq.job", trace, lane=lane, func=job.func_name):
+                    return super().execute_job(job, queue)
+        finally:
+            if token:
+                cluster_slots.release(cluster, token)
+
+    def perform_job(self, job: Job, queue: Queue) -> bool:
+        try:
+            return super().perform_job(job, queue)
+        finally:
+            if self._is_horse:
+                # The horse exits with os._exit: write out buffered status
+                # transitions, queued spans and log lines
+                try:
+                    status_buffer.flush()
+                except Exception as e:
+                    logger.error(f"Failed to write status updates of {job.id}: {e}")
+                try:
+                    metrics.flush()
+                except Exception as e:
+                    logger.warning(f"Could not share metrics of {job.id}: {e}")
+                tracer.flush()
+                shutdown_logging()
+
+
+def collect_queue_metrics() -> None:
+    """Refresh queue depth and oldest-job age gauges for every lane."""
+    now = datetime.utcnow()
+    for lane, queue in {**LANES, "terraform": terraform_queue}.items():
+        metrics.set_gauge("idp_queue_depth", queue.count, lane=lane)
+        age = 0.0
+        job_ids = queue.get_job_ids(0, 1)
+        if job_ids:
+            job = queue.fetch_job(job_ids[0])
+            if job is not None and job.enqueued_at:
+                age = (now - job.enqueued_at).total_seconds()
+        metrics.set_gauge("idp_queue_oldest_job_age_seconds", age, lane=lane)
+
+
+metrics.add_collector(collect_queue_metrics)
+
 
 def start_worker():
     """Start RQ worker."""
-    worker = Worker([website_queue, terraform_queue], connection=redis_client)
-    worker.work()
+    setup_logging()
+    worker = ClusterAwareWorker(QUEUES, connection=redis_client)
+    # Tasks write to apps/ in this checkout; clone it sparsely if missing
+    RepoCheckout(settings.GIT_REPO_PATH).ensure()
+    # Kills git subprocesses of cancelled jobs running on this host
+    process_registry.start_listener()
+    metrics.start_flusher()
+    # Work horses are short-lived: the shared deployment watch (if this
+    # process is elected) runs here and they only register rollouts
+    deployment_watcher.start()
+    try:
+        # The scheduler re-enqueues jobs deferred by cluster limits
+        worker.work(with_scheduler=True)
+    finally:
+        deployment_watcher.stop()
+        # Write any buffered status transitions before exiting
+        status_buffer.stop()
+        tracer.flush()
+        shutdown_logging()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark: pooled Kubernetes client vs one ``kubectl`` process per call.
+
+Both paths delete the same number of namespaces on a local fake API server
+(tests/fake_kube_api.py), so the numbers compare per-call overhead only:
+process start-up and connection setup versus a reused pooled connection.
+
+    python -m tests.bench_kubernetes [--calls 200]
+
+The kubectl path is skipped when ``kubectl`` is not on PATH.
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+from app.services.kubernetes_service import KubernetesService
+
+from tests.fake_kube_api import FakeKubeAPI
+
+KUBECONFIG_TEMPLATE = """\
+apiVersion: v1
+kind: Config
+clusters:
+- name: fake
+  cluster:
+    server: {url}
+contexts:
+- name: fake
+  context:
+    cluster: fake
+    user: fake
+current-context: fake
+users:
+- name: fake
+  user:
+    token: fake
+"""
+
+
+def bench_client(api: FakeKubeAPI, calls: int) -> float:
+    api.namespaces.update(f"client-{i}" for i in range(calls))
+    kube = KubernetesService(configuration=api.configuration())
+    try:
+        start = time.perf_counter()
+        for i in range(calls):
+            kube.delete_namespace(f"client-{i}")
+        return time.perf_counter() - start
+    finally:
+        kube.close()
+
+
+def bench_kubectl(api: FakeKubeAPI, kubectl: str, calls: int) -> float:
+    api.namespaces.update(f"kubectl-{i}" for i in range(calls))
+    with tempfile.TemporaryDirectory() as tmp:
+        kubeconfig = os.path.join(tmp, "config")
+        with open(kubeconfig, "w") as f:
+            f.write(KUBECONFIG_TEMPLATE.format(url=api.url))
+        # Keep kubectl's discovery cache out of the user's home
+        env = dict(os.environ, KUBECONFIG=kubeconfig, KUBECACHEDIR=tmp)
+        start = time.perf_counter()
+        for i in range(calls):
+            subprocess.run(
+                [kubectl, "delete", "namespace", f"kubectl-{i}", "--wait=false"],
+                env=env,
+                check=True,
+                capture_output=True,
+            )
+        return time.perf_counter() - start
+
+
+def report(label: str, elapsed: float, calls: int) -> None:
+    print(
+        f"{label:<8} {calls} calls in {elapsed:.2f}s "
+        f"({elapsed / calls * 1000:.1f} ms/call)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    api = FakeKubeAPI().start()
+    try:
+        elapsed = bench_client(api, args.calls)
+        report("client", elapsed, args.calls)
+        print(f"         over {api.connections()} connection(s)")
+
+        kubectl = shutil.which("kubectl")
+        if kubectl is None:
+            print("kubectl  skipped (not on PATH)")
+            return
+        kubectl_elapsed = bench_kubectl(api, kubectl, args.calls)
+        report("kubectl", kubectl_elapsed, args.calls)
+        print(f"speed-up {kubectl_elapsed / elapsed:.1f}x")
+    finally:
+        api.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+# Make ``app`` importable when running ``pytest`` from the backend directory
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.database import SessionLocal  # noqa: E402
+from app.database.models import Base  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+
+
+@pytest.fixture
+def database(tmp_path):
+    """Points ``SessionLocal`` at an empty SQLite database for one test."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'idp.db'}")
+    Base.metadata.create_all(bind=engine)
+    original = SessionLocal.kw["bind"]
+    SessionLocal.configure(bind=engine)
+    yield SessionLocal
+    SessionLocal.configure(bind=original)
+    engine.dispose()
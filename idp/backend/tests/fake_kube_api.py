@@ -0,0 +1,317 @@
+"""
+Minimal stand-in for the Kubernetes API server, for tests and benchmarks.
+
+Serves just the endpoints ``KubernetesService`` calls (secrets, namespaces,
+deployments, pod logs) plus the discovery documents ``kubectl`` needs, over
+HTTP/1.1 with keep-alive. ``follow`` log requests are streamed (chunked)
+until the container's log is closed or the server stops. Every request is
+recorded, including the client port, so tests can check how many
+connections were opened.
+"""
+
+import json
+import re
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from kubernetes import client
+
+DISCOVERY = {
+    "/api": {"kind": "APIVersions", "versions": ["v1"]},
+    "/apis": {"kind": "APIGroupList", "apiVersion": "v1", "groups": []},
+    "/api/v1": {
+        "kind": "APIResourceList",
+        "groupVersion": "v1",
+        "resources": [
+            {
+                "name": "namespaces",
+                "singularName": "namespace",
+                "namespaced": False,
+                "kind": "Namespace",
+                "verbs": ["create", "delete", "get", "list", "patch"],
+            }
+        ],
+    },
+}
+
+
+LOG_PATH = re.compile(r"/api/v1/namespaces/([^/]+)/pods/([^/]+)/log")
+
+
+def _flag(query: Dict[str, List[str]], name: str) -> bool:
+    # The client sends Python's str(True); the API server accepts any case
+    return query.get(name, [""])[0].lower() == "true"
+
+
+def _log_line(line: Tuple[str, str], timestamps: bool) -> str:
+    stamp, message = line
+    return f"{stamp} {message}\n" if timestamps else f"{message}\n"
+
+
+class FakeKubeAPI:
+    """In-memory namespaces and deployments behind a local HTTP server."""
+
+    def __init__(self):
+        self.namespaces = set()
+        # namespace -> {deployment name: generation}
+        self.deployments: Dict[str, Dict[str, int]] = {}
+        self.requests: List[dict] = []
+        # (namespace, pod, container) -> [(RFC3339Nano stamp, message)]
+        self.logs: Dict[Tuple[str, str, str], List[Tuple[str, str]]] = {}
+        self._closed_logs: set = set()
+        self._lock = threading.Lock()
+        self._log_changed = threading.Condition(self._lock)
+        self._stopping = False
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def configuration(self) -> client.Configuration:
+        cfg = client.Configuration()
+        cfg.host = self.url
+        return cfg
+
+    def connections(self) -> int:
+        """Distinct client connections seen so far."""
+        with self._lock:
+            return len({r["client"] for r in self.requests})
+
+    def append_log(self, namespace: str, pod: str, container: str, message: str):
+        """Add a log line stamped now, waking ``follow`` readers."""
+        stamp = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+        with self._log_changed:
+            self.logs.setdefault((namespace, pod, container), []).append(
+                (stamp, message)
+            )
+            self._log_changed.notify_all()
+
+    def close_log(self, namespace: str, pod: str, container: str) -> None:
+        """End ``follow`` streams of a container (as if it terminated)."""
+        with self._log_changed:
+            self._closed_logs.add((namespace, pod, container))
+            self._log_changed.notify_all()
+
+    def start(self) -> "FakeKubeAPI":
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are separate writes; without this, Nagle plus
+            # delayed ACKs add ~40ms to every keep-alive response
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _body(self) -> dict:
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                return json.loads(raw) if raw else {}
+
+            def _reply(self, status: int, payload: dict) -> None:
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream_log(self, key, start: int, timestamps: bool) -> None:
+                """Chunked ``follow`` from line ``start`` on, then live lines."""
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                while True:
+                    with api._log_changed:
+                        while (
+                            len(api.logs.get(key, [])) <= start
+                            and key not in api._closed_logs
+                            and not api._stopping
+                        ):
+                            api._log_changed.wait()
+                        lines = api.logs.get(key, [])[start:]
+                        done = key in api._closed_logs or api._stopping
+                    start += len(lines)
+                    data = "".join(
+                        _log_line(line, timestamps) for line in lines
+                    ).encode()
+                    try:
+                        if data:
+                            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                        if done:
+                            self.wfile.write(b"0\r\n\r\n")
+                            return
+                    except OSError:
+                        return
+
+            def _reply_text(self, status: int, text: str) -> None:
+                data = text.encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "text/plain")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _handle(self) -> None:
+                url = urlparse(self.path)
+                body = self._body()
+                with api._lock:
+                    query = parse_qs(url.query)
+                    api.requests.append(
+                        {
+                            "method": self.command,
+                            "path": url.path,
+                            "query": query,
+                            "content_type": self.headers.get("Content-Type"),
+                            "body": body,
+                            "client": self.client_address,
+                        }
+                    )
+                    match = LOG_PATH.fullmatch(url.path)
+                    key = match and (
+                        *match.groups(),
+                        query.get("container", [""])[0],
+                    )
+                    timestamps = _flag(query, "timestamps")
+                    if key in api.logs:
+                        history = api._log_history(key, query)
+                        # The history is a suffix of the container's log
+                        start = len(api.logs[key]) - len(history)
+                        status = None if _flag(query, "follow") else 200
+                        payload = "".join(
+                            _log_line(line, timestamps) for line in history
+                        )
+                    else:
+                        status, payload = api.route(self.command, url.path, body)
+                if status is None:
+                    self._stream_log(key, start, timestamps)
+                elif isinstance(payload, str):
+                    self._reply_text(status, payload)
+                else:
+                    self._reply(status, payload)
+
+            do_GET = do_PATCH = do_DELETE = do_POST = _handle
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        with self._log_changed:
+            self._stopping = True
+            self._log_changed.notify_all()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def _log_history(self, key, query) -> List[Tuple[str, str]]:
+        """Lines a log request starts with (called with the lock held)."""
+        lines = self.logs.get(key, [])
+        if "sinceSeconds" in query:
+            since = timedelta(seconds=int(query["sinceSeconds"][0]))
+            cutoff = (datetime.now(timezone.utc) - since).strftime(
+                "%Y-%m-%dT%H:%M:%S"
+            )
+            lines = [line for line in lines if line[0] >= cutoff]
+        if "tailLines" in query:
+            tail = int(query["tailLines"][0])
+            lines = lines[-tail:] if tail else []
+        return lines
+
+    # --- Routing (called with the lock held) ---
+    def route(self, method: str, path: str, body: dict):
+        if method == "GET" and path in DISCOVERY:
+            return 200, DISCOVERY[path]
+
+        match = re.fullmatch(r"/api/v1/namespaces/([^/]+)/secrets/([^/]+)", path)
+        if match and method == "PATCH":
+            namespace, name = match.groups()
+            return 200, {
+                "apiVersion": "v1",
+                "kind": "Secret",
+                "metadata": {"name": name, "namespace": namespace},
+                "data": body.get("data", {}),
+            }
+
+        match = re.fullmatch(r"/api/v1/namespaces/([^/]+)/pods", path)
+        if match and method == "GET":
+            namespace = match.group(1)
+            pods: Dict[str, List[str]] = {}
+            for ns, pod, container in self.logs:
+                if ns == namespace:
+                    pods.setdefault(pod, []).append(container)
+            return 200, {
+                "apiVersion": "v1",
+                "kind": "PodList",
+                "items": [
+                    {
+                        "metadata": {"name": pod, "namespace": namespace},
+                        "spec": {
+                            "containers": [{"name": c} for c in sorted(names)]
+                        },
+                    }
+                    for pod, names in sorted(pods.items())
+                ],
+            }
+
+        match = re.fullmatch(r"/api/v1/namespaces/([^/]+)", path)
+        if match and method == "DELETE":
+            namespace = match.group(1)
+            if namespace not in self.namespaces:
+                return 404, {"kind": "Status", "code": 404, "reason": "NotFound"}
+            self.namespaces.discard(namespace)
+            return 200, {
+                "apiVersion": "v1",
+                "kind": "Namespace",
+                "metadata": {"name": namespace},
+                "status": {"phase": "Terminating"},
+            }
+
+        match = re.fullmatch(r"/apis/apps/v1/namespaces/([^/]+)/deployments", path)
+        if match and method == "GET":
+            namespace = match.group(1)
+            items = [
+                self._deployment(namespace, name, generation)
+                for name, generation in self.deployments.get(namespace, {}).items()
+            ]
+            return 200, {
+                "apiVersion": "apps/v1",
+                "kind": "DeploymentList",
+                "items": items,
+            }
+
+        match = re.fullmatch(
+            r"/apis/apps/v1/namespaces/([^/]+)/deployments/([^/]+)", path
+        )
+        if match and method == "PATCH":
+            namespace, name = match.groups()
+            generations = self.deployments.get(namespace, {})
+            if name not in generations:
+                return 404, {"kind": "Status", "code": 404, "reason": "NotFound"}
+            generations[name] += 1
+            deployment = self._deployment(namespace, name, generations[name])
+            deployment["spec"]["template"] = body["spec"]["template"]
+            return 200, deployment
+
+        return 404, {"kind": "Status", "code": 404, "reason": "NotFound"}
+
+    @staticmethod
+    def _deployment(namespace: str, name: str, generation: int) -> dict:
+        return {
+            "apiVersion": "apps/v1",
+            "kind": "Deployment",
+            "metadata": {
+                "name": name,
+                "namespace": namespace,
+                "generation": generation,
+            },
+            "spec": {"selector": {"matchLabels": {"app": name}}, "template": {}},
+        }
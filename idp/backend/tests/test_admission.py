@@ -0,0 +1,89 @@
+import fakeredis
+import pytest
+import redis
+from app.config import settings
+from app.services.admission import AdmissionController, retry_after_header
+from starlette.requests import Request
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    monkeypatch.setattr(settings, "ADMISSION_ENABLED", True)
+    monkeypatch.setattr(settings, "ADMISSION_RATE_PER_SECOND", 0.5)
+    monkeypatch.setattr(settings, "ADMISSION_BURST", 2)
+    monkeypatch.setattr(settings, "ADMISSION_MAX_CONCURRENT", 5)
+
+
+@pytest.fixture
+def controller(limits):
+    return AdmissionController(fakeredis.FakeRedis())
+
+
+def request_from(peer, headers=None):
+    return Request(
+        {
+            "type": "http",
+            "method": "POST",
+            "path": "/websites",
+            "headers": [
+                (name.lower().encode(), value.encode())
+                for name, value in (headers or {}).items()
+            ],
+            "client": (peer, 50000),
+        }
+    )
+
+
+def test_burst_is_spent_then_rate_limited(controller):
+    decisions = [controller.admit("team-a", "prod") for _ in range(3)]
+
+    assert [d.admitted for d in decisions] == [True, True, False]
+    rejected = decisions[-1]
+    assert rejected.reason == "rate"
+    # One token refills in 1 / 0.5 seconds
+    assert retry_after_header(rejected) == {"Retry-After": "2"}
+    # Other tenants have their own bucket
+    assert controller.admit("team-b", "prod").admitted
+
+
+def test_released_slot_admits_the_next_job(limits, monkeypatch):
+    monkeypatch.setattr(settings, "ADMISSION_MAX_CONCURRENT", 1)
+    controller = AdmissionController(fakeredis.FakeRedis())
+
+    first = controller.admit("team-a", "prod")
+    blocked = controller.admit("team-a", "prod")
+    controller.release("team-a", "prod", first.slot_id)
+
+    assert blocked.reason == "concurrency"
+    assert controller.admit("team-a", "prod").admitted
+
+
+def test_unreachable_store_falls_back_to_local_limits(limits):
+    server = fakeredis.FakeServer()
+    server.connected = False
+    controller = AdmissionController(fakeredis.FakeRedis(server=server))
+
+    decisions = [controller.admit("team-a", "prod") for _ in range(3)]
+
+    assert [d.reason for d in decisions] == ["ok", "ok", "rate"]
+    with pytest.raises(redis.ConnectionError):
+        controller.client.ping()
+
+
+def test_tenant_headers_are_only_trusted_from_proxies(monkeypatch):
+    monkeypatch.setattr(settings, "ADMISSION_TRUSTED_PROXIES", ["10.0.0.0/8"])
+    headers = {"X-Tenant-ID": "team-a", "X-Forwarded-For": "203.0.113.7"}
+
+    assert AdmissionController.tenant_for(request_from("10.1.2.3", headers)) == (
+        "team-a"
+    )
+    assert (
+        AdmissionController.tenant_for(
+            request_from("10.1.2.3", {"X-Forwarded-For": "1.1.1.1, 203.0.113.7"})
+        )
+        == "203.0.113.7"
+    )
+    # A direct client cannot pick its own tenant
+    assert AdmissionController.tenant_for(request_from("198.51.100.9", headers)) == (
+        "198.51.100.9"
+    )
@@ -0,0 +1,198 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import fakeredis
+import httpx
+import pytest
+import redis
+from app.config import settings
+from app.services.argocd_service import SYNC_KEY_PREFIX, ArgoCDService
+
+WINDOW = 0.3
+
+
+class FakeArgoCD:
+    """Local stand-in for the ArgoCD sync endpoint."""
+
+    def __init__(self):
+        self.syncs = []
+        self.status = 200
+        self.reply = {"status": {"sync": {"status": "Syncing"}}}
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeArgoCD":
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                with fake._lock:
+                    fake.syncs.append(
+                        {
+                            "path": self.path,
+                            "authorization": self.headers.get("Authorization"),
+                            "body": body,
+                        }
+                    )
+                    status, reply = fake.status, fake.reply
+                data = json.dumps(reply).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def short_window(monkeypatch):
+    monkeypatch.setattr(settings, "ARGOCD_SYNC_COALESCE_WINDOW", WINDOW)
+
+
+@pytest.fixture
+def argocd():
+    fake = FakeArgoCD().start()
+    yield fake
+    fake.stop()
+
+
+@pytest.fixture
+def shared_redis():
+    return fakeredis.FakeRedis()
+
+
+def make_service(argocd, redis_conn):
+    return ArgoCDService(
+        server_url=argocd.url, auth_token="token", redis_conn=redis_conn
+    )
+
+
+def run_concurrently(calls):
+    with ThreadPoolExecutor(max_workers=len(calls)) as pool:
+        futures = [pool.submit(call) for call in calls]
+        return [f.result() for f in futures]
+
+
+def test_sync_posts_to_application(argocd, shared_redis):
+    service = make_service(argocd, shared_redis)
+    try:
+        result = service.sync_application("site-1")
+    finally:
+        service.close()
+
+    assert result == argocd.reply
+    (sync,) = argocd.syncs
+    assert sync["path"] == "/api/v1/applications/site-1/sync"
+    assert sync["authorization"] == "Bearer token"
+    assert sync["body"] == {"prune": False, "dryRun": False}
+
+
+def test_concurrent_requests_in_one_process_share_one_sync(argocd, shared_redis):
+    service = make_service(argocd, shared_redis)
+    try:
+        results = run_concurrently(
+            [lambda: service.sync_application("site-1")] * 5
+        )
+    finally:
+        service.close()
+
+    assert len(argocd.syncs) == 1
+    assert all(result == argocd.reply for result in results)
+
+
+def test_requests_from_other_processes_are_coalesced(argocd, shared_redis):
+    # Separate instances sharing one Redis stand in for separate processes
+    services = [make_service(argocd, shared_redis) for _ in range(3)]
+    try:
+        results = run_concurrently(
+            [lambda s=s: s.sync_application("site-1") for s in services]
+        )
+    finally:
+        for service in services:
+            service.close()
+
+    assert len(argocd.syncs) == 1
+    assert results.count({"application": "site-1", "status": "coalesced"}) == 2
+    assert results.count(argocd.reply) == 1
+    assert shared_redis.pttl(f"{SYNC_KEY_PREFIX}site-1") <= WINDOW * 1000
+
+
+def test_window_expires_so_later_requests_sync_again(argocd, shared_redis):
+    first, second = (make_service(argocd, shared_redis) for _ in range(2))
+    try:
+        first.sync_application("site-1")
+        second.sync_application("site-1")
+    finally:
+        first.close()
+        second.close()
+
+    assert len(argocd.syncs) == 2
+
+
+def test_sync_in_progress_is_not_an_error(argocd, shared_redis):
+    argocd.status = 400
+    argocd.reply = {"error": "another operation is already in progress"}
+    service = make_service(argocd, shared_redis)
+    try:
+        result = service.sync_application("site-1")
+    finally:
+        service.close()
+
+    assert result == {"application": "site-1", "status": "in_progress"}
+
+
+def test_failure_is_raised_to_every_waiter(argocd, shared_redis):
+    argocd.status = 500
+    argocd.reply = {"error": "boom"}
+    service = make_service(argocd, shared_redis)
+
+    def sync():
+        try:
+            service.sync_application("site-1")
+        except httpx.HTTPStatusError as e:
+            return e.response.status_code
+
+    try:
+        results = run_concurrently([sync] * 3)
+    finally:
+        service.close()
+
+    assert results == [500, 500, 500]
+    assert len(argocd.syncs) == 1
+
+
+def test_unreachable_redis_falls_back_to_local_coalescing(argocd):
+    unreachable = redis.Redis(port=1, socket_connect_timeout=0.2)
+    service = make_service(argocd, unreachable)
+    try:
+        results = run_concurrently(
+            [lambda: service.sync_application("site-1")] * 3
+        )
+    finally:
+        service.close()
+
+    assert len(argocd.syncs) == 1
+    assert all(result == argocd.reply for result in results)
@@ -0,0 +1,136 @@
+import json
+import time
+from types import SimpleNamespace
+
+import fakeredis
+import pytest
+from app.config import settings
+from app.database.models import WebsiteStatusEnum
+from app.services.deployment_watcher import (
+    RESULT_PREFIX,
+    ROLLOUTS_KEY,
+    DeploymentWatcher,
+)
+from app.services.status_buffer import status_buffer
+
+NAMESPACE = "site-a"
+
+
+class EmptyCluster:
+    """Kubernetes clients whose namespaced lists are all empty."""
+
+    def _empty(self, *args, **kwargs):
+        return SimpleNamespace(items=[])
+
+    def apps_v1(self, context=None):
+        return SimpleNamespace(list_namespaced_deployment=self._empty)
+
+    def networking_v1(self, context=None):
+        return SimpleNamespace(list_namespaced_ingress=self._empty)
+
+    def core_v1(self, context=None):
+        return SimpleNamespace(list_namespaced_pod=self._empty)
+
+
+def deployment(generation=1, ready=True, name="wordpress"):
+    replicas = 1 if ready else 0
+    return SimpleNamespace(
+        metadata=SimpleNamespace(
+            name=name, namespace=NAMESPACE, generation=generation
+        ),
+        spec=SimpleNamespace(replicas=1),
+        status=SimpleNamespace(
+            observed_generation=generation,
+            updated_replicas=replicas,
+            available_replicas=replicas,
+        ),
+    )
+
+
+def crashing_pod():
+    waiting = SimpleNamespace(reason="CrashLoopBackOff")
+    return SimpleNamespace(
+        metadata=SimpleNamespace(name="wordpress-0", namespace=NAMESPACE),
+        status=SimpleNamespace(
+            container_statuses=[SimpleNamespace(state=SimpleNamespace(waiting=waiting))]
+        ),
+    )
+
+
+@pytest.fixture(autouse=True)
+def no_ingress(monkeypatch):
+    monkeypatch.setattr(settings, "DEPLOYMENT_VERIFY_REQUIRE_INGRESS", False)
+
+
+@pytest.fixture
+def records(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(
+        status_buffer,
+        "record",
+        lambda website_id, **fields: recorded.append((website_id, fields["status"])),
+    )
+    return recorded
+
+
+@pytest.fixture
+def shared_redis():
+    return fakeredis.FakeRedis()
+
+
+@pytest.fixture
+def leader(shared_redis, monkeypatch):
+    watcher = DeploymentWatcher(EmptyCluster(), shared_redis)
+    # Events are fed in directly instead of from watch threads
+    monkeypatch.setattr(watcher, "_ensure_watching", lambda context: None)
+    return watcher
+
+
+def result(client, rollout):
+    raw = client.lpop(RESULT_PREFIX + rollout.token)
+    return json.loads(raw) if raw else None
+
+
+def test_job_registration_is_finished_by_the_leaders_watch(
+    leader, shared_redis, records
+):
+    # A work horse only registers; it keeps no watch of its own
+    job_side = DeploymentWatcher(EmptyCluster(), shared_redis)
+    rollout = job_side.track(NAMESPACE, "site-a")
+
+    leader.sync()
+    assert leader.in_flight() == 1
+    leader._on_deployment(None, "MODIFIED", deployment())
+    assert leader.sync() == 1
+
+    assert result(shared_redis, rollout) == {"ready": True, "reason": None}
+    assert shared_redis.hlen(ROLLOUTS_KEY) == 0
+    assert records == [("site-a", WebsiteStatusEnum.RUNNING)]
+
+
+def test_restart_waits_for_the_patched_generation(leader, shared_redis, records):
+    rollout = leader.track(NAMESPACE, "site-a", generations={"wordpress": 3})
+    leader.sync()
+
+    # Ready, but still the pre-restart generation
+    leader._on_deployment(None, "MODIFIED", deployment(generation=2))
+    assert leader.sync() == 0
+    leader._on_deployment(None, "MODIFIED", deployment(generation=3))
+    assert leader.sync() == 1
+
+    assert result(shared_redis, rollout)["ready"]
+
+
+def test_overdue_rollout_fails_with_the_pod_problem(leader, shared_redis, records):
+    rollout = leader.track(NAMESPACE, "site-a", timeout=0.2)
+    leader.sync()
+    leader._on_deployment(None, "ADDED", deployment(ready=False))
+    leader._on_pod(None, "MODIFIED", crashing_pod())
+
+    time.sleep(0.3)
+    assert leader.sync() == 1
+
+    outcome = result(shared_redis, rollout)
+    assert not outcome["ready"]
+    assert "CrashLoopBackOff" in outcome["reason"]
+    assert records == [("site-a", WebsiteStatusEnum.FAILED)]
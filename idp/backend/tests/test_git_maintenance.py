@@ -0,0 +1,74 @@
+import subprocess
+import threading
+
+import fakeredis
+import pytest
+from app.services import github_service as github_service_module
+from app.services.git_maintenance import GitMaintenance
+from app.services.github_service import TEMP_BRANCH_PREFIX, GitHubService
+
+
+def git(*args, cwd):
+    return subprocess.run(
+        ["git", *args], cwd=cwd, check=True, capture_output=True, text=True
+    ).stdout
+
+
+@pytest.fixture
+def branch_locks(monkeypatch):
+    client = fakeredis.FakeRedis()
+    monkeypatch.setattr(github_service_module, "redis_client", client)
+    return client
+
+
+@pytest.fixture
+def service(tmp_path, branch_locks):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    git("init", "-q", "-b", "main", cwd=repo)
+    (repo / "README.md").write_text("apps\n")
+    git("add", "-A", cwd=repo)
+    git("-c", "user.email=t@t", "-c", "user.name=t", "commit", "-qm", "x", cwd=repo)
+    service = GitHubService(str(repo))
+    service.set_target_branch("main")
+    return service
+
+
+def interrupted_push(service, suffix="1"):
+    """Leave a per-push worktree and temp branch behind, as a killed push would."""
+    branch = f"{TEMP_BRANCH_PREFIX}{suffix}"
+    worktree = service.values_worktrees_dir / suffix
+    git("worktree", "add", "-q", "-b", branch, str(worktree), cwd=service.repo_path)
+    return branch, worktree
+
+
+def branches(service):
+    return git("branch", "--format=%(refname:short)", cwd=service.repo_path).split()
+
+
+def test_run_removes_leftovers_of_interrupted_pushes(service):
+    branch, worktree = interrupted_push(service)
+
+    assert GitMaintenance(service, threading.Lock()).run()
+
+    assert not worktree.exists()
+    assert branches(service) == ["main"]
+    assert git("worktree", "list", cwd=service.repo_path).count("\n") == 1
+
+
+def test_run_is_skipped_while_a_push_holds_a_lock(service, branch_locks):
+    push_lock = threading.Lock()
+    maintenance = GitMaintenance(service, push_lock)
+    branch, worktree = interrupted_push(service)
+
+    with push_lock:
+        assert not maintenance.run()
+    # Another host is pushing to the branch
+    other_host = branch_locks.lock("idp:git-lock:main")
+    assert other_host.acquire(blocking=False)
+    assert not maintenance.run()
+
+    assert worktree.exists()
+    assert branch in branches(service)
+    other_host.release()
+    assert maintenance.run()
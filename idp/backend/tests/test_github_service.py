@@ -0,0 +1,133 @@
+import subprocess
+from pathlib import Path
+
+import pytest
+from app.config import settings
+from app.services.github_service import VALUES_PATH, GitHubService, git_subcommand
+from app.services.process_registry import process_registry
+from app.services.values_layout import ValuesLayout
+
+
+def git(*args, cwd):
+    return subprocess.run(
+        ["git", *args], cwd=cwd, check=True, capture_output=True, text=True
+    ).stdout
+
+
+def commit_site(clone: Path, website_id: str) -> None:
+    ValuesLayout(clone / VALUES_PATH, sharded=False).write(
+        website_id, f"site: {website_id}\n"
+    )
+    git("add", "--", VALUES_PATH, cwd=clone)
+    git("-c", "user.email=t@t", "-c", "user.name=t", "commit", "-qm", "x", cwd=clone)
+
+
+def missing_objects(repo: Path, ref: str):
+    listing = git(
+        "rev-list", "--objects", "--missing=print", "--no-object-names", ref, cwd=repo
+    )
+    return {line[1:] for line in listing.splitlines() if line.startswith("?")}
+
+
+@pytest.fixture
+def blobless_clone(tmp_path):
+    """A blobless clone of a remote with three values files."""
+    source = tmp_path / "source"
+    values = source / VALUES_PATH
+    values.mkdir(parents=True)
+    for i in range(3):
+        (values / f"values-site-{i}.yaml").write_text(f"site: {i}\n")
+    (source / "README.md").write_text("apps\n")
+    git("init", "-q", "-b", "main", cwd=source)
+    git("add", "-A", cwd=source)
+    git("-c", "user.email=t@t", "-c", "user.name=t", "commit", "-qm", "x", cwd=source)
+
+    remote = tmp_path / "remote.git"
+    git("clone", "-q", "--bare", str(source), str(remote), cwd=tmp_path)
+    git("config", "uploadpack.allowFilter", "true", cwd=remote)
+    git("config", "uploadpack.allowAnySHA1InWant", "true", cwd=remote)
+
+    clone = tmp_path / "clone"
+    git(
+        "clone",
+        "-q",
+        "--filter=blob:none",
+        "--no-checkout",
+        f"file://{remote}",
+        str(clone),
+        cwd=tmp_path,
+    )
+    return clone
+
+
+def test_default_repo_path_comes_from_settings():
+    assert GitHubService().repo_path == Path(settings.GIT_REPO_PATH)
+
+
+def test_read_blobs_fetches_missing_blobs_in_one_batch(blobless_clone, monkeypatch):
+    fetches = []
+    run = process_registry.run
+
+    def recording_run(cmd, *args, **kwargs):
+        if "fetch" in cmd:
+            fetches.append(kwargs.get("input"))
+        return run(cmd, *args, **kwargs)
+
+    monkeypatch.setattr(process_registry, "run", recording_run)
+    service = GitHubService(str(blobless_clone))
+    index = service.committed_values_index("origin/main")
+    wanted = [index["site-0"], index["site-2"]]
+    assert set(wanted) <= missing_objects(blobless_clone, "origin/main")
+
+    blobs = service.read_blobs(wanted, "origin/main")
+
+    assert blobs == {index["site-0"]: "site: 0\n", index["site-2"]: "site: 2\n"}
+    (fetched,) = fetches
+    assert set(fetched.split()) == set(wanted)
+    still_missing = missing_objects(blobless_clone, "origin/main")
+    # Only the wanted blobs were downloaded
+    assert not set(wanted) & still_missing
+    assert index["site-1"] in still_missing
+
+
+def test_git_subcommand_skips_global_options():
+    assert git_subcommand(["push", "origin", "main"]) == "push"
+    assert git_subcommand(["-C", "/tmp/wt", "rebase", "--abort"]) == "rebase"
+    assert git_subcommand(["-c", "a=b", "--no-pager", "fetch", "origin"]) == "fetch"
+    assert git_subcommand(["-C", "/tmp/wt"]) == "unknown"
+
+
+@pytest.fixture
+def remote_with_manifest(tmp_path):
+    """A bare remote whose values directory has a manifest and one site."""
+    source = tmp_path / "source"
+    source.mkdir()
+    git("init", "-q", "-b", "main", cwd=source)
+    commit_site(source, "site-0")
+    remote = tmp_path / "remote.git"
+    git("clone", "-q", "--bare", str(source), str(remote), cwd=tmp_path)
+    return remote
+
+
+def test_rebased_push_keeps_the_concurrent_writers_manifest_entries(
+    tmp_path, remote_with_manifest, monkeypatch
+):
+    monkeypatch.setattr(settings, "GIT_PUSH_BACKOFF_BASE", 0.0)
+    ours, theirs = tmp_path / "ours", tmp_path / "theirs"
+    for clone in (ours, theirs):
+        git("clone", "-q", str(remote_with_manifest), str(clone), cwd=tmp_path)
+        git("config", "user.email", "t@t", cwd=clone)
+        git("config", "user.name", "t", cwd=clone)
+    commit_site(ours, "site-a")
+    # Another writer pushes first: both commits change manifest.json
+    commit_site(theirs, "site-b")
+    git("push", "-q", "origin", "HEAD:main", cwd=theirs)
+
+    service = GitHubService(str(ours))
+    ok, output = service._push_with_retry(ours, "main")
+
+    assert ok, output
+    check = tmp_path / "check"
+    git("clone", "-q", str(remote_with_manifest), str(check), cwd=tmp_path)
+    manifest = ValuesLayout.read_manifest(check / VALUES_PATH)
+    assert set(manifest) == {"site-0", "site-a", "site-b"}
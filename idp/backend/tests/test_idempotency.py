@@ -0,0 +1,88 @@
+import asyncio
+from datetime import datetime
+
+import fakeredis
+import pytest
+from app.models.job import JobResponse, JobStatus, JobType
+from app.services.idempotency import KEY_PREFIX, IdempotencyStore
+from fastapi import HTTPException
+
+LEASE = 0.5
+
+
+@pytest.fixture
+def shared_redis():
+    return fakeredis.FakeRedis()
+
+
+def make_store(client):
+    return IdempotencyStore(client, lease=LEASE)
+
+
+def job_handler(calls, delay=0.0):
+    async def handler():
+        calls.append(None)
+        await asyncio.sleep(delay)
+        return JobResponse(
+            id=f"job-{len(calls)}",
+            job_type=JobType.WEBSITE_CREATE,
+            status=JobStatus.PENDING,
+            website_id="site-a",
+            created_at=datetime.utcnow(),
+        )
+
+    return handler
+
+
+def test_retry_replays_the_stored_response(shared_redis):
+    store = make_store(shared_redis)
+    calls = []
+
+    first = asyncio.run(store.run("key-1", "body", job_handler(calls)))
+    second = asyncio.run(store.run("key-1", "body", job_handler(calls)))
+
+    assert len(calls) == 1
+    assert second == first
+    # Completed records keep the full TTL, not the claim lease
+    assert shared_redis.ttl(KEY_PREFIX + "key-1") > LEASE
+
+
+def test_concurrent_requests_collapse_into_one_run(shared_redis):
+    # One store per replica, plus a same-process duplicate
+    first, other = make_store(shared_redis), make_store(shared_redis)
+    calls = []
+
+    async def scenario():
+        handler = job_handler(calls, delay=0.3)
+        return await asyncio.gather(
+            first.run("key-1", "body", handler),
+            first.run("key-1", "body", handler),
+            other.run("key-1", "body", handler),
+        )
+
+    responses = asyncio.run(scenario())
+
+    assert len(calls) == 1
+    assert len({r.id for r in responses}) == 1
+
+
+def test_reusing_a_key_for_another_body_is_rejected(shared_redis):
+    store = make_store(shared_redis)
+    asyncio.run(store.run("key-1", "body", job_handler([])))
+
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(store.run("key-1", "other body", job_handler([])))
+
+    assert excinfo.value.status_code == 422
+
+
+def test_abandoned_claim_expires_after_the_lease(shared_redis):
+    crashed, store = make_store(shared_redis), make_store(shared_redis)
+    # A replica claims the key and dies before storing a result
+    assert crashed._claim("key-1", {"state": "in_progress", "fingerprint": "body"})
+    calls = []
+
+    response = asyncio.run(store.run("key-1", "body", job_handler(calls)))
+
+    assert len(calls) == 1
+    assert response.id == "job-1"
@@ -0,0 +1,81 @@
+from datetime import datetime
+
+import fakeredis
+import pytest
+from app.api.routes import jobs
+from app.models.job import JobResponse, JobStatus, JobType
+from app.services.job_store import job_store
+from app.services.process_registry import process_registry
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def cancels(database, monkeypatch):
+    """Job IDs whose processes the API asked to kill."""
+    requested = []
+    monkeypatch.setattr(jobs, "redis_client", fakeredis.FakeRedis())
+    monkeypatch.setattr(process_registry, "request_cancel", requested.append)
+    return requested
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(jobs.router, prefix="/jobs")
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def create_job(status):
+    return job_store.create(
+        JobResponse(
+            id=f"job-{status.value}",
+            job_type=JobType.WEBSITE_CREATE,
+            status=status,
+            created_at=datetime.utcnow(),
+        )
+    )
+
+
+def test_cancel_running_job(client, cancels):
+    job = create_job(JobStatus.RUNNING)
+
+    response = client.delete(f"/jobs/{job.id}")
+
+    assert response.status_code == 200
+    stored = job_store.get(job.id)
+    assert stored.status == JobStatus.CANCELLED
+    assert stored.logs == ["Job cancelled"]
+    assert cancels == [job.id]
+
+
+def test_cancel_finished_job_is_refused(client, cancels):
+    job = create_job(JobStatus.COMPLETED)
+
+    response = client.delete(f"/jobs/{job.id}")
+
+    assert response.status_code == 409
+    assert job_store.get(job.id).status == JobStatus.COMPLETED
+    assert cancels == []
+
+
+def test_job_finishing_during_cancel_keeps_its_status(client, cancels, monkeypatch):
+    job = create_job(JobStatus.RUNNING)
+    get = job_store.get
+
+    def get_then_finish(job_id):
+        # The worker completes the job right after the API read it
+        current = get(job_id)
+        job_store.update(job_id, status=JobStatus.COMPLETED)
+        monkeypatch.setattr(job_store, "get", get)
+        return current
+
+    monkeypatch.setattr(job_store, "get", get_then_finish)
+
+    response = client.delete(f"/jobs/{job.id}")
+
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Job already completed"
+    assert job_store.get(job.id).status == JobStatus.COMPLETED
+    assert cancels == []
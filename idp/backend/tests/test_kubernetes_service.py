@@ -0,0 +1,92 @@
+import pytest
+from app.services.kubernetes_service import (
+    APPLY_PATCH_CONTENT_TYPE,
+    FIELD_MANAGER,
+    MERGE_PATCH_CONTENT_TYPE,
+    RESTARTED_AT_ANNOTATION,
+    KubernetesService,
+)
+
+from tests.fake_kube_api import FakeKubeAPI
+
+
+@pytest.fixture
+def fake_api():
+    api = FakeKubeAPI().start()
+    yield api
+    api.stop()
+
+
+@pytest.fixture
+def kube(fake_api):
+    service = KubernetesService(configuration=fake_api.configuration())
+    yield service
+    service.close()
+
+
+def test_apply_secret_uses_server_side_apply(kube, fake_api):
+    kube.apply_secret(
+        {
+            "apiVersion": "v1",
+            "kind": "Secret",
+            "metadata": {"name": "wp-admin", "namespace": "dev-site"},
+            "stringData": {"password": "secret"},
+        }
+    )
+
+    (request,) = fake_api.requests
+    assert request["method"] == "PATCH"
+    assert request["path"] == "/api/v1/namespaces/dev-site/secrets/wp-admin"
+    assert request["content_type"] == APPLY_PATCH_CONTENT_TYPE
+    assert request["query"]["fieldManager"] == [FIELD_MANAGER]
+    assert request["query"]["force"] == ["true"]
+
+
+def test_delete_namespace_does_not_wait_for_finalizers(kube, fake_api):
+    fake_api.namespaces.add("dev-site")
+
+    assert kube.delete_namespace("dev-site") is True
+    assert kube.delete_namespace("dev-site") is False  # already gone: 404
+
+    request = fake_api.requests[0]
+    assert request["method"] == "DELETE"
+    assert request["query"]["propagationPolicy"] == ["Background"]
+
+
+def test_restart_deployments_returns_patched_generations(kube, fake_api):
+    fake_api.deployments["dev-site"] = {"wordpress": 3, "mysql": 1}
+
+    generations = kube.restart_deployments("dev-site")
+
+    assert generations == {"wordpress": 4, "mysql": 2}
+    patches = [r for r in fake_api.requests if r["method"] == "PATCH"]
+    assert len(patches) == 2
+    for patch in patches:
+        assert patch["content_type"] == MERGE_PATCH_CONTENT_TYPE
+        annotations = patch["body"]["spec"]["template"]["metadata"]["annotations"]
+        assert RESTARTED_AT_ANNOTATION in annotations
+
+
+def test_calls_reuse_one_pooled_connection(kube, fake_api):
+    fake_api.namespaces.update(f"ns-{i}" for i in range(20))
+
+    for i in range(20):
+        kube.delete_namespace(f"ns-{i}")
+
+    assert len(fake_api.requests) == 20
+    assert fake_api.connections() == 1
+
+
+def test_injected_configuration_is_copied_per_context(fake_api):
+    configuration = fake_api.configuration()
+    original_pool_size = configuration.connection_pool_maxsize
+    kube = KubernetesService(configuration=configuration)
+    try:
+        first = kube.api_client("cluster-a").configuration
+        second = kube.api_client("cluster-b").configuration
+        assert first is not configuration
+        assert first is not second
+        assert configuration.connection_pool_maxsize == original_pool_size
+        assert kube.api_client("cluster-a") is kube.api_client("cluster-a")
+    finally:
+        kube.close()
@@ -0,0 +1,92 @@
+import logging
+import logging.handlers
+
+import pytest
+from app.config import settings
+from app.logging_config import RateLimitFilter, setup_logging, shutdown_logging
+
+
+def make_record(message, lineno=10, level=logging.WARNING, pathname="watcher.py"):
+    return logging.LogRecord("app.watcher", level, pathname, lineno, message, (), None)
+
+
+def test_varying_messages_from_one_call_site_share_a_limit():
+    limiter = RateLimitFilter(window=60, burst=2)
+
+    allowed = [limiter.filter(make_record(f"Watch failed: {i}")) for i in range(5)]
+
+    assert allowed == [True, True, False, False, False]
+
+
+def test_call_sites_are_limited_separately():
+    limiter = RateLimitFilter(window=60, burst=1)
+
+    assert limiter.filter(make_record("a", lineno=10))
+    assert limiter.filter(make_record("a", lineno=20))
+    assert limiter.filter(make_record("a", lineno=10, pathname="other.py"))
+    assert not limiter.filter(make_record("a", lineno=10))
+
+
+def test_info_records_are_never_limited():
+    limiter = RateLimitFilter(window=60, burst=1)
+
+    assert all(limiter.filter(make_record("x", level=logging.INFO)) for _ in range(5))
+
+
+def test_next_window_reports_suppressed_count(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.logging_config.time.monotonic", lambda: now[0])
+    limiter = RateLimitFilter(window=60, burst=1)
+    for i in range(4):
+        limiter.filter(make_record(f"failed {i}"))
+
+    now[0] += 61
+    record = make_record("failed again")
+
+    assert limiter.filter(record)
+    assert record.suppressed == 3
+
+
+def test_expired_entries_are_pruned(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.logging_config.time.monotonic", lambda: now[0])
+    limiter = RateLimitFilter(window=60, burst=5)
+    for lineno in range(100):
+        limiter.filter(make_record("once", lineno=lineno))
+
+    now[0] += 61
+    limiter.filter(make_record("later", lineno=1000))
+
+    assert list(limiter._seen) == [("app.watcher", "watcher.py", 1000)]
+
+
+@pytest.fixture
+def installed_logging():
+    root = logging.getLogger()
+    saved = list(root.handlers), root.level
+    limited = [logging.getLogger(name) for name in settings.LOG_RATE_LIMITED_LOGGERS]
+    filters = [list(logger.filters) for logger in limited]
+    setup_logging()
+    yield
+    shutdown_logging()
+    root.handlers[:] = saved[0]
+    root.setLevel(saved[1])
+    for logger, saved_filters in zip(limited, filters):
+        logger.filters[:] = saved_filters
+
+
+def rate_limits(filterer):
+    return [f for f in filterer.filters if isinstance(f, RateLimitFilter)]
+
+
+def test_only_background_loop_loggers_are_rate_limited(installed_logging):
+    (queue_handler,) = [
+        h
+        for h in logging.getLogger().handlers
+        if isinstance(h, logging.handlers.QueueHandler)
+    ]
+
+    assert rate_limits(queue_handler) == []
+    assert rate_limits(logging.getLogger("app.tasks.website_tasks")) == []
+    for name in settings.LOG_RATE_LIMITED_LOGGERS:
+        assert len(rate_limits(logging.getLogger(name))) == 1
@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+from app.services.kubernetes_service import KubernetesService
+from app.services.pod_logs import PodLogHub
+from kubernetes.client.rest import ApiException
+
+from tests.fake_kube_api import FakeKubeAPI
+
+NAMESPACE = "dev-site"
+
+
+@pytest.fixture
+def fake_api():
+    api = FakeKubeAPI().start()
+    yield api
+    api.stop()
+
+
+@pytest.fixture
+def hub(fake_api):
+    kube = KubernetesService(configuration=fake_api.configuration())
+    yield PodLogHub(kube)
+    kube.close()
+
+
+def write_history(fake_api, container="wordpress", lines=20):
+    for i in range(lines):
+        fake_api.append_log(NAMESPACE, "web-0", container, f"old {i}")
+
+
+async def follow_and_collect(hub, fake_api, tail, backlog_lines, live_lines=3):
+    """Follow web-0/wordpress: the backlog, then lines written afterwards."""
+    stream = hub.follow(NAMESPACE, [("web-0", "wordpress")], tail, None, False)
+    received = []
+    try:
+        while len(received) < backlog_lines:
+            line = await asyncio.wait_for(stream.__anext__(), 10)
+            if line is not None:
+                received.append(line)
+        # Let the follower reach its live phase before writing
+        next_line = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0.5)
+        for i in range(live_lines):
+            fake_api.append_log(NAMESPACE, "web-0", "wordpress", f"new {i}")
+        fake_api.close_log(NAMESPACE, "web-0", "wordpress")
+        while True:
+            try:
+                line = await asyncio.wait_for(next_line, 10)
+            except StopAsyncIteration:
+                break
+            if line is not None:
+                received.append(line)
+            next_line = asyncio.ensure_future(stream.__anext__())
+    finally:
+        await stream.aclose()
+    return received
+
+
+def test_read_raises_before_streaming_when_first_container_fails(hub):
+    with pytest.raises(ApiException):
+        hub.read(NAMESPACE, [("web-0", "missing")], 10, None, False)
+
+
+def test_read_reports_later_container_failure_inline(hub, fake_api):
+    write_history(fake_api, lines=3)
+    lines = list(
+        hub.read(
+            NAMESPACE,
+            [("web-0", "wordpress"), ("web-0", "missing")],
+            None,
+            None,
+            False,
+        )
+    )
+
+    assert lines[:3] == [f"[web-0/wordpress] old {i}" for i in range(3)]
+    assert lines[3].startswith("[web-0/missing] error: cannot read logs")
+
+
+def test_first_follower_gets_only_its_tail_then_live_lines(hub, fake_api):
+    write_history(fake_api)
+
+    received = asyncio.run(follow_and_collect(hub, fake_api, 5, 5))
+
+    expected_backlog = [f"old {i}" for i in range(15, 20)]
+    assert received == expected_backlog + ["new 0", "new 1", "new 2"]
+
+
+def test_follower_without_backlog_sees_no_history(hub, fake_api):
+    write_history(fake_api)
+
+    received = asyncio.run(follow_and_collect(hub, fake_api, 0, 0))
+
+    assert received == ["new 0", "new 1", "new 2"]
+
+
+def test_joining_follower_reads_its_own_tail(hub, fake_api):
+    write_history(fake_api)
+
+    async def scenario():
+        first = hub.follow(NAMESPACE, [("web-0", "wordpress")], 0, None, False)
+        # Start the shared upstream with a follower that wants no backlog
+        pending = asyncio.ensure_future(first.__anext__())
+        await asyncio.sleep(0.5)
+        try:
+            return await follow_and_collect(hub, fake_api, 2, 2)
+        finally:
+            pending.cancel()
+            await first.aclose()
+
+    received = asyncio.run(scenario())
+
+    assert received == ["old 18", "old 19", "new 0", "new 1", "new 2"]
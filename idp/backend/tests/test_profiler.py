@@ -0,0 +1,83 @@
+import asyncio
+import logging
+import pstats
+
+import pytest
+from app.api.routes import profiles
+from app.config import settings
+from app.services import profiler
+from app.services.profiler import ProfileStore, ProfilingMiddleware
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+TOKEN = "s3cret"
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILING_ADMIN_TOKEN", TOKEN)
+    monkeypatch.setattr(settings, "PROFILING_SAMPLE_RATE", 0.0)
+    store = ProfileStore(str(tmp_path / "profiles"), max_files=2)
+    monkeypatch.setattr(profiler, "profile_store", store)
+    monkeypatch.setattr(profiles, "profile_store", store)
+    return store
+
+
+@pytest.fixture
+def client(store):
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for _ in range(3):
+                await asyncio.sleep(0.1)
+                yield b"."
+
+        return StreamingResponse(chunks())
+
+    app.include_router(profiles.router, prefix="/profiles")
+    app.add_middleware(ProfilingMiddleware, store=store)
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def profile(client, path="/ping", token=TOKEN):
+    return client.get(path, headers={"X-Profile": "1", "X-Admin-Token": token})
+
+
+def test_profile_is_taken_only_with_the_admin_token(client, store):
+    assert "x-profile-id" not in profile(client, token="wrong").headers
+    assert "x-profile-id" not in client.get("/ping").headers
+
+    name = profile(client).headers["x-profile-id"]
+
+    assert [p["name"] for p in store.list()] == [name]
+    pstats.Stats(str(store.path(name)))  # a readable pstats file
+    download = client.get(f"/profiles/{name}", headers={"X-Admin-Token": TOKEN})
+    assert download.content == store.path(name).read_bytes()
+    assert client.get(f"/profiles/{name}").status_code == 404
+
+
+def test_only_the_newest_profiles_are_kept(client, store):
+    names = [profile(client).headers["x-profile-id"] for _ in range(3)]
+
+    assert [p["name"] for p in store.list()] == names[:0:-1]
+
+
+def test_long_request_is_cut_off_and_saved(client, store, monkeypatch, caplog):
+    monkeypatch.setattr(settings, "PROFILING_MAX_SECONDS", 0.05)
+
+    with caplog.at_level(logging.INFO, logger=profiler.__name__):
+        response = profile(client, "/stream")
+
+    assert response.content == b"..."
+    assert store.path(response.headers["x-profile-id"]) is not None
+    assert "stopped after 0.05s" in caplog.text
+    # The profiler was released for the next request
+    assert "x-profile-id" in profile(client).headers
@@ -0,0 +1,41 @@
+import fakeredis
+import pytest
+from app.services.push_outbox import PushOutbox
+
+
+@pytest.fixture
+def outbox():
+    return PushOutbox(fakeredis.FakeRedis())
+
+
+def test_later_update_keeps_the_queued_creation(outbox):
+    outbox.add("site-a", "created", "ns-a", "a: 1\n", "job-1")
+    outbox.add("site-a", "updated", "ns-a", "a: 2\n")
+    outbox.add("site-a", "reconciled")
+
+    (entry,) = outbox.pending()
+    assert entry["action"] == "created"
+    assert entry["job_id"] == "job-1"
+    # The newest render is the one pushed
+    assert entry["content"] == "a: 2\n"
+
+
+def test_deletion_replaces_a_queued_update(outbox):
+    outbox.add("site-a", "updated", "ns-a", "a: 1\n")
+    outbox.add("site-a", "deleted")
+
+    (entry,) = outbox.pending()
+    assert entry["action"] == "deleted"
+
+
+def test_remove_keeps_entries_requeued_since_the_snapshot(outbox):
+    outbox.add("site-a", "updated", content="a: 1\n")
+    outbox.add("site-b", "updated", content="b: 1\n")
+    snapshot = outbox.pending()
+    outbox.add("site-b", "updated", content="b: 2\n")
+
+    removed = outbox.remove(snapshot)
+
+    assert [e["website_id"] for e in removed] == ["site-a"]
+    (left,) = outbox.pending()
+    assert left["content"] == "b: 2\n"
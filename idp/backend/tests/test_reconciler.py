@@ -0,0 +1,131 @@
+import pytest
+import yaml
+from app.config import settings
+from app.database.models import WebsiteStatusEnum
+from app.services.reconciler import ReconcilePlan, Reconciler, _Row, git_blob_hash
+from app.services.status_buffer import status_buffer
+from app.services.values_layout import ValuesLayout
+from app.services.values_pipeline import values_pipeline
+
+
+class FakeService:
+    def __init__(self, values_dir):
+        self.values_dir = values_dir
+        self.layout = ValuesLayout(values_dir, sharded=False)
+
+
+def make_row(website_id, status=WebsiteStatusEnum.RUNNING, header="# Generated\n"):
+    values = {"site": website_id}
+    return _Row(
+        status=status,
+        namespace=f"ns-{website_id}",
+        content=header + yaml.dump(values),
+        values=values,
+    )
+
+
+@pytest.fixture
+def reconciler(tmp_path):
+    return Reconciler(FakeService(tmp_path / "values"))
+
+
+def plan_with(reconciler, monkeypatch, rows, remote):
+    monkeypatch.setattr(reconciler, "_db_index", lambda: rows)
+    monkeypatch.setattr(reconciler, "_git_index", lambda: remote)
+    return reconciler.plan()
+
+
+@pytest.fixture
+def recorded(monkeypatch):
+    """Pushes, status records and mark_pushed calls made by ``apply``."""
+    calls = {"push": [], "record": [], "mark_pushed": []}
+    monkeypatch.setattr(
+        status_buffer,
+        "record",
+        lambda website_id, **fields: calls["record"].append(
+            (website_id, fields["status"])
+        ),
+    )
+    monkeypatch.setattr(status_buffer, "flush", lambda: 0)
+    monkeypatch.setattr(
+        values_pipeline,
+        "mark_pushed",
+        lambda website_id, namespace: calls["mark_pushed"].append(website_id),
+    )
+    monkeypatch.setattr(values_pipeline, "mark_deleted", lambda ids: 0)
+    return calls
+
+
+def test_file_matching_the_branch_blob_needs_nothing(reconciler, monkeypatch):
+    row = make_row("site-a")
+    reconciler.service.layout.write("site-a", row.content)
+
+    plan = plan_with(
+        reconciler,
+        monkeypatch,
+        {"site-a": row},
+        {"site-a": git_blob_hash(row.content.encode())},
+    )
+
+    assert plan.empty
+
+
+def test_header_only_difference_is_not_drift(reconciler, monkeypatch):
+    row = make_row("site-a")
+    on_disk = make_row("site-a", header="# Generated: other format\n").content
+    reconciler.service.layout.write("site-a", on_disk)
+
+    in_sync = plan_with(
+        reconciler,
+        monkeypatch,
+        {"site-a": row},
+        {"site-a": git_blob_hash(on_disk.encode())},
+    )
+    stale_branch = plan_with(
+        reconciler, monkeypatch, {"site-a": row}, {"site-a": "0" * 40}
+    )
+
+    assert in_sync.empty
+    # The existing file is pushed as it is, not re-rendered
+    assert stale_branch.renders == {}
+    assert stale_branch.pushes == ["site-a"]
+
+
+def test_apply_refuses_to_delete_more_than_the_limit(
+    reconciler, monkeypatch, recorded
+):
+    monkeypatch.setattr(settings, "RECONCILE_MAX_DELETIONS", 1)
+    monkeypatch.setattr(
+        values_pipeline, "push", lambda *args, **kwargs: recorded["push"].append(1)
+    )
+    plan = ReconcilePlan(deletions=["site-a", "site-b"])
+
+    with pytest.raises(ValueError):
+        reconciler.apply(plan)
+
+    assert recorded["push"] == []
+
+
+def test_failed_batch_leaves_its_status_fixes_unrecorded(
+    reconciler, monkeypatch, recorded
+):
+    monkeypatch.setattr(settings, "RECONCILE_BATCH_SIZE", 1)
+    results = iter(
+        [{"success": True}, {"success": False, "message": "rejected"}]
+    )
+    monkeypatch.setattr(values_pipeline, "push", lambda *a, **kw: next(results))
+    rows = {
+        website_id: make_row(website_id, status=WebsiteStatusEnum.FAILED)
+        for website_id in ("site-a", "site-b")
+    }
+    plan = plan_with(reconciler, monkeypatch, rows, {})
+    assert plan.status_fixes == {
+        "site-a": WebsiteStatusEnum.CREATING,
+        "site-b": WebsiteStatusEnum.CREATING,
+    }
+
+    with pytest.raises(RuntimeError):
+        reconciler.apply(plan)
+
+    assert recorded["record"] == [("site-a", WebsiteStatusEnum.CREATING)]
+    assert recorded["mark_pushed"] == ["site-a"]
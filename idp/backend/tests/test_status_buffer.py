@@ -0,0 +1,99 @@
+import threading
+from datetime import datetime
+
+import pytest
+from app.database.models import (
+    DatabaseTypeEnum,
+    ResourcePlanEnum,
+    Website,
+    WebsiteStatusEnum,
+    WebsiteTypeEnum,
+)
+from app.services import status_buffer as status_buffer_module
+from app.services.status_buffer import StatusUpdateBuffer
+
+
+@pytest.fixture
+def sites(database, monkeypatch):
+    monkeypatch.setattr(status_buffer_module, "engine", database.kw["bind"])
+    with database() as db:
+        for website_id in ("site-a", "site-b"):
+            db.add(
+                Website(
+                    website_id=website_id,
+                    domain=f"{website_id}.example.com",
+                    website_type=WebsiteTypeEnum.WORDPRESS,
+                    resource_plan=ResourcePlanEnum.BASIC,
+                    database_type=DatabaseTypeEnum.INTERNAL,
+                    admin_username="admin",
+                    admin_password="secret",
+                    admin_email="admin@example.com",
+                    status=WebsiteStatusEnum.PENDING,
+                )
+            )
+        db.commit()
+
+    def read(website_id):
+        with database() as db:
+            return (
+                db.query(Website).filter(Website.website_id == website_id).one()
+            )
+
+    return read
+
+
+@pytest.fixture
+def buffer():
+    # Large interval and batch: only explicit flushes write
+    buffer = StatusUpdateBuffer(flush_interval=3600, batch_size=100)
+    yield buffer
+    buffer.stop()
+
+
+def test_latest_transition_per_site_wins_in_one_flush(sites, buffer):
+    deployed = datetime(2024, 1, 1)
+    buffer.record("site-a", status=WebsiteStatusEnum.CREATING)
+    buffer.record("site-b", status=WebsiteStatusEnum.CREATING)
+    buffer.record("site-a", status=WebsiteStatusEnum.RUNNING, deployed_at=deployed)
+
+    assert buffer.flush() == 2
+
+    site_a = sites("site-a")
+    assert site_a.status == WebsiteStatusEnum.RUNNING
+    assert site_a.deployed_at == deployed
+    assert sites("site-b").status == WebsiteStatusEnum.CREATING
+
+
+def test_failed_flush_keeps_newer_transitions_on_top(sites, buffer, monkeypatch):
+    buffer.record("site-a", status=WebsiteStatusEnum.CREATING)
+    write = buffer._write
+
+    def fail_once(pending):
+        monkeypatch.setattr(buffer, "_write", write)
+        # Recorded while the failing write was in flight
+        buffer.record("site-a", status=WebsiteStatusEnum.RUNNING)
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(buffer, "_write", fail_once)
+    with pytest.raises(RuntimeError):
+        buffer.flush()
+    buffer.flush()
+
+    assert sites("site-a").status == WebsiteStatusEnum.RUNNING
+
+
+def test_forked_child_starts_with_fresh_state(sites, buffer):
+    buffer.record("site-a", status=WebsiteStatusEnum.CREATING)
+    lock = buffer._lock
+    lock.acquire()  # e.g. held by another thread at fork time
+    try:
+        buffer._after_fork()
+    finally:
+        lock.release()
+
+    assert buffer._lock is not lock
+    assert buffer._thread is None
+    assert buffer.pending() == 0
+    buffer.record("site-a", status=WebsiteStatusEnum.RUNNING)
+    assert isinstance(buffer._thread, threading.Thread)
+    assert buffer._thread.is_alive()
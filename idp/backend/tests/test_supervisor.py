@@ -0,0 +1,67 @@
+import pytest
+from app.config import settings
+from app.supervisor import WorkerSupervisor
+
+
+@pytest.fixture(autouse=True)
+def scaling_settings(monkeypatch):
+    monkeypatch.setattr(settings, "WORKER_SCALE_UP_QUEUE_DEPTH", 5)
+    monkeypatch.setattr(settings, "WORKER_SCALE_UP_JOB_AGE", 30.0)
+    monkeypatch.setattr(settings, "WORKER_SCALE_DOWN_IDLE_SECONDS", 60.0)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.supervisor.time.monotonic", lambda: now[0])
+    return now
+
+
+def supervisor_with(running, min_processes=1, max_processes=8):
+    supervisor = WorkerSupervisor(min_processes, max_processes)
+    # Only the count matters to the scaling decision
+    supervisor.processes = [object()] * running
+    return supervisor
+
+
+def test_deep_queue_scales_up_to_cover_it():
+    supervisor = supervisor_with(2)
+
+    assert supervisor.desired_processes(depth=23, oldest_age=0) == 5
+
+
+def test_scale_up_is_capped_at_max_processes():
+    supervisor = supervisor_with(2, max_processes=4)
+
+    assert supervisor.desired_processes(depth=100, oldest_age=0) == 4
+
+
+def test_old_job_adds_a_worker_even_with_a_short_queue():
+    supervisor = supervisor_with(2)
+
+    assert supervisor.desired_processes(depth=1, oldest_age=45) == 3
+
+
+def test_idle_workers_retire_one_at_a_time_after_the_idle_period(clock):
+    supervisor = supervisor_with(3, min_processes=2)
+
+    assert supervisor.desired_processes(0, 0) == 3
+    clock[0] += 59
+    assert supervisor.desired_processes(0, 0) == 3
+    clock[0] += 1
+    assert supervisor.desired_processes(0, 0) == 2
+
+    supervisor.processes.pop()
+    # The idle period restarts after each retirement, and min is kept
+    clock[0] += 60
+    assert supervisor.desired_processes(0, 0) == 2
+
+
+def test_queued_work_resets_the_idle_timer(clock):
+    supervisor = supervisor_with(3)
+
+    supervisor.desired_processes(0, 0)
+    clock[0] += 50
+    assert supervisor.desired_processes(depth=2, oldest_age=0) == 3
+    clock[0] += 20
+    assert supervisor.desired_processes(0, 0) == 3
@@ -0,0 +1,108 @@
+from datetime import datetime
+
+import pytest
+from app.api.routes import websites
+from app.database.models import (
+    DatabaseTypeEnum,
+    ResourcePlanEnum,
+    Website,
+    WebsiteStatusEnum,
+    WebsiteTypeEnum,
+)
+from app.models.website import WebsiteUpdateRequest
+from app.services.values_layout import ValuesLayout
+from app.services.values_pipeline import values_pipeline
+
+
+class FakeGitService:
+    def __init__(self, values_dir):
+        self.layout = ValuesLayout(values_dir, sharded=False)
+
+
+@pytest.fixture
+def layout(tmp_path, monkeypatch):
+    service = FakeGitService(tmp_path / "values")
+    monkeypatch.setattr(websites, "github_service", service)
+    return service.layout
+
+
+@pytest.fixture
+def pushes(monkeypatch):
+    pushed = []
+
+    def push(website_id, action, namespace):
+        pushed.append(website_id)
+        return {"success": True, "message": "pushed"}
+
+    monkeypatch.setattr(values_pipeline, "push", push)
+    monkeypatch.setattr(websites, "_enqueue_sync", lambda website: "sync-1")
+    return pushed
+
+
+@pytest.fixture
+def db(database, layout):
+    session = database()
+    website = Website(
+        website_id="site-a",
+        domain="site-a.example.com",
+        website_type=WebsiteTypeEnum.WORDPRESS,
+        resource_plan=ResourcePlanEnum.BASIC,
+        database_type=DatabaseTypeEnum.INTERNAL,
+        admin_username="admin",
+        admin_password="secret",
+        admin_email="admin@example.com",
+        blog_name="Old name",
+        status=WebsiteStatusEnum.RUNNING,
+        namespace="site-a",
+        created_at=datetime(2024, 1, 1),
+    )
+    session.add(website)
+    session.commit()
+    layout.write("site-a", website.to_values_file())
+    yield session
+    session.close()
+
+
+def update(db, **fields):
+    return websites._update_website("site-a", WebsiteUpdateRequest(**fields), db)
+
+
+def test_update_reports_only_the_changed_key(db, layout, pushes):
+    response = update(db, blogName="New name")
+
+    assert response.changed_fields == ["blog_name"]
+    assert response.values_changes == [
+        {
+            "path": "wordpressBlogName",
+            "op": "changed",
+            "old": "Old name",
+            "new": "New name",
+        }
+    ]
+    assert response.pushed and response.sync_job_id == "sync-1"
+    assert pushes == ["site-a"]
+    assert "New name" in layout.path_for("site-a").read_text()
+
+
+def test_update_without_values_change_pushes_nothing(db, layout, pushes):
+    before = layout.path_for("site-a").stat().st_mtime_ns
+
+    response = update(db, description="Marketing site")
+
+    assert response.changed_fields == ["description"]
+    assert response.values_changes == []
+    assert not response.pushed and response.sync_job_id is None
+    assert pushes == []
+    assert layout.path_for("site-a").stat().st_mtime_ns == before
+    db.expire_all()
+    assert db.get(Website, 1).description == "Marketing site"
+
+
+def test_update_with_missing_values_file_renders_it_again(db, layout, pushes):
+    layout.path_for("site-a").unlink()
+
+    response = update(db, blogName="New name")
+
+    assert response.pushed
+    assert {c["op"] for c in response.values_changes} == {"added"}
+    assert "New name" in layout.path_for("site-a").read_text()
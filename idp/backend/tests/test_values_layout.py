@@ -0,0 +1,74 @@
+import pytest
+from app.services.values_layout import MANIFEST_NAME, ValuesLayout
+
+
+@pytest.fixture
+def layout(tmp_path):
+    return ValuesLayout(tmp_path / "values", sharded=False)
+
+
+def manifest_stat(layout):
+    st = (layout.values_dir / MANIFEST_NAME).stat()
+    return st.st_ino, st.st_mtime_ns
+
+
+def test_manifest_is_parsed_once_until_the_file_changes(layout, monkeypatch):
+    layout.write("site-a", "a: 1\n")
+    reads = []
+    original = ValuesLayout.read_manifest
+
+    def counting_read(values_dir):
+        reads.append(values_dir)
+        return original(values_dir)
+
+    monkeypatch.setattr(ValuesLayout, "read_manifest", staticmethod(counting_read))
+
+    for _ in range(3):
+        assert set(layout.manifest()) == {"site-a"}
+    assert reads == []  # primed by the write
+
+    # Another process (here: another instance) updates the manifest
+    ValuesLayout(layout.values_dir, sharded=False).write("site-b", "b: 1\n")
+    reads.clear()
+
+    assert set(layout.manifest()) == {"site-a", "site-b"}
+    assert set(layout.manifest()) == {"site-a", "site-b"}
+    assert len(reads) == 1
+
+
+def test_callers_cannot_change_the_cached_manifest(layout):
+    layout.write("site-a", "a: 1\n")
+
+    layout.manifest().pop("site-a")
+
+    assert "site-a" in layout.manifest()
+
+
+def test_unchanged_write_leaves_files_alone(layout):
+    path = layout.write("site-a", "a: 1\n")
+    before = manifest_stat(layout), path.stat().st_mtime_ns
+
+    layout.write_many({"site-a": "a: 1\n"})
+
+    assert (manifest_stat(layout), path.stat().st_mtime_ns) == before
+
+
+def test_changed_write_updates_the_manifest(layout):
+    layout.write("site-a", "a: 1\n")
+    old_sha = layout.manifest()["site-a"]["sha256"]
+    before = manifest_stat(layout)
+
+    path = layout.write("site-a", "a: 2\n")
+
+    assert manifest_stat(layout) != before
+    assert layout.manifest()["site-a"]["sha256"] != old_sha
+    assert path.read_text() == "a: 2\n"
+
+
+def test_deleted_file_is_rewritten_even_if_manifest_matches(layout):
+    path = layout.write("site-a", "a: 1\n")
+    path.unlink()
+
+    layout.write("site-a", "a: 1\n")
+
+    assert path.read_text() == "a: 1\n"
@@ -0,0 +1,144 @@
+import threading
+
+import fakeredis
+import pytest
+from app.config import settings
+from app.services.job_store import job_store
+from app.services.push_outbox import PushOutbox
+from app.services.values_layout import ValuesLayout
+from app.services.values_pipeline import ValuesPipeline
+
+
+class FakeGitService:
+    """Records what each push would have committed from its values dir."""
+
+    def __init__(self, values_dir):
+        self.layout = ValuesLayout(values_dir, sharded=False)
+        self.pushes = []
+
+    def start_watcher(self):
+        pass
+
+    def stop_watcher(self):
+        pass
+
+    def auto_push_values(self, website_id, action, removed=(), force=()):
+        files = {
+            site: (self.layout.values_dir / entry["path"]).read_text()
+            for site, entry in self.layout.manifest().items()
+        }
+        self.pushes.append({"website_id": website_id, "files": files})
+        return {
+            "success": True,
+            "website_id": website_id,
+            "action": action,
+            "steps": {"push": {"success": True}},
+            "message": "pushed",
+        }
+
+
+@pytest.fixture(autouse=True)
+def leader_election(monkeypatch):
+    monkeypatch.setattr(settings, "LEADER_ELECTION_ENABLED", True)
+    monkeypatch.setattr(settings, "GIT_MAINTENANCE_ENABLED", False)
+
+
+@pytest.fixture
+def shared_redis():
+    return fakeredis.FakeRedis()
+
+
+def make_pipeline(tmp_path, name, client):
+    service = FakeGitService(tmp_path / name / "values")
+    outbox = PushOutbox(client)
+    return ValuesPipeline(service=service, client=client, outbox=outbox)
+
+
+def pipeline_threads():
+    names = {"values-outbox-drain", "values-push-consumer"}
+    return [t for t in threading.enumerate() if t.name in names]
+
+
+def test_forwarded_push_carries_the_rendered_file(tmp_path, shared_redis):
+    leader = make_pipeline(tmp_path, "leader", shared_redis)
+    # The worker renders into a directory the leader cannot see
+    worker = make_pipeline(tmp_path, "worker", shared_redis)
+    worker.service.layout.write("site-a", "a: 1\n")
+    leader._on_elected()
+    try:
+        result = worker.push("site-a", "created", "ns-a")
+    finally:
+        leader._on_demoted()
+
+    assert result["success"]
+    (push,) = leader.service.pushes
+    assert push["files"] == {"site-a": "a: 1\n"}
+
+
+def test_forwarded_reconcile_batch_carries_its_renders(tmp_path, shared_redis):
+    leader = make_pipeline(tmp_path, "leader", shared_redis)
+    # Reconciliation runs on an RQ worker with its own values directory
+    worker = make_pipeline(tmp_path, "worker", shared_redis)
+    worker.service.layout.write_many({"site-a": "a: 1\n", "site-b": "b: 1\n"})
+    leader._on_elected()
+    try:
+        result = worker.push(
+            "reconcile batch 1", "reconciled", force=["site-a", "site-b"]
+        )
+    finally:
+        leader._on_demoted()
+
+    assert result["success"]
+    (push,) = leader.service.pushes
+    assert push["files"] == {"site-a": "a: 1\n", "site-b": "b: 1\n"}
+
+
+def test_unanswered_forward_is_reported_as_pending(
+    tmp_path, shared_redis, monkeypatch
+):
+    monkeypatch.setattr(settings, "PUSH_FORWARD_TIMEOUT", 1)
+    follower = make_pipeline(tmp_path, "follower", shared_redis)
+    follower.service.layout.write("site-a", "a: 1\n")
+
+    result = follower.push("site-a", "updated")
+
+    assert result["pending"]
+    assert not result["success"]
+
+
+def test_demotion_stops_the_leader_threads(tmp_path, shared_redis):
+    pipeline = make_pipeline(tmp_path, "leader", shared_redis)
+
+    for _ in range(3):
+        pipeline._on_elected()
+        assert len(pipeline_threads()) == 2
+        pipeline._on_demoted()
+
+    assert pipeline_threads() == []
+
+
+def test_outbox_drain_pushes_renders_queued_by_other_hosts(
+    tmp_path, shared_redis, monkeypatch
+):
+    finished = []
+    monkeypatch.setattr(
+        ValuesPipeline, "mark_pushed", staticmethod(lambda *args: None)
+    )
+    monkeypatch.setattr(
+        job_store, "update", lambda job_id, **kwargs: finished.append(job_id)
+    )
+    worker = make_pipeline(tmp_path, "worker", shared_redis)
+    worker.service.layout.write("site-a", "a: 1\n")
+    # The remote is down: the worker's push goes to the shared outbox
+    monkeypatch.setattr(worker.breaker, "allow", lambda: False)
+    result = worker._push_local("site-a", "created", "ns-a", job_id="job-1")
+    assert result["queued"]
+    assert finished == []
+
+    leader = make_pipeline(tmp_path, "leader", shared_redis)
+    assert leader.drain_outbox() == 1
+
+    (push,) = leader.service.pushes
+    assert push["files"] == {"site-a": "a: 1\n"}
+    assert finished == ["job-1"]
+    assert leader.outbox.pending() == []
@@ -0,0 +1,134 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+import yaml
+from app.config import settings
+from app.database.models import (
+    DatabaseTypeEnum,
+    ResourcePlanEnum,
+    Website,
+    WebsiteStatusEnum,
+    WebsiteTypeEnum,
+)
+from app.services import values_preview as values_preview_module
+from app.services.values_preview import ValuesPreview, diff_values, preview_row
+
+COMMIT = "c" * 40
+
+
+def make_website(website_id, blog_name="Blog"):
+    return Website(
+        website_id=website_id,
+        domain=f"{website_id}.example.com",
+        website_type=WebsiteTypeEnum.WORDPRESS,
+        resource_plan=ResourcePlanEnum.BASIC,
+        database_type=DatabaseTypeEnum.INTERNAL,
+        admin_username="admin",
+        admin_password="secret",
+        admin_email="admin@example.com",
+        blog_name=blog_name,
+        status=WebsiteStatusEnum.RUNNING,
+        namespace=website_id,
+        cluster="dev",
+        storage_class="gp2",
+        created_at=datetime(2024, 1, 1),
+    )
+
+
+def columns(website):
+    return {c.name: getattr(website, c.name) for c in Website.__table__.columns}
+
+
+class FakeGitService:
+    """Serves committed values files as if they were on ``origin/main``."""
+
+    target_branch = "main"
+    checkout = SimpleNamespace(fetch_args=lambda branch: ["fetch", "origin", branch])
+
+    def __init__(self, committed):
+        self.committed = committed
+        self.commands = []
+
+    def git_command(self, args, timeout=None):
+        self.commands.append(args[0])
+        return True, COMMIT if args[0] == "rev-parse" else ""
+
+    def committed_values_index(self, ref):
+        return {website_id: f"blob-{website_id}" for website_id in self.committed}
+
+    def read_blobs(self, blob_ids, ref):
+        return {f"blob-{i}": content for i, content in self.committed.items()}
+
+
+def test_diff_reports_nested_keys_and_whole_lists():
+    old = {"wordpress": {"blogName": "Old", "plugins": ["a"]}, "replicas": 1}
+    new = {"wordpress": {"blogName": "New", "plugins": ["a", "b"]}, "tls": True}
+
+    assert diff_values(old, new) == [
+        {"path": "replicas", "op": "removed", "old": 1},
+        {"path": "tls", "op": "added", "new": True},
+        {"path": "wordpress.blogName", "op": "changed", "old": "Old", "new": "New"},
+        {
+            "path": "wordpress.plugins",
+            "op": "changed",
+            "old": ["a"],
+            "new": ["a", "b"],
+        },
+    ]
+
+
+def test_preview_row_diffs_against_the_committed_file():
+    website = make_website("site-a", blog_name="New name")
+    committed = make_website("site-a", blog_name="Old name").to_values_file()
+
+    result = preview_row(columns(website), committed)
+    unchanged = preview_row(columns(website), website.to_values_file())
+    uncommitted = preview_row(columns(website), None)
+
+    assert result["changed"]
+    (change,) = [c for c in result["changes"] if c["op"] == "changed"]
+    assert (change["old"], change["new"]) == ("Old name", "New name")
+    assert not unchanged["changed"]
+    assert not uncommitted["committed"]
+    assert uncommitted["changes"] == diff_values(
+        {}, yaml.safe_load(website.to_values_file())
+    )
+
+
+@pytest.fixture
+def single_process_pool(monkeypatch):
+    monkeypatch.setattr(settings, "PREVIEW_PROCESSES", 1)
+    monkeypatch.setattr(settings, "PREVIEW_CHUNK_SIZE", 1)
+    yield
+    values_preview_module.shutdown_pool()
+
+
+def test_fleet_preview_streams_changed_sites_then_a_summary(
+    database, single_process_pool
+):
+    session = database()
+    for website_id, blog_name in [("site-a", "New"), ("site-b", "Same")]:
+        session.add(make_website(website_id, blog_name))
+    session.add(make_website("site-c"))
+    session.commit()
+    service = FakeGitService(
+        {
+            "site-a": make_website("site-a", "Old").to_values_file(),
+            "site-b": make_website("site-b", "Same").to_values_file(),
+        }
+    )
+
+    results = list(ValuesPreview(service).preview_fleet(only_changed=True))
+
+    *sites, summary = results
+    assert sorted(r["website_id"] for r in sites) == ["site-a", "site-c"]
+    assert summary["summary"] == {
+        "total": 3,
+        "changed": 2,
+        "uncommitted": 1,
+        "errors": 0,
+        "source": {"ref": "origin/main", "commit": COMMIT, "fetched": True},
+    }
+    # Fetched before comparing, never written or pushed
+    assert service.commands == ["fetch", "rev-parse"]
@@ -0,0 +1,99 @@
+import json
+import time
+from datetime import datetime
+
+import fakeredis
+import pytest
+from app.database.models import (
+    DatabaseTypeEnum,
+    ResourcePlanEnum,
+    Website,
+    WebsiteStatusEnum,
+    WebsiteTypeEnum,
+)
+from app.services import website_cache as website_cache_module
+from app.services.website_cache import CACHE_PREFIX, WebsiteCache
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+def cache(server, monkeypatch):
+    cache = WebsiteCache(fakeredis.FakeRedis(server=server))
+    # Commits invalidate through the module singleton
+    monkeypatch.setattr(website_cache_module, "website_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def session(database):
+    session = database()
+    session.add(
+        Website(
+            website_id="site-a",
+            domain="site-a.example.com",
+            website_type=WebsiteTypeEnum.WORDPRESS,
+            resource_plan=ResourcePlanEnum.BASIC,
+            database_type=DatabaseTypeEnum.INTERNAL,
+            admin_username="admin",
+            admin_password="secret",
+            admin_email="admin@example.com",
+            status=WebsiteStatusEnum.CREATING,
+            namespace="site-a",
+            created_at=datetime(2024, 1, 1),
+        )
+    )
+    session.commit()
+    yield session
+    session.close()
+
+
+def set_status(session, status):
+    website = session.query(Website).filter_by(website_id="site-a").one()
+    website.status = status
+    session.commit()
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.01)
+
+
+def test_committed_change_is_never_served_stale(cache, session):
+    assert cache.get("site-a")["status"] == "creating"
+    assert cache.client.exists(CACHE_PREFIX + "site-a")
+
+    set_status(session, WebsiteStatusEnum.RUNNING)
+
+    assert not cache.client.exists(CACHE_PREFIX + "site-a")
+    assert cache.get("site-a")["status"] == "running"
+    assert cache.get("nope") is None
+
+
+def test_entry_written_by_a_racing_lookup_is_ignored(cache, session):
+    old = cache.get("site-a")
+    set_status(session, WebsiteStatusEnum.RUNNING)
+    # A lookup that read the row before the change stores it afterwards
+    cache.client.set(
+        CACHE_PREFIX + "site-a", json.dumps({"version": 0, "website": old})
+    )
+
+    assert cache.get("site-a")["status"] == "running"
+
+
+def test_invalidation_reaches_other_processes_lru(cache, server, session):
+    other = WebsiteCache(fakeredis.FakeRedis(server=server))
+    other.start_listener()
+    wait_for(lambda: other._subscribed)
+    # Served from its LRU from now on
+    wait_for(lambda: other.get("site-a") and "site-a" in other._entries)
+
+    set_status(session, WebsiteStatusEnum.RUNNING)
+
+    wait_for(lambda: "site-a" not in other._entries)
+    assert other.get("site-a")["status"] == "running"
@@ -0,0 +1,101 @@
+import threading
+import time
+
+import fakeredis
+import pytest
+from app.config import settings
+from app.services.kubernetes_service import kubernetes_service
+from app.services.values_layout import ValuesLayout
+from app.services.values_pipeline import values_pipeline
+from app.services.website_teardown import LOCK_KEY, PENDING_KEY, WebsiteTeardown
+
+
+class FakeGitService:
+    def __init__(self, values_dir):
+        self.layout = ValuesLayout(values_dir, sharded=False)
+
+
+@pytest.fixture
+def teardown(tmp_path, monkeypatch):
+    # No legacy apps/<id> directories in this checkout
+    monkeypatch.setattr(settings, "GIT_REPO_PATH", str(tmp_path / "repo"))
+    monkeypatch.setattr(settings, "DELETE_BATCH_SIZE", 10)
+    service = FakeGitService(tmp_path / "values")
+    service.layout.write_many({f"site-{i}": f"site: {i}\n" for i in "abc"})
+    return WebsiteTeardown(service, fakeredis.FakeRedis())
+
+
+@pytest.fixture
+def cluster(monkeypatch):
+    """Namespaces deleted, and sites marked deleted after a direct push."""
+    calls = {"namespaces": [], "mark_deleted": []}
+    monkeypatch.setattr(
+        kubernetes_service, "delete_namespace", calls["namespaces"].append
+    )
+    monkeypatch.setattr(
+        values_pipeline, "mark_deleted", calls["mark_deleted"].extend
+    )
+    return calls
+
+
+def pushing(monkeypatch, *results):
+    """Make values pushes return ``results`` in turn; returns the calls."""
+    pushes = []
+    outcomes = iter(results)
+
+    def push(label, action, removed=()):
+        pushes.append(sorted(removed))
+        return next(outcomes)
+
+    monkeypatch.setattr(values_pipeline, "push", push)
+    return pushes
+
+
+def test_concurrent_deletes_share_one_commit(teardown, monkeypatch):
+    pushes = pushing(monkeypatch, {"success": True, "message": "pushed"})
+    results = {}
+
+    def delete_job(website_ids):
+        results.update(teardown.remove_files(website_ids))
+
+    # A push in progress holds the lock while two delete jobs queue up
+    holder = teardown.client.lock(LOCK_KEY)
+    holder.acquire()
+    jobs = [
+        threading.Thread(target=delete_job, args=(ids,))
+        for ids in (["site-a", "site-b"], ["site-c"])
+    ]
+    for job in jobs:
+        job.start()
+    while teardown.client.scard(PENDING_KEY) < 3:
+        time.sleep(0.01)
+    holder.release()
+    for job in jobs:
+        job.join(timeout=10)
+
+    assert pushes == [["site-a", "site-b", "site-c"]]
+    assert {r["status"] for r in results.values()} == {"pushed"}
+    assert set(results) == {"site-a", "site-b", "site-c"}
+    assert teardown.service.layout.manifest() == {}
+    assert teardown.client.scard(PENDING_KEY) == 0
+
+
+def test_namespaces_wait_for_the_values_removal(teardown, cluster, monkeypatch):
+    monkeypatch.setattr(settings, "DELETE_BATCH_SIZE", 1)
+    pushing(
+        monkeypatch,
+        {"success": True, "message": "pushed"},
+        {"success": False, "queued": True, "message": "queued"},
+        {"success": False, "message": "rejected"},
+    )
+
+    summary = teardown.teardown({f"site-{i}": f"ns-{i}" for i in "abc"})
+
+    assert summary["deleted"] == ["site-a"]
+    assert summary["queued"] == ["site-b"]
+    assert summary["failed"] == ["site-c"]
+    assert summary["errors"] == {"site-c": "rejected"}
+    # A failed push keeps the namespace so the delete can be retried
+    assert cluster["namespaces"] == ["ns-a", "ns-b"]
+    # Queued sites are dropped by the outbox drain instead
+    assert cluster["mark_deleted"] == ["site-a"]
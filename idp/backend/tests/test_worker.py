@@ -0,0 +1,92 @@
+import fakeredis
+import pytest
+from app import worker as worker_module
+from app.config import settings
+from app.services.cluster_slots import ClusterSlots
+from app.services.process_registry import process_registry
+from app.worker import ClusterAwareWorker, enqueue_website_job
+from rq import Queue
+from rq.job import JobStatus
+
+
+def provision(website_id):
+    return website_id
+
+
+@pytest.fixture
+def connection():
+    return fakeredis.FakeRedis()
+
+
+@pytest.fixture
+def lanes(connection, monkeypatch):
+    lanes = {
+        "interactive": Queue("website-interactive", connection=connection),
+        "default": Queue("website", connection=connection),
+        "bulk": Queue("website-bulk", connection=connection),
+    }
+    monkeypatch.setattr(worker_module, "LANES", lanes)
+    return lanes
+
+
+@pytest.fixture
+def slots(connection, monkeypatch):
+    monkeypatch.setattr(settings, "CLUSTER_MAX_CONCURRENT_JOBS", 1)
+    monkeypatch.setattr(settings, "CLUSTER_CONCURRENCY_OVERRIDES", {})
+    slots = ClusterSlots(connection)
+    monkeypatch.setattr(worker_module, "cluster_slots", slots)
+    return slots
+
+
+@pytest.fixture
+def cancelled(monkeypatch):
+    ids = set()
+    monkeypatch.setattr(process_registry, "is_cancelled", lambda job_id: job_id in ids)
+    return ids
+
+
+def test_job_is_queued_on_its_lane_with_its_cluster(lanes):
+    job = enqueue_website_job(
+        "interactive", provision, "site-a", cluster="prod", website_id="site-a"
+    )
+
+    assert lanes["interactive"].job_ids == [job.id]
+    assert lanes["default"].count == 0
+    assert job.meta["lane"] == "interactive"
+    assert job.meta["cluster"] == "prod"
+    assert job.meta["website_id"] == "site-a"
+
+
+def test_job_for_a_full_cluster_is_deferred_to_the_front_of_its_lane(
+    lanes, slots, cancelled, connection
+):
+    queue = lanes["default"]
+    held = slots.acquire("prod")
+    job = enqueue_website_job("default", provision, "site-a", cluster="prod")
+    queue.pop_job_id()
+    worker = ClusterAwareWorker(list(lanes.values()), connection=connection)
+
+    worker.execute_job(job, queue)
+
+    assert queue.scheduled_job_registry.get_job_ids() == [job.id]
+    assert queue.count == 0
+    assert queue.fetch_job(job.id).enqueue_at_front
+    # The deferred job took no slot of its own
+    assert slots.in_use("prod") == 1
+    slots.release("prod", held)
+
+
+def test_cancelled_job_is_dropped_before_taking_a_slot(
+    lanes, slots, cancelled, connection
+):
+    queue = lanes["bulk"]
+    job = enqueue_website_job("bulk", provision, "site-a", cluster="prod")
+    queue.pop_job_id()
+    cancelled.add(job.id)
+    worker = ClusterAwareWorker(list(lanes.values()), connection=connection)
+
+    worker.execute_job(job, queue)
+
+    assert job.get_status(refresh=True) == JobStatus.CANCELED
+    assert slots.in_use("prod") == 0
+    assert queue.scheduled_job_registry.get_job_ids() == []